@@ -0,0 +1,46 @@
+import argparse
+import time
+import numpy as np
+from app.services.capture_service import CaptureEngine, FakeCaptureBackend, Win32CaptureBackend
+from app.utils.metrics import LatencyStats
+
+## run: python -m app.benchmarks.bench_capture [--frame path/to/frame.png] [--hwnd 123456]
+
+REGIONS = {
+    "full": None,
+    "is_home": (790, 515, 230, 100),
+    "room_number": (490, 345, 80, 30),
+}
+
+
+def run(engine: CaptureEngine, hwnd: int, iterations: int):
+    for name, region in REGIONS.items():
+        engine.latency = LatencyStats()
+        for _ in range(iterations):
+            engine.capture(hwnd, region)
+        stats = engine.latency.snapshot()
+        print(f"{name:12s} p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms max={stats['max_ms']:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-capture latency of the capture engine")
+    parser.add_argument("--hwnd", type=int, help="capture a real window with the Win32 backend")
+    parser.add_argument("--frame", help="recorded frame served by the fake backend")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.hwnd:
+        engine = CaptureEngine(Win32CaptureBackend())
+        hwnd = args.hwnd
+    else:
+        hwnd = 1
+        frame = args.frame or np.random.default_rng(0).integers(0, 255, size=(637, 1056, 3), dtype=np.uint8)
+        engine = CaptureEngine(FakeCaptureBackend({hwnd: frame}))
+
+    start = time.perf_counter()
+    run(engine, hwnd, args.iterations)
+    print(f"total {time.perf_counter() - start:.2f}s with {type(engine.backend).__name__}")
+
+
+if __name__ == "__main__":
+    main()
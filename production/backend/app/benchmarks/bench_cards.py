@@ -0,0 +1,86 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from app.services.card_recognizer import CardIndex, CardRecognizer, SLOT_SIZE, slot_regions
+from app.services.template_store import TemplateStore
+from app.utils.metrics import LatencyStats
+
+## run: python -m app.benchmarks.bench_cards [--corpus dir/of/recorded/frames] [--images dir]
+##
+## Recognizes the card hand on a recorded corpus: full-window frames plus a labels.json mapping each
+## frame file to its three card names (null for an empty slot), e.g. {"0001.png": ["火灵", "蛇女", null]}.
+## Without a corpus, synthetic frames are built from the indexed portraits (or random ones).
+
+IMAGES_DIR = Path(__file__).resolve().parents[3] / "public" / "images"
+
+
+def load_corpus(corpus_dir: Path):
+    labels = json.loads((corpus_dir / "labels.json").read_text(encoding="utf-8"))
+    for file_name, hand in sorted(labels.items()):
+        frame = cv2.imdecode(np.fromfile(str(corpus_dir / file_name), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if frame is not None:
+            yield file_name, frame, hand
+
+
+def synthetic_corpus(portraits, count: int):
+    rng = np.random.default_rng(0)
+    names = sorted(portraits)
+    for i in range(count):
+        frame = cv2.GaussianBlur(rng.integers(0, 255, size=(637, 1056), dtype=np.uint8), (0, 0), 3)
+        hand = [names[j] for j in rng.choice(len(names), size=3, replace=False)]
+        for name, (x, y, width, height) in zip(hand, slot_regions()):
+            portrait = cv2.resize(portraits[name], (width, height))
+            noise = rng.normal(0, 6, size=portrait.shape)
+            frame[y:y + height, x:x + width] = np.clip(portrait + noise, 0, 255).astype(np.uint8)
+        yield f"synthetic_{i}", frame, hand
+
+
+def random_portraits(count: int):
+    rng = np.random.default_rng(1)
+    width, height = SLOT_SIZE
+    return {f"card_{i}": cv2.GaussianBlur(rng.integers(0, 255, size=(height, width), dtype=np.uint8), (0, 0), 2)
+            for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Card hand recognition latency and accuracy")
+    parser.add_argument("--corpus", help="directory of recorded full-window frames with labels.json")
+    parser.add_argument("--images", default=str(IMAGES_DIR), help="template images directory")
+    parser.add_argument("--count", type=int, default=200, help="number of synthetic frames")
+    args = parser.parse_args()
+
+    templates = TemplateStore(Path(args.images))
+    recognizer = CardRecognizer(lambda hwnd, region: None, templates)
+    if not len(recognizer.index):
+        portraits = random_portraits(60)
+        recognizer = CardRecognizer(lambda hwnd, region: None, templates, index=CardIndex(portraits))
+        print("No portraits under images/cards, using 60 random portraits")
+    else:
+        portraits = {name: templates.get(f"cards/{name}") for name in recognizer.index.names}
+
+    corpus = load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(portraits, args.count)
+    latency = LatencyStats()
+    slots, errors, margins = 0, 0, []
+    for name, frame, hand in corpus:
+        start = time.perf_counter()
+        results = recognizer.recognize_frame(frame)
+        latency.record(time.perf_counter() - start)
+        for expected, (actual, confidence) in zip(hand, results):
+            slots += 1
+            if actual != expected:
+                errors += 1
+                print(f"{name}: expected {expected}, got {actual} ({confidence:.3f})")
+            elif actual is not None:
+                margins.append(confidence - recognizer.min_confidence)
+
+    print(f"index: {len(recognizer.index)} cards, descriptor {recognizer.index.matrix.shape[1]} floats")
+    print(f"recognize: {latency.snapshot()}")
+    print(f"{slots} slots, {errors} misclassified, "
+          f"min margin over threshold {min(margins) if margins else 0.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
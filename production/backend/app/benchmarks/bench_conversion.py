@@ -0,0 +1,76 @@
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from PIL import Image
+from app.services.capture_service import bgrx_to_gray
+
+## run: python -m app.benchmarks.bench_conversion
+##
+## Compares the legacy capture conversion (bitmap bytes -> Image.frombuffer -> crop -> np.array ->
+## cvtColor) with the zero-copy path (view BGRX buffer -> slice -> cvtColor into a reused buffer).
+## Bytes are measured with tracemalloc, which sees numpy/OpenCV arrays but not PIL's internal image
+## buffers, so the legacy numbers are a lower bound.
+
+WIDTH, HEIGHT = 1056, 637
+REGIONS = {
+    "full": None,
+    "is_home": (790, 515, 230, 100),
+    "room_number": (490, 345, 80, 30),
+}
+
+
+def legacy(bits: bytes, region):
+    x, y, w, h = region or (0, 0, WIDTH, HEIGHT)
+    screenshot = Image.frombuffer('RGB', (WIDTH, HEIGHT), bits, 'raw', 'BGRX', 0, 1)
+    cropped = screenshot.crop((x, y, x + w, y + h))
+    return cv2.cvtColor(np.array(cropped), cv2.COLOR_RGB2GRAY)
+
+
+def zero_copy(bits: bytes, region, out):
+    frame = np.frombuffer(bits, dtype=np.uint8).reshape(HEIGHT, WIDTH, 4)
+    return bgrx_to_gray(frame, region, out)
+
+
+def measure(fn, iterations: int):
+    fn()  # warm up, allocates the reusable output buffer
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - base
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+    return peak_total // iterations, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes allocated per frame by the capture conversion")
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    bits = np.random.default_rng(0).integers(0, 255, size=(HEIGHT, WIDTH, 4), dtype=np.uint8).tobytes()
+    for name, region in REGIONS.items():
+        out = np.empty(0, dtype=np.uint8)
+
+        def run_zero_copy():
+            nonlocal out
+            out = zero_copy(bits, region, out)
+
+        legacy_bytes, legacy_time = measure(lambda: legacy(bits, region), args.iterations)
+        new_bytes, new_time = measure(run_zero_copy, args.iterations)
+        np.testing.assert_array_equal(legacy(bits, region), out)
+        print(f"{name:12s} legacy {legacy_bytes:>9d} B/frame {legacy_time * 1000:7.3f}ms | "
+              f"zero-copy {new_bytes:>6d} B/frame {new_time * 1000:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from app.services.template_store import TemplateStore
+from app.utils.metrics import LatencyStats
+from app.utils.vision import match_template, pyramid_match
+
+## run: python -m app.benchmarks.bench_pyramid [--frames dir/of/recorded/frames] [--template 笑脸]
+##
+## Compares exhaustive and pyramid full-window search on recorded frames (or synthetic frames with
+## the template pasted at random positions when no directory is given).
+
+IMAGES_DIR = Path(__file__).resolve().parents[3] / "public" / "images"
+
+
+def load_frames(frames_dir: Path):
+    for path in sorted(frames_dir.iterdir()):
+        if path.suffix.lower() in (".png", ".jpg", ".bmp"):
+            frame = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if frame is not None:
+                yield path.name, frame
+
+
+def synthetic_frames(template: np.ndarray, count: int):
+    rng = np.random.default_rng(0)
+    height, width = template.shape
+    for i in range(count):
+        frame = cv2.GaussianBlur(rng.integers(0, 255, size=(637, 1056), dtype=np.uint8), (0, 0), 3)
+        x, y = int(rng.integers(0, 1056 - width)), int(rng.integers(0, 637 - height))
+        frame[y:y + height, x:x + width] = template
+        yield f"synthetic_{i}", frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exhaustive vs pyramid template search")
+    parser.add_argument("--frames", help="directory of recorded full-window frames")
+    parser.add_argument("--template", default="笑脸")
+    parser.add_argument("--images", default=str(IMAGES_DIR), help="template images directory")
+    parser.add_argument("--count", type=int, default=50, help="number of synthetic frames")
+    args = parser.parse_args()
+
+    template = TemplateStore(Path(args.images)).get(args.template)
+    frames = load_frames(Path(args.frames)) if args.frames else synthetic_frames(template, args.count)
+
+    exhaustive_latency, pyramid_latency = LatencyStats(), LatencyStats()
+    total, disagreements, max_delta = 0, 0, 0.0
+    for name, frame in frames:
+        start = time.perf_counter()
+        exhaustive_val, exhaustive_loc = match_template(frame, template)
+        exhaustive_latency.record(time.perf_counter() - start)
+        start = time.perf_counter()
+        pyramid_val, pyramid_loc = pyramid_match(frame, template)
+        pyramid_latency.record(time.perf_counter() - start)
+
+        total += 1
+        max_delta = max(max_delta, exhaustive_val - pyramid_val)
+        if exhaustive_loc != pyramid_loc:
+            disagreements += 1
+            print(f"{name}: exhaustive {exhaustive_val:.3f}@{exhaustive_loc} pyramid {pyramid_val:.3f}@{pyramid_loc}")
+
+    print(f"exhaustive: {exhaustive_latency.snapshot()}")
+    print(f"pyramid:    {pyramid_latency.snapshot()}")
+    print(f"{total} frames, {disagreements} location disagreements, max confidence loss {max_delta:.4f}")
+
+
+if __name__ == "__main__":
+    main()
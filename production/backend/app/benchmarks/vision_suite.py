@@ -0,0 +1,218 @@
+import argparse
+import json
+import sys
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from app.services.detector_service import ChangeGate, DetectorRegistry, DetectorService
+from app.services.template_store import TemplateStore
+from app.utils.metrics import LatencyStats
+from app.utils.vision import find_template
+
+## run: python -m app.benchmarks.vision_suite --corpus dir/of/frames [--baseline file] [--save-baseline]
+##      python -m app.benchmarks.vision_suite --synthetic
+##
+## Replays recorded full-window frames through every screen detector (public/detectors.json) and the
+## find_image search, and reports per-detector latency percentiles, confidence margins and
+## misclassifications. Exits with 1 when latency or accuracy regressed beyond the stored baseline.
+##
+## Corpus layout: <corpus>/<profile>/<label>/*.png, profile is native or thunder and label one of
+## LABELS below. An optional <corpus>/expected.json overrides what a frame should match:
+##     {"thunder/ice_castle/0003.png": ["is_in_ice_castle", "ice_need_buy_round"]}
+## The baseline defaults to <corpus>/baseline.json, or vision_baseline.json next to this file for --synthetic.
+
+PUBLIC_DIR = Path(__file__).resolve().parents[3] / "public"
+SYNTHETIC_BASELINE = Path(__file__).resolve().parent / "vision_baseline.json"
+FIND_IMAGE = "find_image:笑脸"  # the in-game check of /is-in-game
+
+# Detectors (and find_image searches) expected to match on each screen
+LABELS: Dict[str, Set[str]] = {
+    "home": {"is_home"},
+    "ads": {"need_ads"},
+    "ice_buy_round": {"ice_need_buy_round"},
+    "ice_castle": {"is_in_ice_castle"},
+    "moon_island": {"is_in_moon_island"},
+    "whirlpool": {"is_in_whirlpool"},
+    "in_game": {FIND_IMAGE},
+    "other": set(),
+}
+
+Frame = Tuple[str, str, np.ndarray, Set[str]]  # (frame id, profile, gray frame, expected matches)
+
+
+def load_corpus(corpus_dir: Path) -> Iterator[Frame]:
+    overrides_path = corpus_dir / "expected.json"
+    overrides = json.loads(overrides_path.read_text(encoding="utf-8")) if overrides_path.exists() else {}
+    for path in sorted(corpus_dir.glob("*/*/*")):
+        profile, label = path.parent.parent.name, path.parent.name
+        if label not in LABELS or path.suffix.lower() not in (".png", ".jpg", ".bmp"):
+            continue
+        frame = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            continue
+        frame_id = path.relative_to(corpus_dir).as_posix()
+        yield frame_id, profile, frame, set(overrides.get(frame_id, LABELS[label]))
+
+
+def synthetic_corpus(registry: DetectorRegistry, templates: TemplateStore, per_label: int = 5) -> Iterator[Frame]:
+    """Noise frames with the label's templates pasted into their detector regions."""
+    rng = np.random.default_rng(0)
+    for profile in ("native", "thunder"):
+        for label, expected in LABELS.items():
+            expected = {name for name in expected if name == FIND_IMAGE or registry.get(name, profile)}
+            if LABELS[label] and not expected:
+                continue  # e.g. no native whirlpool detector
+            for i in range(per_label):
+                frame = cv2.GaussianBlur(rng.integers(0, 255, size=(637, 1056), dtype=np.uint8), (0, 0), 3)
+                for name in expected:
+                    if name == FIND_IMAGE:
+                        template = templates.get(FIND_IMAGE.split(":", 1)[1])
+                        x, y = int(rng.integers(0, 1056 - template.shape[1])), int(rng.integers(0, 637 - template.shape[0]))
+                    else:
+                        detector = registry.get(name, profile)
+                        template = templates.get(detector.template)
+                        x, y, width, height = detector.region
+                        # centered in the region; a template larger than its region is pasted anyway
+                        x, y = x + max(width - template.shape[1], 0) // 2, y + max(height - template.shape[0], 0) // 2
+                    frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+                yield f"synthetic/{profile}/{label}/{i}", profile, frame, expected
+
+
+class VisionSuite:
+    """Runs frames through the detectors and find_image, collecting latency and margins per check."""
+
+    def __init__(self, registry: DetectorRegistry, templates: TemplateStore, find_confidence: float = 0.8):
+        self.registry = registry
+        self.templates = templates
+        self.find_confidence = find_confidence
+        self._frame: Optional[np.ndarray] = None
+        # gate disabled: every evaluation pays the full matching cost
+        self.detectors = DetectorService(self._capture, registry, templates, ChangeGate(tolerance=None))
+        self.latency: Dict[str, LatencyStats] = {}
+        self.margins: Dict[str, List[float]] = {}
+        self.misclassified: Dict[str, List[str]] = {}
+
+    def _capture(self, hwnd: int, region) -> np.ndarray:
+        if region is None:
+            return self._frame
+        x, y, width, height = region
+        return self._frame[y:y + height, x:x + width]
+
+    def _record(self, check: str, frame_id: str, elapsed: float, confidence: float, threshold: float,
+                expected: bool) -> None:
+        self.latency.setdefault(check, LatencyStats(window=100_000)).record(elapsed)
+        # signed distance to the threshold on the correct side, negative when misclassified
+        margin = confidence - threshold if expected else threshold - confidence
+        self.margins.setdefault(check, []).append(margin)
+        self.misclassified.setdefault(check, [])
+        if (confidence > threshold) != expected:
+            self.misclassified[check].append(f"{frame_id} ({confidence:.3f})")
+
+    def run_frame(self, frame_id: str, profile: str, frame: np.ndarray, expected: Set[str]) -> None:
+        self._frame = frame
+        for name in self.registry.names():
+            detector = self.registry.get(name, profile)
+            if detector is None:
+                continue
+            result = self.detectors.evaluate(0, name, profile)
+            self._record(name, frame_id, result.elapsed, result.confidence, detector.threshold, name in expected)
+
+        template = self.templates.get(FIND_IMAGE.split(":", 1)[1])
+        for search in ("exhaustive", "pyramid"):
+            start = time.perf_counter()
+            confidence, _ = find_template(frame, template, search)
+            self._record(f"{FIND_IMAGE}:{search}", frame_id, time.perf_counter() - start, confidence,
+                         self.find_confidence, FIND_IMAGE in expected)
+
+    def report(self) -> Dict[str, Dict]:
+        report = {}
+        for check in sorted(self.latency):
+            stats = self.latency[check].snapshot()
+            report[check] = {
+                "frames": stats["count"],
+                "p50_ms": stats["p50_ms"],
+                "p95_ms": stats["p95_ms"],
+                "p99_ms": stats["p99_ms"],
+                "min_margin": round(min(self.margins[check]), 4),
+                "misclassified": len(self.misclassified[check]),
+            }
+        return report
+
+
+def compare(report: Dict[str, Dict], baseline: Dict[str, Dict], latency_tolerance: float = 0.5,
+            latency_slack_ms: float = 0.5, margin_tolerance: float = 0.05) -> List[str]:
+    """Regressions of `report` against `baseline`, empty when nothing regressed."""
+    regressions = []
+    for check, base in baseline.items():
+        current = report.get(check)
+        if current is None:
+            regressions.append(f"{check}: missing from the run")
+            continue
+        allowed_ms = base["p95_ms"] * (1 + latency_tolerance) + latency_slack_ms
+        if current["p95_ms"] > allowed_ms:
+            regressions.append(f"{check}: p95 {current['p95_ms']:.3f}ms > {allowed_ms:.3f}ms allowed")
+        if current["misclassified"] > base["misclassified"]:
+            regressions.append(f"{check}: {current['misclassified']} misclassified > {base['misclassified']} in baseline")
+        if current["min_margin"] < base["min_margin"] - margin_tolerance:
+            regressions.append(f"{check}: min margin {current['min_margin']:.4f} < baseline {base['min_margin']:.4f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Detector and find_image latency/accuracy over a frame corpus")
+    parser.add_argument("--corpus", help="directory of recorded frames, <profile>/<label>/*.png")
+    parser.add_argument("--synthetic", action="store_true", help="use synthetic frames built from the templates")
+    parser.add_argument("--images", default=str(PUBLIC_DIR / "images"), help="template images directory")
+    parser.add_argument("--detectors", default=str(PUBLIC_DIR / "detectors.json"))
+    parser.add_argument("--baseline", help="baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="allowed relative p95 increase")
+    parser.add_argument("--verbose", action="store_true", help="list misclassified frames")
+    args = parser.parse_args()
+    if not args.corpus and not args.synthetic:
+        parser.error("--corpus or --synthetic is required")
+
+    registry = DetectorRegistry.from_file(Path(args.detectors))
+    templates = TemplateStore(Path(args.images))
+    frames = load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(registry, templates)
+    suite = VisionSuite(registry, templates)
+    count = 0
+    for frame in frames:
+        suite.run_frame(*frame)
+        count += 1
+    if not count:
+        print("No frames found")
+        return 1
+
+    report = suite.report()
+    print(f"{count} frames")
+    print(f"{'check':34s} {'frames':>6s} {'p50_ms':>8s} {'p95_ms':>8s} {'p99_ms':>8s} {'margin':>8s} {'wrong':>5s}")
+    for check, row in report.items():
+        print(f"{check:34s} {row['frames']:6d} {row['p50_ms']:8.3f} {row['p95_ms']:8.3f} {row['p99_ms']:8.3f} "
+              f"{row['min_margin']:8.4f} {row['misclassified']:5d}")
+        if args.verbose:
+            for frame_id in suite.misclassified[check]:
+                print(f"    misclassified {frame_id}")
+
+    if args.baseline:
+        baseline_path = Path(args.baseline)
+    else:
+        baseline_path = Path(args.corpus) / "baseline.json" if args.corpus else SYNTHETIC_BASELINE
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}, run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(report, json.loads(baseline_path.read_text(encoding="utf-8")), args.latency_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 class AppConfig:
-    is_thunder_player: bool = False
+    frame_cache_ttl: float = 0.2  # seconds a captured frame is reused for the same window, 0 to disable
+    fleet_max_active: int = 2  # window pairs of the fleet running a flow at the same time
+    fleet_capture_rate: float = 20.0  # captures per second of one pair of the fleet, 0 for no limit
 
 
 config = AppConfig()
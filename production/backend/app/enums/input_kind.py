@@ -0,0 +1,8 @@
+from enum import Enum
+
+## 输入指令类型
+class InputKind(Enum):
+    CLICK = "click"  # 鼠标点击
+    MOVE = "move"    # 鼠标移动
+    KEY = "key"      # 按键
+    TEXT = "text"    # 输入文字
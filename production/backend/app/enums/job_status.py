@@ -0,0 +1,9 @@
+from enum import Enum
+
+## 后台任务状态
+class JobStatus(Enum):
+    PENDING = "pending"      # 排队中
+    RUNNING = "running"      # 执行中
+    SUCCEEDED = "succeeded"  # 已完成
+    FAILED = "failed"        # 失败
+    CANCELLED = "cancelled"  # 已取消
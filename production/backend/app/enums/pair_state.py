@@ -0,0 +1,7 @@
+from enum import Enum
+
+## 多开窗口组状态
+class PairState(Enum):
+    IDLE = "idle"        # 空闲
+    WAITING = "waiting"  # 等待空闲名额
+    RUNNING = "running"  # 执行中
@@ -0,0 +1,6 @@
+from enum import Enum
+
+## 客户端类型
+class PlayerProfile(Enum):
+    NATIVE = "native"    # 原生客户端
+    THUNDER = "thunder"  # 雷电模拟器
@@ -0,0 +1,18 @@
+from typing import Tuple
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class Detector:
+    name: str  # is_home, need_ads, ...
+    profile: str  # PlayerProfile value
+    region: Tuple[int, int, int, int]  # (x, y, width, height) in window coordinates
+    template: str  # Template image name under public/images
+    threshold: float  # Matched when confidence > threshold
+    log: bool = False  # Log the confidence of every evaluation
+
+@dataclass
+class DetectionResult:
+    name: str
+    matched: bool
+    confidence: float
+    elapsed: float  # Seconds spent on capture and matching
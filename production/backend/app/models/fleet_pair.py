@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.enums.pair_state import PairState
+from app.services.capture_service import CaptureBudget
+
+@dataclass
+class FleetPair:
+    idx: int  # Position of the pair, as tiled by /locate-auto-window
+    main: Dict[str, str]  # {'game': hwnd, 'tool': hwnd} of the room owner
+    sub: Dict[str, str]  # {'game': hwnd, 'tool': hwnd} of the window joining the room
+    worker: ThreadPoolExecutor = field(repr=False)  # Runs the flows of this pair, one at a time
+    budget: CaptureBudget = field(repr=False)  # Captures of both windows while a flow runs
+    state: PairState = PairState.IDLE
+    job_id: Optional[str] = None  # Last job started for the pair
+    starts: int = 0
+    failures: int = 0
+    started_at: List[float] = field(default_factory=list, repr=False)  # Times of the successful starts
+
+    def to_dict(self) -> Dict:
+        return {
+            "idx": self.idx,
+            "main": self.main,
+            "sub": self.sub,
+            "state": self.state.value,
+            "job_id": self.job_id,
+            "starts": self.starts,
+            "failures": self.failures,
+            "capture": self.budget.stats(),
+        }
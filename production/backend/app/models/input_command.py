@@ -0,0 +1,16 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from app.enums.input_kind import InputKind
+
+@dataclass
+class InputCommand:
+    kind: InputKind
+    at: float  # time.perf_counter() deadline to execute at
+    x: int = 0  # Window coordinates, for click and move
+    y: int = 0
+    value: Optional[str] = None  # Key name for key, text for text
+    callback: Optional[Callable[[], Any]] = field(default=None, repr=False)  # Called right after execution
+    executed_at: Optional[float] = None
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
@@ -0,0 +1,55 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.enums.job_status import JobStatus
+
+@dataclass
+class JobStep:
+    name: str  # create_room, enter_room, ...
+    started_at: float  # Seconds since the job started
+    elapsed: Optional[float] = None  # Seconds, None while the step runs
+
+@dataclass
+class Job:
+    id: str
+    kind: str  # start_auto_game, start_auto_battle, ...
+    params: Dict[str, Any]
+    total_steps: Optional[int] = None  # Expected number of steps, for progress
+    status: JobStatus = JobStatus.PENDING
+    steps: List[JobStep] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = sum(1 for step in self.steps if step.elapsed is not None)
+        if self.status == JobStatus.SUCCEEDED:
+            progress = 1.0
+        elif self.total_steps:
+            progress = round(min(completed / self.total_steps, 0.99), 2)
+        else:
+            progress = None
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status.value,
+            "progress": progress,
+            "steps": [
+                {"name": step.name, "started_ms": round(step.started_at * 1000),
+                 "elapsed_ms": round(step.elapsed * 1000) if step.elapsed is not None else None}
+                for step in list(self.steps)
+            ],
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "elapsed_ms": round(((self.finished_at or time.time()) - self.started_at) * 1000) if self.started_at else None,
+        }
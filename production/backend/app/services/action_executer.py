@@ -1,9 +1,14 @@
+import time
 from app.services.game_service import GameService
+from app.enums.game_positions import GamePositions
+from app.enums.shortcut_positions import GameMode
+from app.services.vehicle_service import same_row
 from app.enums.command_types import CommandType, FormationType
 
 class ActionExecuter:
-    def __init__(self, pid):
+    def __init__(self, pid, mode=GameMode.SINGLE_PLAYER.value):
         self.pid = pid
+        self.mode = mode
 
     def execute(self, actions):
         """
@@ -169,13 +174,33 @@ class ActionExecuter:
         layout = [deployed, [None]*len(deployed)]
         return layout, {}
 
+    def get_next_card_batch(self, retries=5, interval=0.1):
+        """
+        识别当前手牌 CARD_0..CARD_2，返回可用卡牌名称列表。
+        刷新后卡牌有入场动画，未能识别全部卡位时短暂重试。
+        """
+        cards = GameService.recognize_cards(self.pid)
+        for _ in range(retries):
+            if None not in cards:
+                break
+            time.sleep(interval)
+            # a new frame every retry, the cached one may still show the entry animation
+            cards = GameService.recognize_cards(self.pid, fresh=True)
+        return [card for card in cards if card is not None]
+
+    def refresh_cards(self):
+        """
+        点击刷新卡片
+        """
+        GameService.click_in_window(self.pid, GamePositions.REFRESH_CARD.value)
+
     def check_same_row(self, deployed_cards):
         """
-        检查传入卡牌是否在同一排，需根据实际车辆布局实现。
-        这里假设所有卡牌都能部署到同排，实际应根据车辆状态判断。
+        检查传入卡牌是否在同一排：读取己方车辆状态，已在车上的卡牌必须位于同一行，
+        尚未上车的卡牌不影响判断。
         """
-        # TODO: 实现真实同排判断逻辑
-        return True
+        state = GameService.read_vehicles(self.pid, self.mode)
+        return same_row(state, self.mode, deployed_cards)
 
     def handle_formation(self, action, card_ops=None):
         """
@@ -197,7 +222,6 @@ class ActionExecuter:
         pass
 
     def handle_delay(self, action):
-        import time
         ms = action.get('ms', 0)
         time.sleep(ms / 1000.0)
 
@@ -0,0 +1,429 @@
+import contextvars
+import ctypes
+import sys
+import time
+import cv2
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from app.config import config
+from app.utils.buffer_pool import buffer_pools
+from app.utils.logger import logger
+from app.utils.metrics import LatencyStats, metrics
+
+Region = Tuple[int, int, int, int]
+
+
+def clip_region(region: Optional[Region], width: int, height: int) -> Region:
+    """Clip (x, y, width, height) to the window, `None` meaning the whole window."""
+    if region is None:
+        return 0, 0, width, height
+    x, y, w, h = region
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+def bgrx_to_gray(frame: np.ndarray, region: Optional[Region], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert `region` of a (height, width, 4) BGRX frame to grayscale.
+
+    The region is sliced as a view first, so only its pixels are read, and converted straight
+    into `out` when it has the right shape.
+    """
+    height, width = frame.shape[:2]
+    x, y, w, h = clip_region(region, width, height)
+    if out is None or out.shape != (h, w):
+        out = np.empty((h, w), dtype=np.uint8)
+    if w == 0 or h == 0:
+        return out
+    return cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGRA2GRAY, dst=out)
+
+
+class CaptureBackend:
+    """
+    Interface of the window capture backends. Frames are returned as 2D uint8 grayscale arrays.
+
+    Every capture returns a newly allocated array: frames are shared through the FrameCache and
+    held by other threads, so they are never overwritten by a later capture.
+    """
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        """Return (width, height) of the window."""
+        raise NotImplementedError
+
+    def grab(self, hwnd: int, region: Optional[Region]) -> np.ndarray:
+        """Capture `region` (x, y, width, height) of the window, `None` for the whole window."""
+        raise NotImplementedError
+
+    def release(self, hwnd: Optional[int] = None) -> None:
+        """Free resources held for one window, or for every window."""
+
+
+class _Win32Context:
+    """Memory DC and top-down 32-bit DIB section kept alive between captures of one window."""
+
+    def __init__(self, api, hwnd: int, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.lock = Lock()
+        self.closed = False
+        self._api = api
+        # the window DC is only needed to create the compatible memory DC
+        hwnd_dc = api.user32.GetWindowDC(hwnd)
+        try:
+            self.memory_dc = api.gdi32.CreateCompatibleDC(hwnd_dc)
+            header = api.BITMAPINFOHEADER()
+            header.biSize = ctypes.sizeof(api.BITMAPINFOHEADER)
+            header.biWidth = width
+            header.biHeight = -height  # top-down rows, same order as numpy
+            header.biPlanes = 1
+            header.biBitCount = 32
+            header.biCompression = 0  # BI_RGB
+            bits = ctypes.c_void_p()
+            self.bitmap = api.gdi32.CreateDIBSection(hwnd_dc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+            if not self.bitmap or not bits.value:
+                api.gdi32.DeleteDC(self.memory_dc)
+                raise Exception(f"Failed to create DIB section for window {hwnd}")
+            self.previous_bitmap = api.gdi32.SelectObject(self.memory_dc, self.bitmap)
+        finally:
+            api.user32.ReleaseDC(hwnd, hwnd_dc)
+        # BGRX pixels of the DIB section, viewed in place
+        buffer = (ctypes.c_ubyte * (width * height * 4)).from_address(bits.value)
+        self.frame = np.ctypeslib.as_array(buffer).reshape(height, width, 4)
+
+    def close(self):
+        """Free the DC and DIB section; call it holding `lock`."""
+        self.closed = True
+        self.frame = None
+        self._api.gdi32.SelectObject(self.memory_dc, self.previous_bitmap)
+        self._api.gdi32.DeleteObject(self.bitmap)
+        self._api.gdi32.DeleteDC(self.memory_dc)
+
+
+class _Win32Api:
+    """ctypes bindings of the few GDI calls used for capturing."""
+
+    def __init__(self):
+        from ctypes import wintypes, windll
+
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [
+                ("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
+                ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
+                ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG),
+                ("biYPelsPerMeter", wintypes.LONG), ("biClrUsed", wintypes.DWORD),
+                ("biClrImportant", wintypes.DWORD),
+            ]
+
+        self.BITMAPINFOHEADER = BITMAPINFOHEADER
+        self.user32 = windll.user32
+        self.gdi32 = windll.gdi32
+        handle = ctypes.c_void_p
+        self.user32.GetWindowDC.argtypes = [wintypes.HWND]
+        self.user32.GetWindowDC.restype = handle
+        self.user32.ReleaseDC.argtypes = [wintypes.HWND, handle]
+        self.user32.PrintWindow.argtypes = [wintypes.HWND, handle, wintypes.UINT]
+        self.user32.PrintWindow.restype = wintypes.BOOL
+        self.gdi32.CreateCompatibleDC.argtypes = [handle]
+        self.gdi32.CreateCompatibleDC.restype = handle
+        self.gdi32.CreateDIBSection.argtypes = [handle, ctypes.c_void_p, wintypes.UINT,
+                                                ctypes.POINTER(ctypes.c_void_p), handle, wintypes.DWORD]
+        self.gdi32.CreateDIBSection.restype = handle
+        self.gdi32.SelectObject.argtypes = [handle, handle]
+        self.gdi32.SelectObject.restype = handle
+        self.gdi32.DeleteObject.argtypes = [handle]
+        self.gdi32.DeleteDC.argtypes = [handle]
+
+
+class Win32CaptureBackend(CaptureBackend):
+    """
+    PrintWindow based capture keeping per-window memory DCs and DIB sections alive between calls.
+
+    The resources are rebuilt only when the window size changes. PrintWindow always renders the
+    whole window into the DIB section; its BGRX pixels are viewed in place as a numpy array and only
+    the requested rectangle is read and converted to grayscale.
+    """
+
+    def __init__(self):
+        import win32gui
+        self._win32gui = win32gui
+        self._api = _Win32Api()
+        self._contexts: Dict[int, _Win32Context] = {}
+        self._lock = Lock()
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        left, top, right, bottom = self._win32gui.GetWindowRect(hwnd)
+        return right - left, bottom - top
+
+    def _context(self, hwnd: int, width: int, height: int) -> _Win32Context:
+        with self._lock:
+            context = self._contexts.get(hwnd)
+            if context is not None and (context.width, context.height) != (width, height):
+                logger.info(f"[Capture] Window {hwnd} resized to {width}x{height}, rebuilding capture context")
+                with context.lock:
+                    context.close()
+                context = None
+            if context is None:
+                context = _Win32Context(self._api, hwnd, width, height)
+                self._contexts[hwnd] = context
+            return context
+
+    def grab(self, hwnd: int, region: Optional[Region]) -> np.ndarray:
+        while True:
+            width, height = self.window_size(hwnd)
+            context = self._context(hwnd, width, height)
+            with context.lock:
+                if context.closed:
+                    # closed by another thread (resize or release) since it was handed out
+                    continue
+                if not self._api.user32.PrintWindow(hwnd, context.memory_dc, 2):
+                    raise Exception("Failed to capture window contents")
+                self._api.gdi32.GdiFlush()
+                return bgrx_to_gray(context.frame, region)
+
+    def release(self, hwnd: Optional[int] = None) -> None:
+        with self._lock:
+            hwnds = list(self._contexts) if hwnd is None else [hwnd]
+            for key in hwnds:
+                context = self._contexts.pop(key, None)
+                if context is not None:
+                    with context.lock:
+                        context.close()
+
+
+class FakeCaptureBackend(CaptureBackend):
+    """
+    Capture backend serving frames from arrays or image files, for tests and benchmarks off Windows.
+
+    Frames are kept as BGRX buffers, the same layout PrintWindow produces.
+    """
+
+    def __init__(self, frames: Optional[Dict[int, Union[np.ndarray, str, Path]]] = None):
+        self._frames: Dict[int, np.ndarray] = {}
+        self.grabs = 0
+        for hwnd, frame in (frames or {}).items():
+            self.set_frame(hwnd, frame)
+
+    @staticmethod
+    def to_bgrx(frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 2:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+        if frame.shape[2] == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        return np.ascontiguousarray(frame)
+
+    def set_frame(self, hwnd: int, frame: Union[np.ndarray, str, Path]) -> None:
+        """Serve `frame` (grayscale/BGR/BGRX array or image file path) for the window."""
+        if not isinstance(frame, np.ndarray):
+            frame = cv2.imdecode(np.fromfile(str(frame), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"Can't decode frame image for window {hwnd}")
+        self._frames[hwnd] = self.to_bgrx(frame)
+
+    def _frame(self, hwnd: int) -> np.ndarray:
+        frame = self._frames.get(hwnd)
+        if frame is None:
+            raise Exception(f"No frame for window {hwnd}")
+        return frame
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        height, width = self._frame(hwnd).shape[:2]
+        return width, height
+
+    def grab(self, hwnd: int, region: Optional[Region]) -> np.ndarray:
+        frame = self._frame(hwnd)
+        self.grabs += 1
+        return bgrx_to_gray(frame, region)
+
+    def release(self, hwnd: Optional[int] = None) -> None:
+        if hwnd is None:
+            self._frames.clear()
+        else:
+            self._frames.pop(hwnd, None)
+
+
+class FrameCache:
+    """
+    Last captured frames per window, reused while younger than the TTL.
+
+    A request for a region is served by a fresh capture of the same region, or sliced out of a
+    fresh full-window capture. Entries of a window are dropped as soon as input is sent to it.
+    """
+
+    def __init__(self):
+        self._frames: Dict[int, Dict[Optional[Region], Tuple[float, np.ndarray]]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, hwnd: int, region: Optional[Region], max_age: float) -> Optional[np.ndarray]:
+        if max_age <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            frames = self._frames.get(hwnd)
+            if frames:
+                entry = frames.get(region)
+                if entry is not None and now - entry[0] <= max_age:
+                    self.hits += 1
+                    return entry[1]
+                full = frames.get(None)
+                if full is not None and now - full[0] <= max_age:
+                    self.hits += 1
+                    frame = full[1]
+                    x, y, w, h = clip_region(region, frame.shape[1], frame.shape[0])
+                    return frame[y:y + h, x:x + w]
+            self.misses += 1
+            return None
+
+    def put(self, hwnd: int, region: Optional[Region], image: np.ndarray) -> None:
+        with self._lock:
+            self._frames.setdefault(hwnd, {})[region] = (time.monotonic(), image)
+
+    def invalidate(self, hwnd: Optional[int] = None) -> None:
+        with self._lock:
+            if hwnd is None:
+                self._frames.clear()
+            elif self._frames.pop(hwnd, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+
+class CaptureBudget:
+    """
+    Token bucket limiting the captures of a group of windows, e.g. one pair of the fleet.
+
+    Up to `burst` captures go through at once, then one every 1/`rate` seconds; a capture over the
+    budget waits for its token. Frames served from the FrameCache don't use the budget.
+    """
+
+    def __init__(self, rate: float, burst: int = 4, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = Lock()
+        self.captures = 0
+        self.throttled = 0
+        self.throttled_s = 0.0
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.captures += 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+                self.throttled += 1
+                self.throttled_s += delay
+            self._sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "captures": self.captures,
+                "throttled": self.throttled,
+                "throttled_ms": round(self.throttled_s * 1000, 1),
+            }
+
+
+_capture_budget: contextvars.ContextVar[Optional[CaptureBudget]] = contextvars.ContextVar("capture_budget", default=None)
+
+
+@contextmanager
+def capture_budget(budget: Optional[CaptureBudget]):
+    """Charge the captures made in this context (and the flow steps it runs in parallel) to `budget`."""
+    token = _capture_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _capture_budget.reset(token)
+
+
+class CaptureEngine:
+    """Front of the capture backends, timing every capture and reusing frames from the FrameCache."""
+
+    def __init__(self, backend: Optional[CaptureBackend] = None):
+        self._backend = backend
+        self.latency = LatencyStats()
+        self.cache = FrameCache()
+        self._input_listeners: List[Callable[[int], None]] = []
+
+    @property
+    def backend(self) -> CaptureBackend:
+        if self._backend is None:
+            self._backend = Win32CaptureBackend() if sys.platform == "win32" else FakeCaptureBackend()
+        return self._backend
+
+    def set_backend(self, backend: CaptureBackend) -> None:
+        if self._backend is not None:
+            self._backend.release()
+        self._backend = backend
+
+    def capture(self, hwnd: int, region: Optional[Region] = None, max_age: Optional[float] = None) -> np.ndarray:
+        """
+        Capture a grayscale image of `region` (x, y, width, height) of the window, `None` for all of it.
+
+        A cached frame younger than `max_age` seconds (default: config.frame_cache_ttl) is reused,
+        pass 0 to force a new capture.
+        """
+        if max_age is None:
+            max_age = config.frame_cache_ttl
+        image = self.cache.get(hwnd, region, max_age)
+        if image is not None:
+            return image
+
+        budget = _capture_budget.get()
+        if budget is not None and budget.rate > 0:
+            budget.acquire()
+        start = time.perf_counter()
+        image = self.backend.grab(hwnd, region)
+        self.latency.record(time.perf_counter() - start)
+        self.cache.put(hwnd, region, image)
+        return image
+
+    def invalidate(self, hwnd: Optional[int] = None) -> None:
+        """Forget cached frames of the window, e.g. to poll a new frame."""
+        self.cache.invalidate(hwnd)
+
+    def add_input_listener(self, listener: Callable[[int], None]) -> None:
+        """Call `listener(hwnd)` whenever input was sent to a window, to drop state derived from its frames."""
+        self._input_listeners.append(listener)
+
+    def input_sent(self, hwnd: int) -> None:
+        """Forget cached frames of the window and notify the input listeners, after sending input to it."""
+        self.cache.invalidate(hwnd)
+        for listener in self._input_listeners:
+            listener(hwnd)
+
+    def release(self, hwnd: Optional[int] = None) -> None:
+        self.cache.invalidate(hwnd)
+        if self._backend is not None:
+            self._backend.release(hwnd)
+        buffer_pools.release(hwnd)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "latency": self.latency.snapshot(),
+            "cache": self.cache.stats(),
+        }
+
+
+# Create a global capture engine instance
+capture_engine = CaptureEngine()
+metrics.register("capture", capture_engine.stats)
@@ -0,0 +1,142 @@
+import sys
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+from app.enums.game_positions import GamePositions
+from app.services.template_store import TemplateStore, template_store
+from app.utils.logger import logger
+from app.utils.metrics import LatencyStats
+
+Region = Tuple[int, int, int, int]
+CaptureFn = Callable[[int, Optional[Region]], np.ndarray]
+
+CARD_SLOTS = (GamePositions.CARD_0, GamePositions.CARD_1, GamePositions.CARD_2)
+SLOT_SIZE = (64, 80)  # (width, height) of the card crop centered on a CARD_x position
+
+
+def slot_regions() -> List[Region]:
+    """Regions (x, y, width, height) of the three card slots in the window."""
+    width, height = SLOT_SIZE
+    return [(slot.value[0] - width // 2, slot.value[1] - height // 2, width, height) for slot in CARD_SLOTS]
+
+
+class CardIndex:
+    """
+    Card portrait descriptors stacked into one matrix.
+
+    A descriptor is the portrait area-downsampled to DESCRIPTOR_SIZE, zero-mean and unit length, so
+    the dot product of two descriptors is their normalized correlation.
+    """
+
+    DESCRIPTOR_SIZE = (24, 30)  # (width, height)
+
+    def __init__(self, portraits: Dict[str, np.ndarray]):
+        self.names = sorted(portraits)
+        size = self.DESCRIPTOR_SIZE[0] * self.DESCRIPTOR_SIZE[1]
+        self.matrix = np.stack([self.descriptor(portraits[name]) for name in self.names]) \
+            if self.names else np.zeros((0, size), dtype=np.float32)
+
+    @classmethod
+    def from_templates(cls, templates: TemplateStore = template_store, folder: str = "cards") -> "CardIndex":
+        """Index every public/images/<folder>/<name>.jpg portrait."""
+        portraits = {}
+        portraits_dir = templates.images_dir / folder
+        if portraits_dir.is_dir():
+            for path in sorted(portraits_dir.glob("*.jpg")):
+                portraits[path.stem] = templates.get(f"{folder}/{path.stem}")
+        return cls(portraits)
+
+    @classmethod
+    def descriptor(cls, image: np.ndarray) -> np.ndarray:
+        vector = cv2.resize(image, cls.DESCRIPTOR_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class CardRecognizer:
+    """Recognizes the cards in hand (CARD_0..CARD_2) from one capture of the window."""
+
+    def __init__(self, capture: CaptureFn, templates: TemplateStore = template_store,
+                 min_confidence: float = 0.8, index: Optional[CardIndex] = None):
+        self._capture = capture
+        self._templates = templates
+        self.min_confidence = min_confidence
+        self._index = index
+        self._lock = Lock()
+        self.latency = LatencyStats()
+        self.capture_latency = LatencyStats()
+
+    @property
+    def index(self) -> CardIndex:
+        with self._lock:
+            if self._index is None:
+                self._index = CardIndex.from_templates(self._templates)
+                if not len(self._index):
+                    logger.warning("[CardRecognizer] No card portraits under images/cards")
+            return self._index
+
+    def reload(self) -> None:
+        """Rebuild the portrait index on next use, e.g. after new portraits were harvested."""
+        with self._lock:
+            self._index = None
+
+    def recognize_frame(self, frame: np.ndarray) -> List[Tuple[Optional[str], float]]:
+        """Return (card name or None, confidence) per slot of a full-window frame."""
+        start = time.perf_counter()
+        index = self.index
+        if not len(index):
+            return [(None, 0.0)] * len(CARD_SLOTS)
+
+        crops = [frame[y:y + height, x:x + width] for x, y, width, height in slot_regions()]
+        # one nearest-neighbour pass: (slots x D) @ (D x cards)
+        scores = np.stack([CardIndex.descriptor(crop) for crop in crops]) @ index.matrix.T
+        best = scores.argmax(axis=1)
+        results = []
+        for slot, card in enumerate(best):
+            confidence = float(scores[slot, card])
+            results.append((index.names[card] if confidence >= self.min_confidence else None, confidence))
+        self.latency.record(time.perf_counter() - start)
+        return results
+
+    def recognize(self, hwnd: int) -> List[Tuple[Optional[str], float]]:
+        """Capture the window once and recognize the three card slots."""
+        start = time.perf_counter()
+        frame = self._capture(hwnd, None)
+        self.capture_latency.record(time.perf_counter() - start)
+        return self.recognize_frame(frame)
+
+    def stats(self) -> Dict:
+        return {
+            "cards": len(self._index) if self._index is not None else 0,
+            "recognize": self.latency.snapshot(),
+            "frame_capture": self.capture_latency.snapshot(),
+        }
+
+
+def harvest_portraits(frame: np.ndarray, names: List[str], output_dir: Path) -> List[Path]:
+    """Save the slot crops of a frame showing the known cards `names` as card portraits."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    saved = []
+    for name, (x, y, width, height) in zip(names, slot_regions()):
+        if name == "-":
+            continue
+        path = output_dir / f"{name}.jpg"
+        cv2.imencode(".jpg", frame[y:y + height, x:x + width], [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tofile(str(path))
+        saved.append(path)
+    return saved
+
+
+## run: python -m app.services.card_recognizer <frame.png> <card_0> <card_1> <card_2>
+## Harvests card portraits from a captured full-window frame into public/images/cards/ ("-" skips a slot)
+if __name__ == "__main__":
+    frame_path, card_names = sys.argv[1], sys.argv[2:5]
+    full_frame = cv2.imdecode(np.fromfile(frame_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    for saved_path in harvest_portraits(full_frame, card_names, template_store.images_dir / "cards"):
+        print(f"Saved {saved_path}")
@@ -0,0 +1,254 @@
+import json
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.models.detector import Detector, DetectionResult
+from app.services.template_store import TemplateStore, template_store
+from app.services.utility_services import UtilityService
+from app.utils.buffer_pool import buffer_pools
+from app.utils.logger import logger
+from app.utils.metrics import LatencyGroup, LatencyStats
+from app.utils.vision import match_template
+
+Region = Tuple[int, int, int, int]
+CaptureFn = Callable[[int, Optional[Region]], np.ndarray]
+
+
+class DetectorRegistry:
+    """
+    Screen detectors keyed by (detector name, player profile).
+
+    Definitions are plain data, e.g. public/detectors.json:
+        {"is_home": {"native": {"region": [x, y, w, h], "template": "对战", "threshold": 0.95}, ...}}
+    """
+
+    def __init__(self, definitions: Dict[str, Dict[str, Dict]]):
+        self._detectors: Dict[Tuple[str, str], Detector] = {}
+        for name, profiles in definitions.items():
+            for profile, spec in profiles.items():
+                self._detectors[(name, profile)] = Detector(
+                    name=name,
+                    profile=profile,
+                    region=tuple(spec["region"]),
+                    template=spec["template"],
+                    threshold=float(spec["threshold"]),
+                    log=bool(spec.get("log", False)),
+                )
+
+    @classmethod
+    def from_file(cls, path: Path) -> "DetectorRegistry":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    @classmethod
+    def load(cls) -> "DetectorRegistry":
+        """Load the detector definitions from public/detectors.json."""
+        return cls.from_file(UtilityService.get_public_path() / "detectors.json")
+
+    def get(self, name: str, profile: str) -> Optional[Detector]:
+        return self._detectors.get((name, profile))
+
+    def names(self) -> List[str]:
+        return sorted({name for name, _ in self._detectors})
+
+    def profiles(self, name: str) -> List[str]:
+        return sorted(profile for detector_name, profile in self._detectors if detector_name == name)
+
+    def validate(self, templates: TemplateStore, profile: Optional[str] = None) -> List[Detector]:
+        """Log and return the detectors (of `profile`, or all) whose template is larger than their region."""
+        invalid = []
+        for (name, detector_profile), detector in sorted(self._detectors.items()):
+            if profile is not None and detector_profile != profile:
+                continue
+            try:
+                height, width = templates.get(detector.template).shape[:2]
+            except Exception as e:
+                logger.error(f"[DetectorRegistry] Failed to load template {detector.template} of {name}/{detector_profile}: {e}")
+                continue
+            if width > detector.region[2] or height > detector.region[3]:
+                logger.error(f"[DetectorRegistry] Detector {name}/{detector_profile} can never match: template "
+                             f"{detector.template} is {width}x{height}, region is {detector.region[2]}x{detector.region[3]}")
+                invalid.append(detector)
+        return invalid
+
+
+class _GateEntry:
+    __slots__ = ("signature", "template", "confidence")
+
+    def __init__(self, signature: np.ndarray, template: np.ndarray, confidence: float):
+        self.signature = signature
+        self.template = template
+        self.confidence = confidence
+
+
+class ChangeGate:
+    """
+    Skips template matching on regions that did not change since the last evaluation.
+
+    The fingerprint of a region is its 16x16 area-downsampled image. When the mean absolute
+    difference to the previous fingerprint is within `tolerance` gray levels (and the template is
+    the same), the previous confidence is reused. A `tolerance` of None disables the gate.
+    """
+
+    SIGNATURE_SIZE = (16, 16)
+
+    def __init__(self, tolerance: Optional[float] = 1.5):
+        self.tolerance = tolerance
+        self._entries: Dict[Tuple, _GateEntry] = {}
+        self._lock = Lock()
+        self._evaluations: Dict[str, int] = {}
+        self._skips: Dict[str, int] = {}
+
+    def check(self, key: Tuple, name: str, image: np.ndarray, template: np.ndarray) -> Tuple[Optional[float], np.ndarray]:
+        """Return (cached confidence or None, fingerprint of `image`)."""
+        if self.tolerance is None:
+            return None, None
+        signature = cv2.resize(image, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        entry = self._entries.get(key)
+        with self._lock:
+            self._evaluations[name] = self._evaluations.get(name, 0) + 1
+            if entry is not None and entry.template is template and \
+                    cv2.norm(signature, entry.signature, cv2.NORM_L1) / signature.size <= self.tolerance:
+                self._skips[name] = self._skips.get(name, 0) + 1
+                return entry.confidence, signature
+        return None, signature
+
+    def update(self, key: Tuple, signature: Optional[np.ndarray], template: np.ndarray, confidence: float) -> None:
+        if signature is not None:
+            self._entries[key] = _GateEntry(signature, template, confidence)
+
+    def invalidate(self, hwnd: Optional[int] = None) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if hwnd is None or key[0] == hwnd]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            detectors = {
+                name: {
+                    "evaluations": evaluations,
+                    "skips": self._skips.get(name, 0),
+                    "skip_rate": round(self._skips.get(name, 0) / evaluations, 3),
+                }
+                for name, evaluations in self._evaluations.items()
+            }
+        evaluations = sum(stats["evaluations"] for stats in detectors.values())
+        skips = sum(stats["skips"] for stats in detectors.values())
+        return {
+            "evaluations": evaluations,
+            "skips": skips,
+            "skip_rate": round(skips / evaluations, 3) if evaluations else 0.0,
+            "detectors": detectors,
+        }
+
+
+class DetectorService:
+    """Generic evaluation engine: capture a detector's region and match its template."""
+
+    def __init__(self, capture: CaptureFn, registry: Optional[DetectorRegistry] = None,
+                 templates: TemplateStore = template_store, gate: Optional[ChangeGate] = None):
+        self._capture = capture
+        self._registry = registry
+        self._templates = templates
+        self.gate = gate if gate is not None else ChangeGate()
+        self.latency = LatencyGroup()
+        self.capture_latency = LatencyStats()
+
+    @property
+    def registry(self) -> DetectorRegistry:
+        if self._registry is None:
+            self._registry = DetectorRegistry.load()
+            self._registry.validate(self._templates)
+        return self._registry
+
+    def match(self, detector: Detector, image: np.ndarray, hwnd: Optional[int] = None) -> float:
+        """Return the best TM_CCOEFF_NORMED confidence of the detector's template in `image`."""
+        template = self._templates.get(detector.template)
+        if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+            # a region clipped by the window border can't hold the template; a region configured
+            # smaller than the template is reported by DetectorRegistry.validate
+            return 0.0
+
+        if hwnd is None:
+            # frames not captured from a window (e.g. evaluate_frame) are never invalidated by input
+            confidence, _ = match_template(image, template, buffer_pools.for_window(hwnd))
+            return confidence
+
+        key = (hwnd, detector.name, detector.profile)
+        confidence, signature = self.gate.check(key, detector.name, image, template)
+        if confidence is not None:
+            return confidence
+        confidence, _ = match_template(image, template, buffer_pools.for_window(hwnd))
+        self.gate.update(key, signature, template, confidence)
+        return confidence
+
+    def _missing(self, name: str, profile: str) -> DetectionResult:
+        logger.warning(f"[DetectorService] No detector {name} for profile {profile}")
+        return DetectionResult(name, False, 0.0, 0.0)
+
+    def _finish(self, detector: Detector, confidence: float, start: float) -> DetectionResult:
+        elapsed = time.perf_counter() - start
+        self.latency.record(detector.name, elapsed)
+        if detector.log:
+            logger.info(f"[DetectorService] {detector.name} confidence: {confidence}")
+        return DetectionResult(detector.name, confidence > detector.threshold, confidence, elapsed)
+
+    def evaluate(self, hwnd: int, name: str, profile: str) -> DetectionResult:
+        """Evaluate detector `name` for `profile` on window `hwnd`."""
+        detector = self.registry.get(name, profile)
+        if detector is None:
+            return self._missing(name, profile)
+        return self.evaluate_detector(hwnd, detector)
+
+    def evaluate_detector(self, hwnd: int, detector: Detector) -> DetectionResult:
+        """Evaluate an already resolved detector on window `hwnd`, e.g. one of a WindowProfile."""
+        start = time.perf_counter()
+        image = self._capture(hwnd, detector.region)
+        return self._finish(detector, self.match(detector, image, hwnd), start)
+
+    def evaluate_frame(self, frame: np.ndarray, names: Iterable[str], profile: str,
+                       hwnd: Optional[int] = None, detectors: Optional[Dict[str, Detector]] = None
+                       ) -> Dict[str, DetectionResult]:
+        """
+        Evaluate several detectors against one full-window frame.
+
+        Each detector matches on a slice of `frame` (a view, no pixels are copied), so the cost is
+        one capture for the caller plus one small matchTemplate per detector. `detectors` are the
+        profile's detectors by name when already resolved, e.g. WindowProfile.detectors.
+        """
+        results = {}
+        for name in names:
+            detector = detectors.get(name) if detectors is not None else self.registry.get(name, profile)
+            if detector is None:
+                results[name] = self._missing(name, profile)
+                continue
+
+            start = time.perf_counter()
+            x, y, width, height = detector.region
+            confidence = self.match(detector, frame[y:y + height, x:x + width], hwnd)
+            results[name] = self._finish(detector, confidence, start)
+        return results
+
+    def evaluate_many(self, hwnd: int, names: Iterable[str], profile: str,
+                      detectors: Optional[Dict[str, Detector]] = None) -> Dict[str, DetectionResult]:
+        """Capture the window once and evaluate several detectors on that frame."""
+        names = list(names)
+        if len(names) == 1:
+            detector = detectors.get(names[0]) if detectors is not None else self.registry.get(names[0], profile)
+            if detector is None:
+                return {names[0]: self._missing(names[0], profile)}
+            return {names[0]: self.evaluate_detector(hwnd, detector)}
+
+        start = time.perf_counter()
+        frame = self._capture(hwnd, None)
+        self.capture_latency.record(time.perf_counter() - start)
+        return self.evaluate_frame(frame, names, profile, hwnd, detectors)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            "detectors": self.latency.snapshot(),
+            "frame_capture": self.capture_latency.snapshot(),
+            "change_gate": self.gate.stats(),
+        }
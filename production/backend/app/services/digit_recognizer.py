@@ -0,0 +1,169 @@
+import sys
+import cv2
+import numpy as np
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.services.template_store import TemplateStore, template_store
+from app.utils.logger import logger
+
+GLYPH_DIGITS = "0123456789"
+
+
+def binarize(image: np.ndarray) -> np.ndarray:
+    """Threshold `image` with the digits as white pixels (the minority color)."""
+    _, binary = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def segment_digits(foreground: np.ndarray, min_area: int = 4) -> List[np.ndarray]:
+    """Split a binarized image into per-digit crops, left to right."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(foreground, connectivity=8)
+    boxes = [stats[i, :4].tolist() for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= min_area]
+    if not boxes:
+        return []
+    # drop specks much shorter than the digits
+    tallest = max(box[3] for box in boxes)
+    boxes = sorted((box for box in boxes if box[3] >= tallest * 0.4), key=lambda box: box[0])
+
+    # merge components overlapping horizontally, e.g. a digit broken by thresholding
+    merged = [boxes[0]]
+    for x, y, w, h in boxes[1:]:
+        mx, my, mw, mh = merged[-1]
+        if x < mx + mw:
+            x1, y1 = max(mx + mw, x + w), max(my + mh, y + h)
+            mx, my = min(mx, x), min(my, y)
+            merged[-1] = [mx, my, x1 - mx, y1 - my]
+        else:
+            merged.append([x, y, w, h])
+    return [foreground[y:y + h, x:x + w] for x, y, w, h in merged]
+
+
+class DigitRecognizer:
+    """
+    Reads a fixed number of digits from a thresholded region with per-digit glyph templates.
+
+    The region is segmented into connected components, every component is normalized to a
+    GLYPH_SIZE zero-mean unit vector (at its own aspect ratio) and all of them are scored against all glyphs with one matrix
+    product. The confidence is the lowest best-glyph correlation over the digits.
+    """
+
+    GLYPH_SIZE = (16, 24)  # (width, height) glyphs are normalized to
+
+    def __init__(self, glyphs: Dict[str, Sequence[np.ndarray]], length: int = 4,
+                 min_confidence: float = 0.7, min_area: int = 4):
+        self.length = length
+        self.min_confidence = min_confidence
+        self.min_area = min_area
+        labels, vectors = [], []
+        for digit, images in glyphs.items():
+            for image in images:
+                foreground = binarize(image)
+                segments = segment_digits(foreground, min_area)
+                # a glyph image holds one digit, use its bounding box when it can be found
+                vectors.append(self._vector(segments[0] if len(segments) == 1 else foreground))
+                labels.append(digit)
+        if not vectors:
+            raise ValueError("No digit glyphs")
+        self._labels = labels
+        self._bank = np.stack(vectors)
+
+    @classmethod
+    def from_templates(cls, profile: str, templates: TemplateStore = template_store, **kwargs) -> Optional["DigitRecognizer"]:
+        """Build a recognizer from the public/images/digits/<profile>/<digit>.jpg glyphs, None when missing."""
+        glyphs = {}
+        for digit in GLYPH_DIGITS:
+            try:
+                glyphs[digit] = [templates.get(f"digits/{profile}/{digit}")]
+            except Exception:
+                return None
+        return cls(glyphs, **kwargs)
+
+    def _vector(self, glyph: np.ndarray) -> np.ndarray:
+        # center the crop on a GLYPH_SIZE-aspect canvas first, so thin glyphs like a plain-bar "1"
+        # keep their shape instead of being stretched to a solid block
+        width, height = self.GLYPH_SIZE
+        h, w = glyph.shape[:2]
+        canvas_w, canvas_h = max(w, -(-h * width // height)), max(h, -(-w * height // width))
+        left, top = (canvas_w - w) // 2, (canvas_h - h) // 2
+        glyph = cv2.copyMakeBorder(glyph, top, canvas_h - h - top, left, canvas_w - w - left,
+                                   cv2.BORDER_CONSTANT, value=0)
+        vector = cv2.resize(glyph, self.GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def recognize(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        """Return (digits or None, confidence) for a grayscale or thresholded region."""
+        segments = segment_digits(binarize(image), self.min_area)
+        if len(segments) != self.length:
+            return None, 0.0
+        scores = np.stack([self._vector(segment) for segment in segments]) @ self._bank.T
+        best = scores.argmax(axis=1)
+        confidence = float(scores[np.arange(len(segments)), best].min())
+        if confidence < self.min_confidence:
+            return None, confidence
+        return "".join(self._labels[i] for i in best), confidence
+
+
+class DigitRecognizers:
+    """
+    DigitRecognizer per player profile, built on first use from the template store. A profile
+    without glyphs is looked up again on the next call, so harvested glyphs are used without a restart.
+    """
+
+    def __init__(self, templates: TemplateStore = template_store):
+        self._templates = templates
+        self._recognizers: Dict[str, DigitRecognizer] = {}
+        self._warned = set()
+        self._lock = Lock()
+
+    def get(self, profile: str) -> Optional[DigitRecognizer]:
+        with self._lock:
+            recognizer = self._recognizers.get(profile)
+            if recognizer is None:
+                recognizer = DigitRecognizer.from_templates(profile, self._templates)
+                if recognizer is not None:
+                    self._recognizers[profile] = recognizer
+                    self._warned.discard(profile)
+                elif profile not in self._warned:
+                    self._warned.add(profile)
+                    logger.warning(f"[DigitRecognizer] No digit glyphs for profile {profile}, using Tesseract")
+            return recognizer
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recognizers.clear()
+            self._warned.clear()
+
+
+# Create a global digit recognizer instance
+digit_recognizers = DigitRecognizers()
+
+
+def harvest_glyphs(image: np.ndarray, digits: str, output_dir: Path) -> List[Path]:
+    """Save the digit crops of a region showing the known number `digits` as glyph templates."""
+    segments = segment_digits(binarize(image))
+    if len(segments) != len(digits):
+        raise ValueError(f"Found {len(segments)} digits in the image, expected {len(digits)}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    saved = []
+    for digit, segment in zip(digits, segments):
+        path = output_dir / f"{digit}.jpg"
+        # pad the crop so the glyph image can be segmented the same way when it is loaded
+        glyph = cv2.copyMakeBorder(segment, 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=0)
+        cv2.imencode(".jpg", glyph, [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tofile(str(path))
+        saved.append(path)
+    return saved
+
+
+## run: python -m app.services.digit_recognizer <room_number_region.png> <digits> <native|thunder>
+## Harvests glyphs from a captured room number region into public/images/digits/<profile>/
+if __name__ == "__main__":
+    region_path, known_digits, glyph_profile = sys.argv[1:4]
+    region = cv2.imdecode(np.fromfile(region_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    glyph_dir = template_store.images_dir / "digits" / glyph_profile
+    for saved_path in harvest_glyphs(region, known_digits, glyph_dir):
+        print(f"Saved {saved_path}")
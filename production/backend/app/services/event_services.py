@@ -8,7 +8,8 @@ class EventService:
         self._sessions: Dict[str, Queue] = {}
         self._event_types = {
             'log': 'log',
-            'vehicle': 'vehicle'
+            'vehicle': 'vehicle',
+            'job': 'job'
         }
 
     async def connect(self, session_id: str) -> Queue:
@@ -76,6 +77,11 @@ class EventService:
         """Broadcast a vehicle event to clients in specified sessions."""
         await self.broadcast('vehicle', info, session_ids)
 
+    # job data should be like : {'id': '3f2a...', 'kind': 'start_auto_game', 'status': 'running', 'progress': 0.42, 'steps': [...]}
+    async def broadcast_job(self, info: Dict, session_ids: Optional[list[str]] = None) -> None:
+        """Broadcast a job progress event to clients in specified sessions."""
+        await self.broadcast('job', info, session_ids)
+
     async def format_sse(self, data: Dict) -> str:
         """Format the data as a Server-Sent Event message."""
         return f"data: {str(data)}\n\n"
@@ -0,0 +1,213 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Any, Callable, Dict, List, Optional
+from app.enums.pair_state import PairState
+from app.models.fleet_pair import FleetPair
+from app.models.job import Job
+from app.services.capture_service import CaptureBudget, capture_budget
+from app.services.job_service import JobService, checkpoint, current_job, job_service, job_step
+from app.utils.logger import logger
+from app.utils.metrics import LatencyGroup
+
+# flow(main, sub, options) -> bool, e.g. GameService.start_collab
+StartFlow = Callable[[Dict, Dict, Dict], bool]
+
+
+class FairLimiter:
+    """
+    Lets at most `limit` holders in at once, strictly in arrival order, so no pair is starved by
+    pairs that keep asking again.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._queue: deque = deque()
+        self._condition = Condition()
+
+    def acquire(self) -> None:
+        ticket = object()
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while self._queue[0] is not ticket or self._active >= self.limit:
+                    # wake up regularly to notice a cancelled job
+                    self._condition.wait(0.2)
+                    checkpoint()
+            except BaseException:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+                raise
+            self._queue.popleft()
+            self._active += 1
+            self._condition.notify_all()
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {"limit": self.limit, "active": self._active, "waiting": len(self._queue)}
+
+
+class FleetService:
+    """
+    Runs the start flows of many main/sub window pairs.
+
+    Every registered pair has its own worker, so its flows run one after the other and never block
+    another pair; at most `max_active` pairs run a flow at once (game windows share one desktop and
+    one input lock) and waiting pairs get their turn in order. The captures of a running pair are
+    limited to its CaptureBudget. The flows run as jobs, with the usual progress and cancellation.
+    """
+
+    def __init__(self, flows: Dict[int, StartFlow], jobs: JobService = job_service, max_active: int = 2,
+                 capture_rate: float = 20.0, clock: Callable[[], float] = time.time):
+        self._flows = flows
+        self._jobs = jobs
+        self._clock = clock
+        self.capture_rate = capture_rate
+        self._pairs: Dict[int, FleetPair] = {}
+        self._lock = Lock()
+        self.limiter = FairLimiter(max_active)
+        self.step_latency = LatencyGroup()
+        self.slot_wait = LatencyGroup()
+        self._running_since: Optional[float] = None  # when the first flow started
+
+    def register(self, idx: int, main: Dict, sub: Dict) -> FleetPair:
+        """Add the pair at `idx`, or update its windows if it's idle."""
+        with self._lock:
+            pair = self._pairs.get(idx)
+            if pair is not None:
+                self._refresh(pair)
+                if pair.state != PairState.IDLE:
+                    raise Exception(f"Pair {idx} is {pair.state.value}")
+                pair.main, pair.sub = main, sub
+                return pair
+            pair = FleetPair(
+                idx=idx, main=main, sub=sub,
+                worker=ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pair-{idx}"),
+                budget=CaptureBudget(self.capture_rate),
+            )
+            self._pairs[idx] = pair
+        logger.info(f"[FleetService] Registered pair {idx}: main {main}, sub {sub}")
+        return pair
+
+    def unregister(self, idx: int) -> Optional[FleetPair]:
+        with self._lock:
+            pair = self._pairs.pop(idx, None)
+        if pair is not None:
+            if pair.job_id:
+                self._jobs.cancel(pair.job_id)
+            pair.worker.shutdown(wait=False)
+            logger.info(f"[FleetService] Unregistered pair {idx}")
+        return pair
+
+    def _refresh(self, pair: FleetPair) -> None:
+        # a job cancelled before its flow ran never resets the pair itself
+        if pair.state != PairState.IDLE:
+            job = self._jobs.get(pair.job_id) if pair.job_id else None
+            if job is None or job.done:
+                pair.state = PairState.IDLE
+
+    def pairs(self) -> List[FleetPair]:
+        with self._lock:
+            for pair in self._pairs.values():
+                self._refresh(pair)
+            return sorted(self._pairs.values(), key=lambda pair: pair.idx)
+
+    def get(self, idx: int) -> Optional[FleetPair]:
+        with self._lock:
+            return self._pairs.get(idx)
+
+    def start(self, idx: int, mode: int, options: Optional[Dict] = None) -> Job:
+        """Queue the start flow of `mode` for the pair; a pair runs one flow at a time."""
+        flow = self._flows.get(mode)
+        if flow is None:
+            raise Exception(f"Unknown mode: {mode}")
+        options = options or {}
+        with self._lock:
+            pair = self._pairs.get(idx)
+            if pair is None:
+                raise Exception(f"Pair {idx} is not registered")
+            self._refresh(pair)
+            if pair.state != PairState.IDLE:
+                raise Exception(f"Pair {idx} is {pair.state.value}")
+            pair.state = PairState.WAITING
+            # wait_slot and the 7 steps of the start flows
+            job = self._jobs.submit("fleet_start", self._run, pair, flow, options,
+                                    params={"pair": idx, "mode": mode, **options}, total_steps=8,
+                                    executor=pair.worker)
+            pair.job_id = job.id
+        return job
+
+    def start_all(self, mode: int, options: Optional[Dict] = None) -> Dict[int, Job]:
+        """Queue the flow for every idle pair, in pair order."""
+        return {pair.idx: self.start(pair.idx, mode, options)
+                for pair in self.pairs() if pair.state == PairState.IDLE}
+
+    def _run(self, pair: FleetPair, flow: StartFlow, options: Dict) -> Any:
+        result = False
+        with self._lock:
+            if self._running_since is None:
+                self._running_since = self._clock()
+        try:
+            with job_step("wait_slot"):
+                start = time.perf_counter()
+                self.limiter.acquire()
+                self.slot_wait.record(str(pair.idx), time.perf_counter() - start)
+            try:
+                pair.state = PairState.RUNNING
+                with capture_budget(pair.budget):
+                    result = flow(pair.main, pair.sub, options)
+            finally:
+                self.limiter.release()
+            return result
+        finally:
+            pair.state = PairState.IDLE
+            now = self._clock()
+            with self._lock:
+                if result:
+                    pair.starts += 1
+                    pair.started_at.append(now)
+                    # keep an hour of start times per pair
+                    while pair.started_at and now - pair.started_at[0] > 3600:
+                        pair.started_at.pop(0)
+                else:
+                    pair.failures += 1
+            job = current_job()
+            for step in (job.steps if job else []):
+                if step.elapsed is not None and step.name != "wait_slot":
+                    self.step_latency.record(f"{pair.idx}:{step.name}", step.elapsed)
+
+    def started_per_hour(self) -> float:
+        """Pairs started in the last hour, extrapolated to an hour while the fleet has been running for less."""
+        now = self._clock()
+        with self._lock:
+            recent = sum(1 for pair in self._pairs.values() for at in pair.started_at if now - at <= 3600)
+            first = self._running_since
+        if first is None:
+            return 0.0
+        hours = min(max(now - first, 60.0), 3600.0) / 3600
+        return round(recent / hours, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pairs": [pair.to_dict() for pair in self.pairs()],
+            "started_per_hour": self.started_per_hour(),
+            "slots": self.limiter.stats(),
+            "slot_wait": self.slot_wait.snapshot(),
+            "steps": self.step_latency.snapshot(),
+        }
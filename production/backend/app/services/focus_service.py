@@ -0,0 +1,122 @@
+import threading
+import time
+import cv2
+import numpy as np
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.utils.metrics import LatencyGroup, LatencyStats
+
+
+class FocusManager:
+    """
+    Owns the foreground window for native (real mouse/keyboard) input.
+
+    A switch is skipped when the window already is in the foreground, and verified by polling the
+    foreground window instead of sleeping a fixed time after SetForegroundWindow. Inputs grouped in
+    a `session` share one switch and hold the input lock, so no other window steals the foreground
+    between them.
+    """
+
+    def __init__(self, get_foreground: Callable[[], int], activate: Callable[[int], Any],
+                 verify_timeout: float = 0.5, interval: float = 0.005,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._get_foreground = get_foreground
+        self._activate = activate
+        self.verify_timeout = verify_timeout
+        self.interval = interval
+        self._clock = clock
+        self._sleep = sleep
+        # native input moves the real cursor and foreground window, one window at a time
+        self.lock = threading.RLock()
+        self._session: Optional[int] = None
+        self.switches = 0
+        self.skipped = 0
+        self.unverified = 0
+        self.switch_latency = LatencyStats()
+        self.checks = LatencyGroup()
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+
+    def _wait(self, condition: Callable[[], bool], timeout: float) -> bool:
+        deadline = self._clock() + timeout
+        while not condition():
+            if self._clock() >= deadline:
+                return False
+            self._sleep(self.interval)
+        return True
+
+    def focus(self, hwnd: int) -> bool:
+        """Bring the window to the foreground unless it already is. Returns whether it is now."""
+        with self.lock:
+            if self._session == hwnd or self._get_foreground() == hwnd:
+                self.skipped += 1
+                return True
+            start = self._clock()
+            self._activate(hwnd)
+            focused = self._wait(lambda: self._get_foreground() == hwnd, self.verify_timeout)
+            self.switches += 1
+            if focused:
+                self.switch_latency.record(self._clock() - start)
+            else:
+                self.unverified += 1
+            return focused
+
+    def refocus(self, hwnd: int, others: Iterable[int]) -> bool:
+        """
+        Make the window gain the focus again, through another window when it already has it, e.g.
+        so an emulator syncs the clipboard it only reads when activated. Call it outside a session.
+        """
+        with self.lock:
+            if self._get_foreground() == hwnd:
+                other = next((other for other in others if other != hwnd), None)
+                if other is not None:
+                    self.focus(other)
+            return self.focus(hwnd)
+
+    @contextmanager
+    def session(self, hwnd: int):
+        """Hold the input lock with the window focused; nested inputs to the same window don't switch again."""
+        with self.lock:
+            self.focus(hwnd)
+            previous, self._session = self._session, hwnd
+            try:
+                yield
+            finally:
+                self._session = previous
+
+    def order(self, hwnds: Iterable[int]) -> List[int]:
+        """`hwnds` with the current foreground window first, to save a switch when inputs go to each."""
+        foreground = self._get_foreground()
+        return sorted(hwnds, key=lambda hwnd: hwnd != foreground)
+
+    def wait_for_change(self, label: str, capture: Callable[[], np.ndarray], before: np.ndarray,
+                        timeout: float, min_pixels: int = 20, tolerance: int = 32) -> bool:
+        """
+        Poll `capture` until at least `min_pixels` pixels differ from `before` by more than
+        `tolerance` gray levels, e.g. until pasted text shows up. Returns False on timeout.
+        """
+        start = self._clock()
+
+        def changed():
+            frame = capture()
+            if frame.shape != before.shape:
+                return True
+            return np.count_nonzero(cv2.absdiff(frame, before) > tolerance) >= min_pixels
+
+        ok = self._wait(changed, timeout)
+        self.checks.record(label, self._clock() - start)
+        with self.lock:
+            outcome = self._outcomes.setdefault(label, {"ok": 0, "timeouts": 0})
+            outcome["ok" if ok else "timeouts"] += 1
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        checks = self.checks.snapshot()
+        with self.lock:
+            outcomes = {label: {**outcome, **checks.get(label, {})} for label, outcome in self._outcomes.items()}
+        return {
+            "switches": self.switches,
+            "skipped": self.skipped,
+            "unverified": self.unverified,
+            "switch_latency": self.switch_latency.snapshot(),
+            "checks": outcomes,
+        }
@@ -1,50 +1,148 @@
-from app.services.window_control_services import WindowControlService
+from app.services.window_control_services import WindowControlService, focus_manager
 from app.services.image_services import ImageService
+from app.services.detector_service import DetectorService
+from app.services.digit_recognizer import digit_recognizers
+from app.services.card_recognizer import CardRecognizer
+from app.services.vehicle_service import VehicleReader
+from app.services.capture_service import capture_engine
+from app.services.settle_service import settle_detector
+from app.services.job_service import checkpoint, job_step, run_parallel
+from app.services.input_dispatcher import input_dispatchers
+from app.services.profile_service import PROFILE_REGIONS, InputStrategy, ProfileRegistry, WindowProfile
+from app.services.template_store import template_store
 from app.enums.game_positions import GamePositions
 from app.enums.tool_positions import ToolPositions
+from app.enums.player_profiles import PlayerProfile
+from app.utils.buffer_pool import buffer_pools
 from app.utils.logger import logger
-from app.config import config
+from app.utils.metrics import LatencyGroup, metrics
+from app.utils.wait import waiter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import time
 import cv2
 
 image_service = ImageService()
 
+def _capture_window_region(pid, region):
+    window = WindowControlService.find_window(pid)
+    return WindowControlService.capture_region(window, region)
+
+detector_service = DetectorService(_capture_window_region)
+metrics.register("detectors", detector_service.stats)
+# input can change a small part of a region, too little for the change gate to notice
+capture_engine.add_input_listener(detector_service.gate.invalidate)
+
+card_recognizer = CardRecognizer(_capture_window_region)
+metrics.register("cards", card_recognizer.stats)
+
+vehicle_reader = VehicleReader(_capture_window_region)
+metrics.register("vehicles", vehicle_reader.stats)
+
+# Input per player profile: the native client takes background messages, the Thunder emulator
+# only reacts to real (foreground) input and pasted text
+INPUT_STRATEGIES = {
+    PlayerProfile.NATIVE.value: InputStrategy(
+        # through the window's input queue, in order with the shortcut clicks
+        click=lambda pid, x, y: input_dispatchers.for_window(pid).click(x, y, wait=True),
+        type_text=lambda pid, text: input_dispatchers.for_window(pid).text(text, wait=True),
+        after_typing=(GamePositions.TEXT_AREA_CONFIRM.value,),
+        room_confirm_clicks=1,
+        resize_window=True,
+    ),
+    PlayerProfile.THUNDER.value: InputStrategy(
+        click=WindowControlService.click_at_native,
+        # the paste is verified on the room number field
+        type_text=lambda pid, text: WindowControlService.type_text_native(
+            pid, text, region=PROFILE_REGIONS[PlayerProfile.THUNDER.value]["room_input"]),
+        # click first to finish the input
+        room_confirm_clicks=2,
+        resize_window=False,
+    ),
+}
+
+# Player profile of every window
+profile_registry = ProfileRegistry(lambda: detector_service.registry, digit_recognizers, template_store, INPUT_STRATEGIES)
+metrics.register("profiles", profile_registry.stats)
+
+# Worker threads for the per-window steps of the start flows
+_flow_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="game-flow")
+
+# End-to-end start latency per mode (collab / ice_castle / moon_island / whirlpool)
+start_latency = LatencyGroup()
+metrics.register("start_latency", start_latency.snapshot)
+
+# Time from the start of a flow until both windows are in the room, per mode
+room_latency = LatencyGroup()
+metrics.register("time_to_room", room_latency.snapshot)
+
+# Room number recognition latency per engine (glyphs / tesseract)
+room_number_latency = LatencyGroup()
+metrics.register("room_number", room_number_latency.snapshot)
+
 class GameService:
     @staticmethod
-    def click_in_window(pid, position):
-        if config.is_thunder_player:
-            WindowControlService.click_at_native(pid, position[0], position[1])
-        else:
-            WindowControlService.click_at(pid, position[0], position[1])
-        time.sleep(0.5)  # 等待点击动作完成 (可以根据实际情况调整时间)
+    def click_in_window(pid, position, settle_timeout=0.5):
+        checkpoint()
+        profile_registry.get(pid).input.click(pid, position[0], position[1])
+        # 等待画面稳定，最多等待 settle_timeout 秒
+        GameService.settle(pid, settle_timeout, "click")
         return True  # 假设点击成功返回True (根据实际情况修改返回值)
+
+    @staticmethod
+    def settle(pid, timeout, label, region=None):
+        """Wait until the window stops changing, at most `timeout` seconds (the delay it replaces)."""
+        checkpoint()
+        settled = settle_detector.wait(pid, timeout, label, region)
+        # a cancel that came in while waiting stops the flow before its next input
+        checkpoint()
+        return settled
     
     @staticmethod
     def type_room_number(pid, room_number):
         GameService.click_in_window(pid, GamePositions.TEXT_AREA.value)
-        if config.is_thunder_player:
-            WindowControlService.type_text_native(pid, room_number)
-        else :
-            WindowControlService.type_text(pid, room_number)
-            GameService.click_in_window(pid, GamePositions.TEXT_AREA_CONFIRM.value)
+        strategy = profile_registry.get(pid).input
+        strategy.type_text(pid, room_number)
+        for position in strategy.after_typing:
+            GameService.click_in_window(pid, position)
         return True  # 假设输入成功返回True (根据实际情况修改返回值)
     
     @staticmethod
     def recognize_room_number(pid):
-        import pytesseract
         import re
         
-        # Define room number region (x, y, width, height)
-        room_number_region = (490, 335, 80, 30) if config.is_thunder_player else (490, 345, 80, 30)  # Adjust coordinates if needed
-        
-        # Capture grayscale screenshot of the region
-        screenshot_gray = WindowControlService.capture_region(pid, room_number_region)
+        profile = profile_registry.get(pid)
+        # Room number region (x, y, width, height) of the window's profile
+        room_number_region = profile.regions["room_number"]
+
+        # Capture grayscale screenshot of the region, always a fresh frame since the number is polled
+        screenshot_gray = WindowControlService.capture_region(pid, room_number_region, max_age=0)
+
+        # In-process glyph recognizer, falls back to Tesseract when no glyphs are available or it is unsure
+        recognizer = profile.digits
+        if recognizer is not None:
+            start = time.perf_counter()
+            room, confidence = recognizer.recognize(screenshot_gray)
+            room_number_latency.record("glyphs", time.perf_counter() - start)
+            logger.info(f"Room number glyph confidence: {confidence:.3f}")
+            if room is not None:
+                return room
+
+        try:
+            import pytesseract
+        except ImportError:
+            logger.error("Failed to recognize 4-digit room number, pytesseract is not installed")
+            return None
+
+        start = time.perf_counter()
         # Preprocess image for better OCR results (thresholding)
-        _, thresholded = cv2.threshold(screenshot_gray, 127, 255, cv2.THRESH_BINARY)
+        thresholded = buffer_pools.for_window(pid).get(screenshot_gray.shape, screenshot_gray.dtype, tag="room_number")
+        cv2.threshold(screenshot_gray, 127, 255, cv2.THRESH_BINARY, dst=thresholded)
         
         # Use Tesseract to extract text (configure for digits only)
         custom_config = r'--oem 3 --psm 10 -c tessedit_char_whitelist=0123456789'
         ocr_text = pytesseract.image_to_string(thresholded, config=custom_config)
+        room_number_latency.record("tesseract", time.perf_counter() - start)
         
         # Extract 4-digit number using regex
         match = re.search(r'\b\d{4}\b', ocr_text)
@@ -55,35 +153,96 @@ class GameService:
             return None
         
 
+    @staticmethod
+    def get_profile(pid) -> WindowProfile:
+        return profile_registry.get(pid)
+
+    @staticmethod
+    def detect(pid, name) -> bool:
+        """Evaluate the screen detector `name` (see public/detectors.json) on the window."""
+        profile = profile_registry.get(pid)
+        detector = profile.detectors.get(name)
+        if detector is None:
+            # e.g. is_in_whirlpool only exists for thunder, the screen can't be detected elsewhere
+            return False
+        return detector_service.evaluate_detector(pid, detector).matched
+
+    @staticmethod
+    def detect_many(pid, names: List[str]) -> Dict[str, bool]:
+        """Evaluate several screen detectors on the window with a single capture."""
+        profile = profile_registry.get(pid)
+        results = detector_service.evaluate_many(pid, names, profile.name, profile.detectors)
+        return {name: result.matched for name, result in results.items()}
+
+    @staticmethod
+    def recognize_cards(pid, fresh: bool = False) -> List[Optional[str]]:
+        """
+        Card names in hand (CARD_0..CARD_2), None for a slot that could not be recognized.
+        With `fresh` a new frame is captured instead of reusing a cached one, e.g. when retrying.
+        """
+        if fresh:
+            capture_engine.invalidate(pid)
+        results = card_recognizer.recognize(pid)
+        logger.info(f"Cards in hand: {results}")
+        return [name for name, _ in results]
+
+    @staticmethod
+    def read_vehicles(pid, mode) -> Dict:
+        """Card and level of every vehicle slot per side, e.g. {'left': {0: {'card': ..., 'level': ...}}}."""
+        return vehicle_reader.read(pid, mode)
+
+    @staticmethod
+    def wait_until(pid, detector: str, timeout: float, present: bool = True) -> bool:
+        """
+        Poll the screen detector until it matches (or no longer matches when `present` is False),
+        returning as soon as it does. Returns False on timeout.
+        """
+        profile = profile_registry.get(pid)
+        if detector not in profile.detectors:
+            # nothing to poll, the screen never matches on this profile
+            logger.info(f"No detector {detector} for profile {profile.name}")
+            return not present
+        polls = []
+
+        def check():
+            checkpoint()
+            if polls:
+                # every poll needs a new frame, not one cached before the screen changed
+                capture_engine.invalidate(pid)
+            polls.append(pid)
+            return GameService.detect(pid, detector) == present
+
+        label = detector if present else f"{detector}:gone"
+        return waiter.wait(check, timeout, label)
+
+    @staticmethod
+    def wait_until_all(pids, detector: str, timeout: float) -> bool:
+        """Wait until the detector matches on every window, the windows are polled concurrently."""
+        return all(GameService.in_parallel(*[
+            (lambda pid=pid: GameService.wait_until(pid, detector, timeout)) for pid in pids
+        ]))
+
+    @staticmethod
+    def in_parallel(*steps):
+        """
+        Run independent per-window steps concurrently and return their results in order.
+        Native (foreground) input stays serialized by WindowControlService, waits and captures overlap.
+        """
+        # the steps run in the context of the caller, e.g. as part of its job; when one fails the
+        # others stop at their next checkpoint before the error is raised
+        return run_parallel(_flow_executor, list(steps))
+
     @staticmethod
     def is_home(pid):
-        battle_region = (770, 510, 220, 90) if config.is_thunder_player else (790, 515, 230, 100)# 对战区域
-        window = WindowControlService.find_window(pid)
-        screenshot_gray = WindowControlService.capture_region(window, battle_region)
-        template_gray = image_service.load_template('对战_thunder') if config.is_thunder_player else image_service.load_template('对战')
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(result)
-        return max_val > 0.95
+        return GameService.detect(pid, 'is_home')
 
     @staticmethod
     def need_ads(pid):
-        ads_region = (410, 390, 230, 80) if config.is_thunder_player else (413, 394, 230, 85)  # 广告区域，用于检测广告是否出现
-        window = WindowControlService.find_window(pid)
-        screenshot_gray = WindowControlService.capture_region(window, ads_region)
-        template_gray = image_service.load_template('广告_thunder') if config.is_thunder_player else image_service.load_template('广告')
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(result)
-        return max_val > 0.9
+        return GameService.detect(pid, 'need_ads')
 
     @staticmethod
     def ice_need_buy_round(pid):
-        round_region = (313, 430, 155, 50) if config.is_thunder_player else (320, 440, 155, 50) # 回合区域，用于检测回合是否结束
-        window = WindowControlService.find_window(pid)
-        screenshot_gray = WindowControlService.capture_region(window, round_region)
-        template_gray = image_service.load_template('寒冰助战_thunder') if config.is_thunder_player else image_service.load_template('寒冰助战')
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(result)
-        return max_val > 0.9
+        return GameService.detect(pid, 'ice_need_buy_round')
         
     @staticmethod
     def back_to_home(pid):
@@ -91,171 +250,180 @@ class GameService:
             return True
         else:
             GameService.click_in_window(pid, GamePositions.BACK.value)
-            return GameService.is_home(pid)
+            return GameService.wait_until(pid, 'is_home', timeout=1)
     
     @staticmethod
     def start_auto_battle(main, sub):
         mainWndPid = main['game']
         subWndPid = sub['game']
-        GameService.back_to_home(mainWndPid)
-        GameService.back_to_home(subWndPid)
+        with job_step("back_to_home"):
+            GameService.in_parallel(
+                lambda: GameService.back_to_home(mainWndPid),
+                lambda: GameService.back_to_home(subWndPid),
+            )
 
         ## switch tool window to main page
-        GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.MAIN_PAGE.value)
+        with job_step("switch_tool_page"):
+            GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.MAIN_PAGE.value)
+        with job_step("execute"):
+            GameService.click_tools(main['tool'], sub['tool'], ToolPositions.EXECUTE_BUTTON.value)
+        return True
+
+    @staticmethod
+    def start_pair(main, sub, mode, create_room, prepare_sub, start):
+        """
+        Shared pipeline of the start flows. The main window creates the room while the sub window is
+        driven up to the open room number input; typing the recognized number is the only handoff.
+        Then the tool windows switch to the collab page, stop, and start once both are in the room.
+        """
+        subWndPid = sub['game']
+
+        def step(name, fn):
+            def run():
+                with job_step(name):
+                    return fn()
+            return run
+
+        room, _ = GameService.in_parallel(step("create_room", create_room), step("prepare_sub", prepare_sub))
 
-        x, y = ToolPositions.EXECUTE_BUTTON.value
-        WindowControlService.click_at_native(main['tool'], x, y)
-        time.sleep(1)
-        WindowControlService.click_at_native(sub['tool'], x, y)
+        def enter_room():
+            GameService.enter_room_number(subWndPid, room)
+            room_latency.record(mode, time.perf_counter() - start)
+
+        def stop_tools():
+            # switch to the collab page and stop, one foreground switch per tool window
+            GameService.click_tools_sequence(main['tool'], sub['tool'],
+                                             [ToolPositions.COLLAB_PAGE.value, ToolPositions.GAME_STOP.value])
+            time.sleep(2)
+
+        GameService.in_parallel(step("enter_room", enter_room), step("stop_tool", stop_tools))
+        with job_step("start_tool"):
+            GameService.start_tool(main['tool'], sub['tool'])
+        elapsed = time.perf_counter() - start
+        start_latency.record(mode, elapsed)
+        logger.info(f"[GameService] {mode} started in {elapsed:.2f}s")
         return True
 
+    @staticmethod
+    def create_room(pid, click_mode):
+        """Enter the mode on the main window, start a room and return its number."""
+        click_mode(pid)
+        # start room
+        GameService.start_room(pid)
+        ## capture room number in pic
+        return GameService.recognize_room_number_with_retry(pid)
+
+    @staticmethod
+    def prepare_join(pid, click_mode):
+        """Enter the mode on the sub window and open the room number input."""
+        click_mode(pid)
+        GameService.open_join_dialog(pid)
+
+    @staticmethod
+    def create_collab_room(mainWndPid):
+        redo = 3
+        while True:
+            try:
+                return GameService.create_room(mainWndPid, GameService.click_collab)
+            except Exception as e:
+                redo -= 1
+                if redo == 0:
+                    raise
+                logger.error(f'[GameService]: Failed to start room, retry {3-redo}...')
+                GameService.click_in_window(mainWndPid, GamePositions.CLOSE_COLLAB.value)
+                GameService.click_in_window(mainWndPid, GamePositions.CLOSE_ROOM.value)
+
     @staticmethod
     def start_collab(main, sub):
         try:
+            start = time.perf_counter()
             mainWndPid = main['game']
             subWndPid = sub['game']
-            retry = 3
-            while retry > 0 and (not GameService.is_home(mainWndPid) or not GameService.is_home(subWndPid)):
-                retry -= 1
-                time.sleep(5)
-                logger.error(f"Detect home page, retry: {3-retry}...")
-            if (not GameService.is_home(mainWndPid) or not GameService.is_home(subWndPid)):
-                logger.error("Failed to start collab due to maximum retry waiting for the home page")
+            with job_step("wait_page"):
+                in_page = GameService.wait_until_all([mainWndPid, subWndPid], 'is_home', timeout=15)
+            if not in_page:
+                logger.error("Failed to start collab after timing out waiting for the home page")
                 return False
-            GameService.back_to_home(mainWndPid)
-            GameService.back_to_home(subWndPid)
-
-            redo = 3
-            while redo > 0:
-                try:
-                    # main game window starts
-                    GameService.click_collab(mainWndPid)
-                    # start room
-                    GameService.start_room(mainWndPid)
-                    ## capture room number in pic
-                    room = GameService.recognize_room_number_with_retry(mainWndPid)
-                    redo = 0
-                except Exception as e:
-                    logger.error(f'[GameService]: Failed to start room, retry {3-redo}...')
-                    GameService.click_in_window(mainWndPid, GamePositions.CLOSE_COLLAB.value)
-                    GameService.click_in_window(mainWndPid, GamePositions.CLOSE_ROOM.value)
-                    redo -= 1
-
-            # sub game window starts
-            GameService.click_collab(subWndPid)
-            GameService.join_room(subWndPid, room)
-            GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.COLLAB_PAGE.value)
-            GameService.stop_tool(main['tool'], sub['tool'])
-            GameService.start_tool(main['tool'], sub['tool'])
-            return True
+            with job_step("back_to_home"):
+                GameService.in_parallel(
+                    lambda: GameService.back_to_home(mainWndPid),
+                    lambda: GameService.back_to_home(subWndPid),
+                )
+            return GameService.start_pair(
+                main, sub, "collab", start=start,
+                create_room=lambda: GameService.create_collab_room(mainWndPid),
+                prepare_sub=lambda: GameService.prepare_join(subWndPid, GameService.click_collab),
+            )
         except Exception as e:
             logger.error(f"[GameService] start collab error: {e}")
             return False
     
     @staticmethod
     def is_in_ice_castle(pid):
-        region = (455, 65, 133, 55) if config.is_thunder_player else (461, 72, 133, 61) # 寒冰标题区域
-        window = WindowControlService.find_window(pid)
-        screenshot_gray = WindowControlService.capture_region(window, region)
-        template_gray = image_service.load_template('寒冰堡_thunder') if config.is_thunder_player else image_service.load_template('寒冰堡')
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(result)
-        logger.info(f"[GameService] is in ice castle confidence: {max_val}")
-        return max_val > 0.95
+        return GameService.detect(pid, 'is_in_ice_castle')
+
+    @staticmethod
+    def close_support(pid):
+        GameService.click_in_window(pid, GamePositions.CLOSE_SUPPORT.value)
+        GameService.settle(pid, 1, "close_support")
     
     @staticmethod
     def start_ice_castle(main, sub, only_support):
         try:
+            start = time.perf_counter()
             mainWndPid = main['game']
             subWndPid = sub['game']
-            retry = 3
-            while retry > 0 and (not GameService.is_in_ice_castle(mainWndPid) or not GameService.is_in_ice_castle(subWndPid)):
-                retry -= 1
-                time.sleep(8)
-                logger.error(f"Detect ice castle page, retry: {3-retry}...")
-            if (not GameService.is_in_ice_castle(mainWndPid) or not GameService.is_in_ice_castle(subWndPid)):
-                logger.error("Failed to start ice castle due to maximum retry waiting for the ice castle page")
+            with job_step("wait_page"):
+                in_page = GameService.wait_until_all([mainWndPid, subWndPid], 'is_in_ice_castle', timeout=24)
+            if not in_page:
+                logger.error("Failed to start ice castle after timing out waiting for the ice castle page")
                 return False
             # close support first
-            GameService.click_in_window(mainWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            # main game window starts
-            GameService.click_ice_castle(mainWndPid, False)
-            # start room
-            GameService.start_room(mainWndPid)
-            ## capture room number in pic
-            room = GameService.recognize_room_number_with_retry(mainWndPid)
-
-            # sub game window starts
-            GameService.click_in_window(subWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            GameService.click_ice_castle(subWndPid, only_support)
-            GameService.join_room(subWndPid, room)
-            GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.COLLAB_PAGE.value)
-            GameService.stop_tool(main['tool'], sub['tool'])
-            GameService.start_tool(main['tool'], sub['tool'])
-            return True
+            with job_step("close_support"):
+                GameService.in_parallel(
+                    lambda: GameService.close_support(mainWndPid),
+                    lambda: GameService.close_support(subWndPid),
+                )
+            return GameService.start_pair(
+                main, sub, "ice_castle", start=start,
+                create_room=lambda: GameService.create_room(mainWndPid, lambda pid: GameService.click_ice_castle(pid, False)),
+                prepare_sub=lambda: GameService.prepare_join(subWndPid, lambda pid: GameService.click_ice_castle(pid, only_support)),
+            )
         except Exception as e:
             logger.error(f"[GameService] start ice castle error: {e}")
             return False
 
     @staticmethod
     def is_in_moon_island(pid):
-        region = (468, 63, 124, 53) if config.is_thunder_player else (475, 71, 124, 54)  # 暗月标题区域
-        window = WindowControlService.find_window(pid)
-        screenshot_gray = WindowControlService.capture_region(window, region)
-        template_gray = image_service.load_template('暗月岛_thunder') if config.is_thunder_player else image_service.load_template('暗月岛')
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(result)
-        logger.info(f"[GameService] is in moon island confidence: {max_val}")
-        return max_val > 0.95
+        return GameService.detect(pid, 'is_in_moon_island')
     
     @staticmethod
     def is_in_whirlpool(pid):
         # only thunder player has whirlpool now
-        if config.is_thunder_player:
-            region = (460, 63, 124, 53)
-            window = WindowControlService.find_window(pid)
-            screenshot_gray = WindowControlService.capture_region(window, region)
-            template_gray = image_service.load_template('大漩涡_thunder')
-            result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, _ = cv2.minMaxLoc(result)
-            logger.info(f"[GameService] is in whirlpool confidence: {max_val}")
-            return max_val > 0.95
+        return GameService.detect(pid, 'is_in_whirlpool')
 
     @staticmethod
     def start_moon_island(main, sub):
         try:
+            start = time.perf_counter()
             mainWndPid = main['game']
             subWndPid = sub['game']
-            retry = 3
-            while retry > 0 and (not GameService.is_in_moon_island(mainWndPid) or not GameService.is_in_moon_island(subWndPid)):
-                retry -= 1
-                time.sleep(8)
-                logger.error(f"Detect moon island page, retry: {3-retry}...")
-            if (not GameService.is_in_moon_island(mainWndPid) or not GameService.is_in_moon_island(subWndPid)):
-                logger.error("Failed to start moon island due to maximum retry waiting for the moon island page")
+            with job_step("wait_page"):
+                in_page = GameService.wait_until_all([mainWndPid, subWndPid], 'is_in_moon_island', timeout=24)
+            if not in_page:
+                logger.error("Failed to start moon island after timing out waiting for the moon island page")
                 return False
             # close support first
-            GameService.click_in_window(mainWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            # main game window starts
-            GameService.click_moon_island(mainWndPid)
-            # start room
-            GameService.start_room(mainWndPid)
-            ## capture room number in pic
-            room = GameService.recognize_room_number_with_retry(mainWndPid)
-
-            # close support first
-            GameService.click_in_window(subWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            # sub game window starts
-            GameService.click_moon_island(subWndPid)
-            GameService.join_room(subWndPid, room)
-            GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.COLLAB_PAGE.value)
-            GameService.stop_tool(main['tool'], sub['tool'])
-            GameService.start_tool(main['tool'], sub['tool'])
-            return True
+            with job_step("close_support"):
+                GameService.in_parallel(
+                    lambda: GameService.close_support(mainWndPid),
+                    lambda: GameService.close_support(subWndPid),
+                )
+            return GameService.start_pair(
+                main, sub, "moon_island", start=start,
+                create_room=lambda: GameService.create_room(mainWndPid, GameService.click_moon_island),
+                prepare_sub=lambda: GameService.prepare_join(subWndPid, GameService.click_moon_island),
+            )
         except Exception as e:
             logger.error(f"[GameService] start moon island error: {e}")
             return False
@@ -263,62 +431,57 @@ class GameService:
     @staticmethod
     def start_whirlpool(main, sub):
         try:
+            start = time.perf_counter()
             mainWndPid = main['game']
             subWndPid = sub['game']
-            retry = 3
-            while retry > 0 and (not GameService.is_in_whirlpool(mainWndPid) or not GameService.is_in_whirlpool(subWndPid)):
-                retry -= 1
-                time.sleep(8)
-                logger.error(f"Detect whirlpool page, retry: {3-retry}...")
-            if (not GameService.is_in_whirlpool(mainWndPid) or not GameService.is_in_whirlpool(subWndPid)):
-                logger.error("Failed to start whirlpool due to maximum retry waiting for the whirlpool page")
+            with job_step("wait_page"):
+                in_page = GameService.wait_until_all([mainWndPid, subWndPid], 'is_in_whirlpool', timeout=24)
+            if not in_page:
+                logger.error("Failed to start whirlpool after timing out waiting for the whirlpool page")
                 return False
             # close support first
-            GameService.click_in_window(mainWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            # main game window starts
-            GameService.click_whirlpool(mainWndPid)
-            # start room
-            GameService.start_room(mainWndPid)
-            ## capture room number in pic
-            room = GameService.recognize_room_number_with_retry(mainWndPid)
-
-            # close support first
-            GameService.click_in_window(subWndPid, GamePositions.CLOSE_SUPPORT.value)
-            time.sleep(1)
-            # sub game window starts
-            GameService.click_whirlpool(subWndPid)
-            GameService.join_room(subWndPid, room)
-            GameService.switch_tool_page(main['tool'], sub['tool'], ToolPositions.COLLAB_PAGE.value)
-            GameService.stop_tool(main['tool'], sub['tool'])
-            GameService.start_tool(main['tool'], sub['tool'])
-            return True
+            with job_step("close_support"):
+                GameService.in_parallel(
+                    lambda: GameService.close_support(mainWndPid),
+                    lambda: GameService.close_support(subWndPid),
+                )
+            return GameService.start_pair(
+                main, sub, "whirlpool", start=start,
+                create_room=lambda: GameService.create_room(mainWndPid, GameService.click_whirlpool),
+                prepare_sub=lambda: GameService.prepare_join(subWndPid, GameService.click_whirlpool),
+            )
         except Exception as e:
-            logger.error(f"[GameService] start moon island error: {e}")
+            logger.error(f"[GameService] start whirlpool error: {e}")
             return False
+
+    @staticmethod
+    def click_tools(main: str, sub: str, position):
+        """Click the same position in both tool windows."""
+        return GameService.click_tools_sequence(main, sub, [position])
+
+    @staticmethod
+    def click_tools_sequence(main: str, sub: str, positions):
+        """
+        Click `positions` in order in both tool windows. The clicks are grouped per window, starting
+        with the one already in the foreground, so each window is brought to the foreground once at most.
+        """
+        for hwnd in focus_manager.order([main, sub]):
+            with focus_manager.session(hwnd):
+                for x, y in positions:
+                    WindowControlService.click_at_native(hwnd, x, y)
+        return True
     
     @staticmethod
     def start_tool(main: str, sub: str):
-        x, y = ToolPositions.GAME_START.value
-        WindowControlService.click_at_native(main, x, y)
-        time.sleep(1)
-        WindowControlService.click_at_native(sub, x, y)
-        return True
+        return GameService.click_tools(main, sub, ToolPositions.GAME_START.value)
     
     @staticmethod
     def switch_tool_page(main: str, sub: str, position):
-        x, y = position
-        WindowControlService.click_at_native(main, x, y)
-        time.sleep(1)
-        WindowControlService.click_at_native(sub, x, y)
-        return True
+        return GameService.click_tools(main, sub, position)
     
     @staticmethod
     def stop_tool(main: str, sub: str):
-        x, y = ToolPositions.GAME_STOP.value
-        WindowControlService.click_at_native(main, x, y)
-        time.sleep(1)
-        WindowControlService.click_at_native(sub, x, y)
+        GameService.click_tools(main, sub, ToolPositions.GAME_STOP.value)
         time.sleep(2)
         return True
 
@@ -329,7 +492,7 @@ class GameService:
         watch_ads = GameService.need_ads(pid)
         if watch_ads:
             GameService.click_in_window(pid, GamePositions.ADS_REGION.value)
-            time.sleep(1)
+            GameService.wait_until(pid, 'need_ads', timeout=1, present=False)
             GameService.click_in_window(pid, GamePositions.COLLAB.value)
         return True
     
@@ -343,7 +506,7 @@ class GameService:
                 GameService.click_in_window(pid, GamePositions.ICE_SUPPORT.value)
             else:
                 GameService.click_in_window(pid, GamePositions.ICE_BUY_ROUND.value)
-            time.sleep(1)
+            GameService.wait_until(pid, 'ice_need_buy_round', timeout=1, present=False)
             GameService.click_in_window(pid, GamePositions.ICE_CASTLE.value)
         return True
     
@@ -360,15 +523,14 @@ class GameService:
     @staticmethod
     def recognize_room_number_with_retry(pid):
         ## capture room number in pic
-        room = GameService.recognize_room_number(pid)
-        timeout = 3
-        while room is None:
-            time.sleep(1)
-            timeout -= 1
-            if timeout == 0:
-                logger.error("Failed to recognize room number")
-                raise Exception("Failed to recognize room number")
-            room = GameService.recognize_room_number(pid)
+        def poll():
+            checkpoint()
+            return GameService.recognize_room_number(pid)
+
+        room = waiter.wait(poll, timeout=3, label="room_number")
+        if room is None:
+            logger.error("Failed to recognize room number")
+            raise Exception("Failed to recognize room number")
         logger.info(f"Room number: {room}")
         return room
     
@@ -379,14 +541,21 @@ class GameService:
         GameService.click_in_window(pid, GamePositions.START_ROOM.value)
 
     @staticmethod
-    def join_room(pid, room):
+    def open_join_dialog(pid):
         GameService.click_in_window(pid, GamePositions.PLAY_WITH_FRIEND.value)
         GameService.click_in_window(pid, GamePositions.JOIN_ROOM.value)
-        time.sleep(0.5)  # 等待输入框出现
+        GameService.settle(pid, 0.5, "join_room:input", profile_registry.get(pid).regions["room_input"])  # 等待输入框出现
+
+    @staticmethod
+    def enter_room_number(pid, room):
         GameService.type_room_number(pid, room)
-        if config.is_thunder_player:
-            # click first to finish the input
+        for _ in range(profile_registry.get(pid).input.room_confirm_clicks - 1):
             GameService.click_in_window(pid, GamePositions.ROOM_INPUT_CONFIRM.value)
-            time.sleep(0.5)
+            GameService.settle(pid, 0.5, "join_room:confirm")
         GameService.click_in_window(pid, GamePositions.ROOM_INPUT_CONFIRM.value)
-        time.sleep(1)  # 等待进入房间
\ No newline at end of file
+        GameService.settle(pid, 1, "join_room:enter")  # 等待进入房间
+
+    @staticmethod
+    def join_room(pid, room):
+        GameService.open_join_dialog(pid)
+        GameService.enter_room_number(pid, room)
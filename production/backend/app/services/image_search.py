@@ -0,0 +1,64 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+from app.utils.buffer_pool import BufferPool
+from app.utils.logger import logger
+from app.utils.vision import SearchMode, find_template
+
+# Shared by find_images, template matching releases the GIL so it scales across cores
+_match_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="template-match")
+
+
+def match_image(screenshot_gray: np.ndarray, image_file_name: str, template_gray: np.ndarray, confidence: float,
+                search: SearchMode, pool: Optional[BufferPool] = None, tag: Hashable = None) -> dict:
+    """Match one template in a screenshot, as find_image reports it: found, position (center) and confidence."""
+    max_val, max_loc = find_template(screenshot_gray, template_gray, search, pool, tag)
+    logger.info(f"Template {image_file_name} match confidence: {max_val:.2f}")
+
+    if max_val < confidence:
+        logger.warning(f"Match confidence {max_val:.2f} below threshold {confidence}")
+        return {"found": False, "confidence": float(max_val)}
+
+    # Calculate position relative to window
+    center_x = max_loc[0] + template_gray.shape[1] // 2
+    center_y = max_loc[1] + template_gray.shape[0] // 2
+    return {
+        "found": True,
+        "position": {"x": center_x, "y": center_y},
+        "confidence": float(max_val)
+    }
+
+
+def find_images(capture: Callable[[], np.ndarray], templates: Dict[str, np.ndarray], confidence: float = 0.8,
+                search: SearchMode = 'exhaustive', pool: Optional[BufferPool] = None,
+                executor: Executor = _match_executor) -> dict:
+    """
+    Match several templates in one screenshot taken with `capture`, concurrently on `executor`.
+
+    Returns one match_image result per template and the total, capture and per-template timings.
+    """
+    start = time.perf_counter()
+    screenshot_gray = capture()
+    capture_time = time.perf_counter() - start
+
+    def timed_match(name):
+        match_start = time.perf_counter()
+        # one result buffer per template, the matches run at the same time
+        result = match_image(screenshot_gray, name, templates[name], confidence, search, pool, tag=name)
+        return result, time.perf_counter() - match_start
+
+    futures = {name: executor.submit(timed_match, name) for name in templates}
+    results, template_times = {}, {}
+    for name, future in futures.items():
+        results[name], template_times[name] = future.result()
+
+    return {
+        "results": results,
+        "timings": {
+            "total_ms": round((time.perf_counter() - start) * 1000, 3),
+            "capture_ms": round(capture_time * 1000, 3),
+            "templates_ms": {name: round(elapsed * 1000, 3) for name, elapsed in template_times.items()},
+        }
+    }
@@ -1,11 +1,13 @@
 import cv2
 import numpy as np
-from PIL import Image
-from fastapi import HTTPException
-from pathlib import Path
+from typing import List
 from app.services.window_control_services import WindowControlService
 from app.services.utility_services import UtilityService
+from app.services.template_store import template_store
+from app.utils.buffer_pool import buffer_pools
 from app.utils.logger import logger
+from app.services.image_search import find_images, match_image
+from app.utils.vision import SearchMode
 
 # Check if CUDA is available
 USE_CUDA = cv2.cuda.getCudaEnabledDeviceCount() > 0
@@ -29,17 +31,21 @@ class ImageService:
 
     @staticmethod
     def load_template(image_file_name: str) -> np.ndarray:
-        """Load and process template image."""
-        image_path = UtilityService.get_public_path() / "images"/ (image_file_name.encode('utf-8').decode('utf-8') + ".jpg")
-        if not image_path.exists():
-            raise HTTPException(status_code=404, detail=f"Image file {image_file_name} not found: {image_path}")
-        template = np.array(Image.open(image_path))
-        try:
-            return cv2.cvtColor(template, cv2.COLOR_RGB2GRAY)
-        except:
-            return template
-
-    def find_image(self, window_pid: int, image_file_name: str, confidence: float = 0.8):
+        """Get the grayscale template image from the template store (read-only, do not modify)."""
+        return template_store.get(image_file_name)
+
+    @staticmethod
+    def preload_templates() -> int:
+        """Decode all templates under public/images into memory."""
+        return template_store.preload()
+
+    @staticmethod
+    def get_template_stats() -> dict:
+        """Get hit/miss/reload counters of the template store."""
+        return template_store.stats()
+
+    def find_image(self, window_pid: int, image_file_name: str, confidence: float = 0.8,
+                   search: SearchMode = 'exhaustive'):
         """
         Find the given template in the window's screenshot.
 
@@ -47,6 +53,8 @@ class ImageService:
             window_pid: The PID of the window to control
             image_file_name: The name of the template image file to match
             confidence: Minimum confidence threshold for matching (default: 0.8)
+            search: 'exhaustive' full resolution search, or 'pyramid' coarse-to-fine search
+                    (same confidence scale, several times faster on the full window)
 
         Returns:
             Dict with found status, position, and confidence
@@ -56,24 +64,38 @@ class ImageService:
         screenshot_gray = WindowControlService.capture_region(window, None)
 
         logger.info("Performing template matching...")
-        result = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        logger.info(f"Template {image_file_name} match confidence: {max_val:.2f}")
+        return self._match(window, screenshot_gray, image_file_name, template_gray, confidence, search)
 
-        if max_val < confidence:
-            logger.warning(f"Match confidence {max_val:.2f} below threshold {confidence}")
-            return {"found": False, "confidence": float(max_val)}
+    @staticmethod
+    def _match(window, screenshot_gray: np.ndarray, image_file_name: str, template_gray: np.ndarray,
+               confidence: float, search: SearchMode, tag=None) -> dict:
+        return match_image(screenshot_gray, image_file_name, template_gray, confidence, search,
+                           buffer_pools.for_window(window), tag)
 
-        # Calculate position relative to window
-        center_x = max_loc[0] + template_gray.shape[1] // 2
-        center_y = max_loc[1] + template_gray.shape[0] // 2
-        return {
-            "found": True,
-            "position": {"x": center_x, "y": center_y},
-            "confidence": float(max_val)
-        }
+    def find_images(self, window_pid: int, image_file_names: List[str], confidence: float = 0.8,
+                    search: SearchMode = 'exhaustive'):
+        """
+        Find several templates in one screenshot of the window.
+
+        The window is captured once and the template matches run concurrently on a thread pool
+        (OpenCV releases the GIL while matching).
+
+        Args:
+            window_pid: The PID of the window to control
+            image_file_names: The names of the template image files to match
+            confidence: Minimum confidence threshold for matching (default: 0.8)
+            search: Template search mode, see find_image
+
+        Returns:
+            Dict with one find_image result per template and the total, capture and per-template timings
+        """
+        window = WindowControlService.find_window(window_pid)
+        templates = {name: self.load_template(name) for name in image_file_names}
+        return find_images(lambda: WindowControlService.capture_region(window, None), templates, confidence,
+                           search, buffer_pools.for_window(window))
 
-    def click_on_image(self, window_pid: int, image_file_name: str, confidence: float = 0.8):
+    def click_on_image(self, window_pid: int, image_file_name: str, confidence: float = 0.8,
+                       search: SearchMode = 'exhaustive'):
         """
         Focus window by PID and click on location matching template image.
 
@@ -81,11 +103,12 @@ class ImageService:
             window_pid: The PID of the window to control
             image_file_name: The name of the template image file to match
             confidence: Minimum confidence threshold for matching (default: 0.8)
+            search: Template search mode, see find_image
 
         Returns:
             Dict with click location and success status
         """
-        result = self.find_image(window_pid, image_file_name, confidence)
+        result = self.find_image(window_pid, image_file_name, confidence, search)
         if not result.get("found"):
             return {"error": "Template match confidence below threshold"}
         click_x = result["position"]["x"]
@@ -0,0 +1,289 @@
+import heapq
+import itertools
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.enums.input_kind import InputKind
+from app.models.input_command import InputCommand
+from app.utils.logger import logger
+from app.utils.metrics import LatencyGroup, metrics
+
+
+class PreciseTimer:
+    """
+    Hybrid sleep-then-spin timer: sleeps until `spin` seconds before the deadline, then busy-waits
+    on perf_counter. The OS sleep alone overshoots by up to a scheduler tick (1-16 ms on Windows).
+    """
+
+    def __init__(self, spin: float = 0.002, clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.spin = spin
+        self._clock = clock
+        self._sleep = sleep
+
+    def sleep_until(self, deadline: float) -> None:
+        remaining = deadline - self._clock()
+        if remaining > self.spin:
+            self._sleep(remaining - self.spin)
+        while self._clock() < deadline:
+            pass
+
+
+class InputSink:
+    """Interface of the input backends; coordinates are relative to the window."""
+
+    def click(self, hwnd: int, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def move(self, hwnd: int, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def key(self, hwnd: int, key: str) -> None:
+        raise NotImplementedError
+
+    def text(self, hwnd: int, text: str) -> None:
+        raise NotImplementedError
+
+
+class Win32InputSink(InputSink):
+    """Window messages (PostMessage/SendMessage), the input the native client accepts in the background."""
+
+    def __init__(self):
+        import ctypes
+        import win32api
+        import win32con
+        import win32gui
+        from app.services.window_control_services import WindowControlService
+        self._win32api = win32api
+        self._win32con = win32con
+        self._win32gui = win32gui
+        self._windows = WindowControlService
+        # 1 ms scheduler ticks, so the sleep part of PreciseTimer ends close to where the spin starts
+        ctypes.windll.winmm.timeBeginPeriod(1)
+
+    def click(self, hwnd: int, x: int, y: int) -> None:
+        self._windows.click_at(hwnd, x, y)
+
+    def move(self, hwnd: int, x: int, y: int) -> None:
+        self._win32gui.PostMessage(hwnd, self._win32con.WM_MOUSEMOVE, 0, self._win32api.MAKELONG(x, y))
+
+    def key(self, hwnd: int, key: str) -> None:
+        if len(key) == 1:
+            vk = self._win32api.VkKeyScan(key) & 0xff
+        else:
+            vk = getattr(self._win32con, f"VK_{key.upper()}")
+        self._win32gui.PostMessage(hwnd, self._win32con.WM_KEYDOWN, vk, 0)
+        self._win32gui.PostMessage(hwnd, self._win32con.WM_KEYUP, vk, 0)
+
+    def text(self, hwnd: int, text: str) -> None:
+        self._windows.type_text(hwnd, text)
+
+
+class FakeInputSink(InputSink):
+    """Records the input instead of sending it, for tests and off Windows."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.events: List[Tuple[float, str, int, Any]] = []  # (time, kind, hwnd, args)
+
+    def _record(self, kind: str, hwnd: int, args: Any) -> None:
+        with self._lock:
+            self.events.append((self._clock(), kind, hwnd, args))
+
+    def click(self, hwnd: int, x: int, y: int) -> None:
+        self._record("click", hwnd, (x, y))
+
+    def move(self, hwnd: int, x: int, y: int) -> None:
+        self._record("move", hwnd, (x, y))
+
+    def key(self, hwnd: int, key: str) -> None:
+        self._record("key", hwnd, key)
+
+    def text(self, hwnd: int, text: str) -> None:
+        self._record("text", hwnd, text)
+
+
+class InputDispatcher:
+    """
+    Input queue of one window, executed in deadline order on its own thread.
+
+    Commands carry the perf_counter time they should run at; equal times keep submission order.
+    Moves that are overdue when the next move is due too are dropped, only the last position
+    matters. Scheduling jitter (execution time - deadline) is recorded per kind.
+    """
+
+    def __init__(self, hwnd: int, sink: InputSink, timer: PreciseTimer, jitter: LatencyGroup,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.hwnd = hwnd
+        self._sink = sink
+        self._timer = timer
+        self._jitter = jitter
+        self._clock = clock
+        self._queue: List[Tuple[float, int, InputCommand]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.executed = 0
+        self.merged_moves = 0
+        self.max_depth = 0
+        self._thread = threading.Thread(target=self._run, name=f"input-{hwnd}", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, kind: InputKind, x: int = 0, y: int = 0, value: Optional[str] = None,
+               at: Optional[float] = None, delay: float = 0.0, wait: bool = False,
+               callback: Optional[Callable[[], Any]] = None) -> InputCommand:
+        """
+        Queue a command for `at` (perf_counter time), or `delay` seconds from now. With `wait` the
+        call returns once it ran and raises its error; don't wait from a callback, it runs on the
+        dispatcher thread.
+        """
+        command = InputCommand(kind, at if at is not None else self._clock() + delay, x, y, value, callback)
+        with self._condition:
+            if self._closed:
+                raise Exception(f"Input dispatcher of window {self.hwnd} is closed")
+            heapq.heappush(self._queue, (command.at, next(self._sequence), command))
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._condition.notify()
+        if wait:
+            command.done.wait()
+            if command.error:
+                raise Exception(command.error)
+        return command
+
+    def click(self, x: int, y: int, **kwargs) -> InputCommand:
+        return self.submit(InputKind.CLICK, x, y, **kwargs)
+
+    def move(self, x: int, y: int, **kwargs) -> InputCommand:
+        return self.submit(InputKind.MOVE, x, y, **kwargs)
+
+    def key(self, key: str, **kwargs) -> InputCommand:
+        return self.submit(InputKind.KEY, value=key, **kwargs)
+
+    def text(self, text: str, **kwargs) -> InputCommand:
+        return self.submit(InputKind.TEXT, value=text, **kwargs)
+
+    def _next(self) -> Optional[InputCommand]:
+        """Block until the head of the queue is within the spin window of its deadline and pop it."""
+        with self._condition:
+            while True:
+                if not self._queue:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                remaining = self._queue[0][0] - self._clock() - self._timer.spin
+                if remaining > 0:
+                    # woken up early by a new command, which may be due first
+                    self._condition.wait(remaining)
+                    continue
+                command = heapq.heappop(self._queue)[2]
+                now = self._clock()
+                while command.kind == InputKind.MOVE and self._queue and \
+                        self._queue[0][2].kind == InputKind.MOVE and self._queue[0][0] <= now:
+                    command.done.set()
+                    self.merged_moves += 1
+                    command = heapq.heappop(self._queue)[2]
+                return command
+
+    def _execute(self, command: InputCommand) -> None:
+        kind = command.kind
+        if kind == InputKind.CLICK:
+            self._sink.click(self.hwnd, command.x, command.y)
+        elif kind == InputKind.MOVE:
+            self._sink.move(self.hwnd, command.x, command.y)
+        elif kind == InputKind.KEY:
+            self._sink.key(self.hwnd, command.value)
+        else:
+            self._sink.text(self.hwnd, command.value)
+
+    def _run(self) -> None:
+        while True:
+            command = self._next()
+            if command is None:
+                return
+            self._timer.sleep_until(command.at)
+            command.executed_at = self._clock()
+            self._jitter.record(command.kind.value, command.executed_at - command.at)
+            try:
+                self._execute(command)
+                if command.callback is not None:
+                    command.callback()
+            except Exception as e:
+                command.error = str(e)
+                logger.error(f"[InputDispatcher] {command.kind.value} to window {self.hwnd} failed: {str(e)}")
+            self.executed += 1
+            command.done.set()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Stop once the queued commands ran."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "executed": self.executed,
+            "merged_moves": self.merged_moves,
+        }
+
+
+class InputDispatchers:
+    """InputDispatcher per window, created on first use, all sending to the same sink."""
+
+    def __init__(self, sink: Optional[InputSink] = None, timer: Optional[PreciseTimer] = None):
+        self._sink = sink
+        self.timer = timer or PreciseTimer()
+        self.jitter = LatencyGroup()
+        self._dispatchers: Dict[int, InputDispatcher] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sink(self) -> InputSink:
+        if self._sink is None:
+            self._sink = Win32InputSink() if sys.platform == "win32" else FakeInputSink()
+        return self._sink
+
+    def set_sink(self, sink: InputSink) -> None:
+        self.close()
+        self._sink = sink
+
+    def for_window(self, hwnd: Union[int, str]) -> InputDispatcher:
+        hwnd = int(hwnd)
+        dispatcher = self._dispatchers.get(hwnd)
+        if dispatcher is None:
+            with self._lock:
+                dispatcher = self._dispatchers.get(hwnd)
+                if dispatcher is None:
+                    dispatcher = InputDispatcher(hwnd, self.sink, self.timer, self.jitter)
+                    self._dispatchers[hwnd] = dispatcher
+        return dispatcher
+
+    def close(self, hwnd: Optional[Union[int, str]] = None) -> None:
+        with self._lock:
+            hwnds = list(self._dispatchers) if hwnd is None else [int(hwnd)]
+            dispatchers = [self._dispatchers.pop(key) for key in hwnds if key in self._dispatchers]
+        for dispatcher in dispatchers:
+            dispatcher.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            dispatchers = dict(self._dispatchers)
+        return {
+            "sink": type(self._sink).__name__ if self._sink is not None else None,
+            "windows": {hwnd: dispatcher.stats() for hwnd, dispatcher in dispatchers.items()},
+            "jitter": self.jitter.snapshot(),
+        }
+
+
+# Create a global input dispatchers instance
+input_dispatchers = InputDispatchers()
+metrics.register("input", input_dispatchers.stats)
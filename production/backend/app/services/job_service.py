@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.enums.job_status import JobStatus
+from app.models.job import Job, JobStep
+from app.utils.logger import logger
+from app.utils.metrics import LatencyGroup, metrics
+
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+# abort events of the run_parallel groups the current step runs in, innermost last
+_aborts: contextvars.ContextVar[Tuple[Event, ...]] = contextvars.ContextVar("aborts", default=())
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job at its next checkpoint after it was cancelled.
+
+    A BaseException like asyncio.CancelledError, so the `except Exception` blocks of the game flows
+    don't turn a cancellation into an ordinary failure.
+    """
+
+
+class StepAborted(BaseException):
+    """Raised at the next checkpoint of a run_parallel step once another step of its group failed."""
+
+
+def current_job() -> Optional[Job]:
+    return _current_job.get()
+
+
+def checkpoint() -> None:
+    """Stop the current job here if it was cancelled, or this step if a parallel step failed."""
+    job = _current_job.get()
+    if job is not None and job.cancel_event.is_set():
+        raise JobCancelled(job.id)
+    if any(abort.is_set() for abort in _aborts.get()):
+        raise StepAborted()
+
+
+def run_parallel(executor: Executor, steps: List[Callable[[], Any]]) -> List[Any]:
+    """
+    Run steps concurrently in the context of the caller (e.g. as part of its job) and return their
+    results in order. When a step raises, the others stop at their next checkpoint, and the error
+    is raised once every step ended, so no step keeps sending input after its group failed.
+    """
+    abort = Event()
+
+    def run(step):
+        _aborts.set(_aborts.get() + (abort,))
+        try:
+            return step()
+        except BaseException:
+            abort.set()
+            raise
+
+    futures = [executor.submit(contextvars.copy_context().run, run, step) for step in steps]
+    wait(futures)
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        # the step that failed first, not the siblings it stopped
+        raise next((error for error in errors if not isinstance(error, StepAborted)), errors[0])
+    return [future.result() for future in futures]
+
+
+@contextmanager
+def job_step(name: str):
+    """Record a named step of the current job (timing and progress). A no-op outside jobs."""
+    job = _current_job.get()
+    if job is None:
+        yield
+        return
+    checkpoint()
+    step = JobStep(name, time.time() - job.started_at)
+    job.steps.append(step)
+    job_service.publish(job)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        step.elapsed = time.perf_counter() - start
+        job_service.step_latency.record(f"{job.kind}:{name}", step.elapsed)
+        job_service.publish(job)
+
+
+class JobService:
+    """
+    Runs long blocking operations (game start flows) on worker threads as jobs.
+
+    Jobs are identified by an ID, report their steps and progress through `publish` (e.g. an SSE
+    broadcast on the event loop) and can be cancelled; a cancelled job stops at its next checkpoint.
+    """
+
+    def __init__(self, max_workers: int = 8, history: int = 200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._history = history
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._broadcast: Optional[Callable[[Dict], Awaitable[None]]] = None
+        self.step_latency = LatencyGroup()
+        self.job_latency = LatencyGroup()
+
+    def bind(self, loop: asyncio.AbstractEventLoop, broadcast: Callable[[Dict], Awaitable[None]]) -> None:
+        """Publish job updates with `broadcast`, a coroutine function scheduled on `loop`."""
+        self._loop = loop
+        self._broadcast = broadcast
+
+    def publish(self, job: Job) -> None:
+        if self._loop is None or self._broadcast is None or self._loop.is_closed():
+            return
+        data = job.to_dict()
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._loop.create_task(self._broadcast(data))
+                return
+        except RuntimeError:
+            pass  # not on the event loop thread
+        asyncio.run_coroutine_threadsafe(self._broadcast(data), self._loop)
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, params: Optional[Dict] = None,
+               total_steps: Optional[int] = None, executor: Optional[Executor] = None) -> Job:
+        """
+        Queue `fn(*args)` as a job and return it right away. It runs on the shared job workers,
+        or on `executor` for callers with their own workers (e.g. one per window pair).
+        """
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, params=params or {}, total_steps=total_steps)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+            # published before a worker can pick it up, so clients see it queued first
+            self.publish(job)
+            self._futures[job.id] = (executor or self._executor).submit(self._run, job, fn, args)
+        logger.info(f"[JobService] Queued job {job.id} ({kind})")
+        return job
+
+    def _evict(self) -> None:
+        """Drop the oldest finished jobs beyond `history`; unfinished jobs are kept however old."""
+        excess = len(self._jobs) - self._history
+        if excess <= 0:
+            return
+        for job in [job for job in self._jobs.values() if job.done][:excess]:
+            del self._jobs[job.id]
+            self._futures.pop(job.id, None)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args) -> None:
+        if job.cancel_event.is_set():
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            self.publish(job)
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        self.publish(job)
+        token = _current_job.set(job)
+        try:
+            job.result = fn(*args)
+            if job.result is False:
+                job.status = JobStatus.FAILED
+                job.error = f"{job.kind} did not complete"
+            else:
+                job.status = JobStatus.SUCCEEDED
+        except JobCancelled:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"[JobService] Job {job.id} ({job.kind}) failed: {str(e)}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            _current_job.reset(token)
+            job.finished_at = time.time()
+            self.job_latency.record(f"{job.kind}:{job.status.value}", job.finished_at - job.started_at)
+            logger.info(f"[JobService] Job {job.id} ({job.kind}) {job.status.value}")
+            self.publish(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job, or ask a running one to stop at its next checkpoint."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_event.set()
+        if future is not None and future.cancel():
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            self.publish(job)
+        logger.info(f"[JobService] Cancel requested for job {job_id}")
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = self.list()
+        by_status = {status.value: 0 for status in JobStatus}
+        for job in jobs:
+            by_status[job.status.value] += 1
+        return {
+            "jobs": by_status,
+            "jobs_latency": self.job_latency.snapshot(),
+            "steps": self.step_latency.snapshot(),
+        }
+
+
+# Create a global job service instance
+job_service = JobService()
+metrics.register("jobs", job_service.stats)
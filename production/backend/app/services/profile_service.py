@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from app.enums.player_profiles import PlayerProfile
+from app.models.detector import Detector
+from app.services.detector_service import DetectorRegistry
+from app.services.digit_recognizer import DigitRecognizer, DigitRecognizers
+from app.services.template_store import TemplateStore
+from app.utils.logger import logger
+
+Region = Tuple[int, int, int, int]
+Position = Tuple[int, int]
+
+# Regions (x, y, width, height) read directly by the game flows, per player profile
+PROFILE_REGIONS: Dict[str, Dict[str, Region]] = {
+    PlayerProfile.NATIVE.value: {
+        "room_number": (490, 345, 80, 30),
+        "room_input": (425, 340, 200, 40),
+    },
+    PlayerProfile.THUNDER.value: {
+        "room_number": (490, 335, 80, 30),
+        "room_input": (425, 340, 200, 40),
+    },
+}
+
+
+@dataclass(frozen=True)
+class InputStrategy:
+    """How input is sent to a client."""
+    click: Callable[[Any, int, int], Any]  # click(hwnd, x, y)
+    type_text: Callable[[Any, str], Any]  # type_text(hwnd, text)
+    after_typing: Tuple[Position, ...] = ()  # clicks that close the text input
+    room_confirm_clicks: int = 1  # clicks on the room input confirm button to enter the room
+    resize_window: bool = True  # resize the window to 1056x637 when locating it
+
+
+@dataclass(frozen=True)
+class WindowProfile:
+    """
+    Everything a window's player profile decides, resolved once when the profile is built: the
+    detectors of the profile, its regions and how input is sent. Its digit glyphs are resolved on
+    use, they may be harvested while the app runs.
+    """
+    name: str  # PlayerProfile value
+    regions: Dict[str, Region]
+    detectors: Dict[str, Detector] = field(repr=False)
+    digit_glyphs: Callable[[], Optional[DigitRecognizer]] = field(repr=False)
+    input: InputStrategy = field(repr=False)
+
+    @property
+    def digits(self) -> Optional[DigitRecognizer]:
+        """Glyph recognizer of the profile, None while it has no glyphs."""
+        return self.digit_glyphs()
+
+
+class ProfileRegistry:
+    """
+    Player profile per window handle, so native and Thunder clients can be driven side by side.
+
+    Windows that were not bound use the default profile (set by /set-thunder-player). Profiles are
+    built once per name and shared by the windows bound to them.
+    """
+
+    def __init__(self, detectors: Callable[[], DetectorRegistry], digits: DigitRecognizers,
+                 templates: TemplateStore, inputs: Dict[str, InputStrategy],
+                 default: str = PlayerProfile.NATIVE.value):
+        self._detectors = detectors
+        self._digits = digits
+        self._templates = templates
+        self._inputs = inputs
+        self._profiles: Dict[str, WindowProfile] = {}
+        self._bound: Dict[int, WindowProfile] = {}
+        self._lock = Lock()
+        self._default_name = default
+        self._default: Optional[WindowProfile] = None
+
+    def profile(self, name: str) -> WindowProfile:
+        """The WindowProfile named `name` (a PlayerProfile value), built on first use."""
+        with self._lock:
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._build(name)
+                self._profiles[name] = profile
+            return profile
+
+    def _build(self, name: str) -> WindowProfile:
+        if name not in self._inputs:
+            raise ValueError(f"Unknown player profile: {name}")
+        registry = self._detectors()
+        detectors = {}
+        for detector_name in registry.names():
+            detector = registry.get(detector_name, name)
+            if detector is not None:
+                detectors[detector_name] = detector
+                try:
+                    # warm the store, the first detection shouldn't pay for decoding
+                    self._templates.get(detector.template)
+                except Exception as e:
+                    logger.error(f"[ProfileRegistry] Failed to load template {detector.template}: {e}")
+        registry.validate(self._templates, name)
+        logger.info(f"[ProfileRegistry] Built profile {name} with {len(detectors)} detectors")
+        return WindowProfile(
+            name=name,
+            regions=dict(PROFILE_REGIONS[name]),
+            detectors=detectors,
+            digit_glyphs=lambda: self._digits.get(name),
+            input=self._inputs[name],
+        )
+
+    @property
+    def default(self) -> WindowProfile:
+        if self._default is None:
+            self._default = self.profile(self._default_name)
+        return self._default
+
+    def set_default(self, name: str) -> WindowProfile:
+        """Profile of the windows that were not bound to one."""
+        profile = self.profile(name)
+        self._default_name, self._default = name, profile
+        return profile
+
+    def bind(self, hwnd: Union[int, str], name: str) -> WindowProfile:
+        profile = self.profile(name)
+        with self._lock:
+            self._bound[int(hwnd)] = profile
+        logger.info(f"[ProfileRegistry] Window {hwnd} uses profile {name}")
+        return profile
+
+    def unbind(self, hwnd: Union[int, str]) -> None:
+        with self._lock:
+            self._bound.pop(int(hwnd), None)
+
+    def get(self, hwnd: Union[int, str]) -> WindowProfile:
+        profile = self._bound.get(int(hwnd))
+        return profile if profile is not None else self.default
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            windows = {hwnd: profile.name for hwnd, profile in self._bound.items()}
+        return {"default": self._default_name, "windows": windows}
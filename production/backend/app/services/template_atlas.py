@@ -0,0 +1,134 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.utils.logger import logger
+
+ATLAS_VERSION = 1
+ALIGNMENT = 64  # every template starts on a cache line
+
+
+def template_profile(name: str, names: List[str]) -> str:
+    """Player profile of a template: thunder, native, or shared when both profiles use it."""
+    parts = name.split("/")
+    if name.endswith("_thunder") or "thunder" in parts[:-1]:
+        return "thunder"
+    if "native" in parts[:-1] or f"{name}_thunder" in names:
+        return "native"
+    return "shared"
+
+
+def index_path_for(atlas_path: Path) -> Path:
+    return atlas_path.with_name(atlas_path.name + ".json")
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def build_atlas(images_dir: Path, atlas_path: Path) -> Dict[str, Dict]:
+    """
+    Pack every template under `images_dir` (including the card, vehicle and digit glyph sets) into
+    one uncompressed atlas file, plus an index <atlas>.json of name -> offset/shape/dtype/profile.
+
+    The source mtime, size and SHA-1 are kept per template so the store can tell when a file
+    changed after the atlas was built, also when a copy or install changed every mtime.
+    """
+    # decoded exactly like the store decodes them on demand
+    from app.services.template_store import TemplateStore
+
+    paths = sorted(images_dir.rglob("*.jpg"))
+    names = [path.relative_to(images_dir).with_suffix("").as_posix() for path in paths]
+    entries = {}
+    offset = 0
+    tmp_path = atlas_path.with_name(atlas_path.name + ".tmp")
+    with open(tmp_path, "wb") as atlas:
+        for name, path in zip(names, paths):
+            image = TemplateStore._decode(path)
+            padding = -offset % ALIGNMENT
+            atlas.write(b"\0" * padding)
+            offset += padding
+            atlas.write(image.tobytes())
+            entries[name] = {
+                "offset": offset,
+                "shape": list(image.shape),
+                "dtype": image.dtype.str,
+                "profile": template_profile(name, names),
+                "mtime": os.stat(path).st_mtime_ns,
+                "bytes": os.stat(path).st_size,
+                "sha1": file_digest(path),
+            }
+            offset += image.nbytes
+    os.replace(tmp_path, atlas_path)
+    index_path_for(atlas_path).write_text(
+        json.dumps({"version": ATLAS_VERSION, "size": offset, "templates": entries}, ensure_ascii=False, indent=1),
+        encoding="utf-8",
+    )
+    return entries
+
+
+class TemplateAtlas:
+    """
+    Read-only memory mapping of a prebuilt template atlas.
+
+    Templates are numpy views into the mapping, so loading costs no decoding and no copies, and
+    processes mapping the same atlas share its pages through the OS page cache.
+    """
+
+    def __init__(self, atlas_path: Path):
+        index = json.loads(index_path_for(atlas_path).read_text(encoding="utf-8"))
+        if index.get("version") != ATLAS_VERSION:
+            raise ValueError(f"Unsupported template atlas version {index.get('version')}")
+        self.path = atlas_path
+        self.entries: Dict[str, Dict] = index["templates"]
+        with open(atlas_path, "rb") as atlas:
+            self._mmap = mmap.mmap(atlas.fileno(), 0, access=mmap.ACCESS_READ) if index["size"] else None
+
+    @classmethod
+    def open(cls, atlas_path: Path) -> Optional["TemplateAtlas"]:
+        """Open the atlas if it was built, None otherwise."""
+        if not atlas_path.exists() or not index_path_for(atlas_path).exists():
+            return None
+        try:
+            return cls(atlas_path)
+        except Exception as e:
+            logger.error(f"[TemplateAtlas] Failed to open {atlas_path}: {e}")
+            return None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def names(self, profile: Optional[str] = None) -> List[str]:
+        return sorted(name for name, entry in self.entries.items() if profile is None or entry["profile"] == profile)
+
+    def get(self, name: str) -> np.ndarray:
+        """Return the template as a read-only view into the mapped atlas."""
+        entry = self.entries[name]
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=entry["offset"]).reshape(entry["shape"])
+
+    def mtime(self, name: str) -> int:
+        return self.entries[name]["mtime"]
+
+    def is_current(self, name: str, path: Path, stat: os.stat_result) -> bool:
+        """Whether the template was built from the file as it is now: same mtime, or same size and content."""
+        entry = self.entries[name]
+        if entry["mtime"] == stat.st_mtime_ns:
+            return True
+        # mtimes change on copies and installs, compare the content
+        return "sha1" in entry and entry.get("bytes") == stat.st_size and entry["sha1"] == file_digest(path)
+
+
+## run: python -m app.services.template_atlas [images_dir] [atlas_path]
+## Builds public/templates.atlas (+ .json index) from public/images, run by build_server.py
+if __name__ == "__main__":
+    public = Path(__file__).resolve().parents[3] / "public"
+    source_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else public / "images"
+    target = Path(sys.argv[2]) if len(sys.argv) > 2 else public / "templates.atlas"
+    built = build_atlas(source_dir, target)
+    print(f"Packed {len(built)} templates into {target}")
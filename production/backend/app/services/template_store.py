@@ -0,0 +1,177 @@
+import os
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from fastapi import HTTPException
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+from app.services.template_atlas import TemplateAtlas
+from app.services.utility_services import UtilityService
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+class _TemplateEntry:
+    __slots__ = ("image", "path", "mtime", "checked_at")
+
+    def __init__(self, image: np.ndarray, path: Path, mtime: int, checked_at: float):
+        self.image = image
+        self.path = path
+        self.mtime = mtime
+        self.checked_at = checked_at
+
+
+class TemplateStore:
+    """
+    In-memory store of the grayscale template images under public/images.
+
+    Templates are decoded once and kept as contiguous read-only arrays. The file mtime is
+    re-checked at most every `check_interval` seconds per template, and only templates whose
+    file changed are decoded again.
+
+    When a prebuilt atlas (public/templates.atlas, see template_atlas.py) is present, templates
+    are served as views into its memory mapping instead of being decoded, until their source file
+    changes on disk.
+    """
+
+    def __init__(self, images_dir: Optional[Path] = None, check_interval: float = 1.0,
+                 atlas_path: Optional[Path] = None):
+        self._images_dir = Path(images_dir) if images_dir else None
+        self._atlas_path = Path(atlas_path) if atlas_path else None
+        self._atlas: Optional[TemplateAtlas] = None
+        self._atlas_checked = False
+        self._atlas_stale = 0
+        self.check_interval = check_interval
+        self._entries: Dict[str, _TemplateEntry] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+
+    @property
+    def images_dir(self) -> Path:
+        if self._images_dir is None:
+            self._images_dir = UtilityService.get_public_path() / "images"
+        return self._images_dir
+
+    @property
+    def atlas(self) -> Optional[TemplateAtlas]:
+        """The prebuilt atlas next to the images directory, None when it was not built."""
+        if not self._atlas_checked:
+            self._atlas_checked = True
+            self._atlas = TemplateAtlas.open(self._atlas_path or self.images_dir.parent / "templates.atlas")
+            if self._atlas is not None:
+                logger.info(f"[TemplateStore] Using template atlas {self._atlas.path} ({len(self._atlas.entries)} templates)")
+        return self._atlas
+
+    @staticmethod
+    def _decode(image_path: Path) -> np.ndarray:
+        """Decode a template file into a contiguous read-only grayscale array."""
+        template = np.array(Image.open(image_path))
+        if template.ndim == 3:
+            template = cv2.cvtColor(template, cv2.COLOR_RGB2GRAY)
+        template = np.ascontiguousarray(template)
+        template.flags.writeable = False
+        return template
+
+    def _path_for(self, name: str) -> Path:
+        return self.images_dir / (name + ".jpg")
+
+    def _load(self, name: str, image_path: Path) -> _TemplateEntry:
+        stat = os.stat(image_path)
+        atlas = self.atlas
+        image = None
+        if atlas is not None and name in atlas:
+            if atlas.is_current(name, image_path, stat):
+                image = atlas.get(name)
+            else:
+                self._atlas_stale += 1
+                if self._atlas_stale == 1:
+                    logger.warning(f"[TemplateStore] Template {name} changed since the atlas was built, decoding it "
+                                   f"(and any other stale template) from source; rebuild {atlas.path}")
+        if image is None:
+            image = self._decode(image_path)
+        entry = _TemplateEntry(image, image_path, stat.st_mtime_ns, time.monotonic())
+        self._entries[name] = entry
+        return entry
+
+    def preload(self) -> int:
+        """Load every template under the images directory. Returns the number of templates loaded."""
+        with self._lock:
+            for image_path in sorted(self.images_dir.rglob("*.jpg")):
+                name = image_path.relative_to(self.images_dir).with_suffix("").as_posix()
+                try:
+                    self._load(name, image_path)
+                except Exception as e:
+                    logger.error(f"[TemplateStore] Failed to load template {image_path}: {e}")
+            atlas = self.atlas
+            if atlas is not None:
+                for name in atlas.names():
+                    if name not in self._entries:
+                        self._entries[name] = _TemplateEntry(atlas.get(name), self._path_for(name), atlas.mtime(name), time.monotonic())
+            count = len(self._entries)
+        logger.info(f"[TemplateStore] Preloaded {count} templates from {self.images_dir}")
+        return count
+
+    def get(self, name: str) -> np.ndarray:
+        """Return the grayscale template `name`, reloading it if its file changed on disk."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._misses += 1
+                image_path = self._path_for(name)
+                if not image_path.exists():
+                    atlas = self.atlas
+                    if atlas is not None and name in atlas:
+                        self._entries[name] = _TemplateEntry(atlas.get(name), image_path, atlas.mtime(name), time.monotonic())
+                        return self._entries[name].image
+                    raise HTTPException(status_code=404, detail=f"Image file {name} not found: {image_path}")
+                return self._load(name, image_path).image
+
+            now = time.monotonic()
+            if now - entry.checked_at >= self.check_interval:
+                entry.checked_at = now
+                try:
+                    mtime = os.stat(entry.path).st_mtime_ns
+                except FileNotFoundError:
+                    if self.atlas is not None and name in self.atlas:
+                        # packaged builds may ship the atlas without the source images
+                        self._hits += 1
+                        return entry.image
+                    del self._entries[name]
+                    raise HTTPException(status_code=404, detail=f"Image file {name} not found: {entry.path}")
+                if mtime != entry.mtime:
+                    self._reloads += 1
+                    logger.info(f"[TemplateStore] Template {name} changed on disk, reloading")
+                    return self._load(name, entry.path).image
+
+            self._hits += 1
+            return entry.image
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop one template, or all of them, so the next lookup reads from disk."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            atlas = self._atlas
+            return {
+                "templates": len(self._entries),
+                "atlas": len(atlas.entries) if atlas is not None else 0,
+                "bytes": sum(entry.image.nbytes for entry in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "reloads": self._reloads,
+                "atlas_stale": self._atlas_stale,
+            }
+
+
+# Create a global template store instance
+template_store = TemplateStore()
+metrics.register("templates", template_store.stats)
@@ -0,0 +1,246 @@
+import asyncio
+import sys
+import time
+import cv2
+import numpy as np
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from app.enums.shortcut_positions import (
+    GameMode, SingleModeVehiclePositions, SingleModeEnemyVehiclePositions, TwoModeLeftVehiclePositions,
+    TwoModeRightVehiclePositions, SailModeVehiclePositions, SkyTwoModeLeftVehiclePositions,
+    SkyTwoModeRightVehiclePositions,
+)
+from app.services.card_recognizer import CardIndex
+from app.services.template_store import TemplateStore, template_store
+from app.utils.logger import logger
+from app.utils.metrics import LatencyStats
+
+Region = Tuple[int, int, int, int]
+CaptureFn = Callable[[int, Optional[Region]], np.ndarray]
+# {'left': {0: {'card': '火灵', 'level': 3, 'confidence': 0.97}, ...}, 'right': {...}}
+VehicleState = Dict[str, Dict[int, Dict]]
+
+# Vehicle slot positions per side for every game mode that has vehicles
+VEHICLE_LAYOUTS: Dict[int, Dict[str, Type[Enum]]] = {
+    GameMode.SINGLE_PLAYER.value: {'left': SingleModeVehiclePositions, 'right': SingleModeEnemyVehiclePositions},
+    GameMode.SINGLE_PLAYER_SAILING.value: {'left': SailModeVehiclePositions},
+    GameMode.TWO_PLAYER.value: {'left': TwoModeLeftVehiclePositions, 'right': TwoModeRightVehiclePositions},
+    GameMode.TWO_PLAYER_SKY.value: {'left': SkyTwoModeLeftVehiclePositions, 'right': SkyTwoModeRightVehiclePositions},
+}
+
+SLOT_SIZE = (36, 36)  # (width, height) of the crop centered on a VEHICLE_x position
+LEVEL_SEPARATOR = "@"  # vehicle portraits are named <card>@<level>, e.g. 火灵@3
+
+
+def slot_positions(mode: int) -> List[Tuple[str, int, Tuple[int, int]]]:
+    """(side, slot index, (x, y)) of every vehicle slot of the game mode."""
+    return [
+        (side, int(slot.name.split("_")[-1]), slot.value)
+        for side, positions in VEHICLE_LAYOUTS.get(mode, {}).items()
+        for slot in positions
+    ]
+
+
+def vehicle_area(mode: int) -> Optional[Region]:
+    """Bounding box of all vehicle slots of the game mode, captured once per read."""
+    positions = slot_positions(mode)
+    if not positions:
+        return None
+    width, height = SLOT_SIZE
+    left = min(x for _, _, (x, _) in positions) - width // 2
+    top = min(y for _, _, (_, y) in positions) - height // 2
+    right = max(x for _, _, (x, _) in positions) + width - width // 2
+    bottom = max(y for _, _, (_, y) in positions) + height - height // 2
+    return max(left, 0), max(top, 0), right - max(left, 0), bottom - max(top, 0)
+
+
+def parse_portrait_name(name: str) -> Tuple[str, Optional[int]]:
+    card, _, level = name.partition(LEVEL_SEPARATOR)
+    return card, int(level) if level.isdigit() else None
+
+
+def same_row(state: VehicleState, mode: int, cards: Iterable[str], side: str = 'left') -> bool:
+    """
+    Whether the given cards sit in the same row of the vehicle.
+
+    Cards that are not on the vehicle yet can still be placed anywhere, so only the slots of the
+    cards already on it are compared.
+    """
+    positions = {index: position for slot_side, index, position in slot_positions(mode) if slot_side == side}
+    rows = set()
+    for card in cards:
+        for index, slot in state.get(side, {}).items():
+            if slot.get('card') == card and index in positions:
+                rows.add(positions[index][1])
+    return len(rows) <= 1
+
+
+class VehicleReader:
+    """
+    Reads the card and level of every vehicle slot of both sides from one capture.
+
+    Slots are cropped from a single capture of the vehicle area and classified in one batched
+    nearest-neighbour pass against the portraits under public/images/vehicle/<card>@<level>.jpg.
+    """
+
+    def __init__(self, capture: CaptureFn, templates: TemplateStore = template_store,
+                 min_confidence: float = 0.8, index: Optional[CardIndex] = None):
+        self._capture = capture
+        self._templates = templates
+        self.min_confidence = min_confidence
+        self._index = index
+        self._lock = Lock()
+        self._states: Dict[int, VehicleState] = {}
+        self.latency = LatencyStats()
+
+    @property
+    def index(self) -> CardIndex:
+        with self._lock:
+            if self._index is None:
+                self._index = CardIndex.from_templates(self._templates, "vehicle")
+                if not len(self._index):
+                    logger.warning("[VehicleReader] No vehicle portraits under images/vehicle")
+            return self._index
+
+    def reload(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def classify(self, area: np.ndarray, origin: Tuple[int, int], mode: int) -> VehicleState:
+        """Classify every slot of `mode` in `area`, a capture whose top-left is at window `origin`."""
+        positions = slot_positions(mode)
+        state: VehicleState = {side: {} for side in VEHICLE_LAYOUTS.get(mode, {})}
+        index = self.index
+        if not positions or not len(index):
+            return state
+
+        width, height = SLOT_SIZE
+        descriptors = []
+        for _, _, (x, y) in positions:
+            left, top = x - width // 2 - origin[0], y - height // 2 - origin[1]
+            descriptors.append(CardIndex.descriptor(area[top:top + height, left:left + width]))
+        # one nearest-neighbour pass over all slots: (slots x D) @ (D x portraits)
+        scores = np.stack(descriptors) @ index.matrix.T
+        best = scores.argmax(axis=1)
+        for (side, slot, _), portrait, row in zip(positions, best, scores):
+            confidence = float(row[portrait])
+            card, level = parse_portrait_name(index.names[portrait]) if confidence >= self.min_confidence else (None, None)
+            state[side][slot] = {'card': card, 'level': level, 'confidence': round(confidence, 3)}
+        return state
+
+    def read(self, hwnd: int, mode: int) -> VehicleState:
+        """Capture the vehicle area of the window once and classify every slot."""
+        start = time.perf_counter()
+        area = vehicle_area(mode)
+        if area is None:
+            return {}
+        state = self.classify(self._capture(hwnd, area), area[:2], mode)
+        self.latency.record(time.perf_counter() - start)
+        return state
+
+    def changes(self, hwnd: int, state: VehicleState) -> List[Dict]:
+        """
+        Slots whose card or level changed since the previous state of the window, as
+        broadcast_vehicle payloads: [{'side': 'left', 'info': {1: {'card': ..., 'level': ...}}}].
+        """
+        with self._lock:
+            previous = self._states.get(hwnd, {})
+            self._states[hwnd] = state
+        payloads = []
+        for side, slots in state.items():
+            info = {
+                index: {'card': slot['card'], 'level': slot['level']}
+                for index, slot in slots.items()
+                if (slot['card'], slot['level']) != (previous.get(side, {}).get(index, {}).get('card'),
+                                                     previous.get(side, {}).get(index, {}).get('level'))
+            }
+            if info:
+                payloads.append({'side': side, 'info': info})
+        return payloads
+
+    def last_state(self, hwnd: int) -> Optional[VehicleState]:
+        with self._lock:
+            return self._states.get(hwnd)
+
+    def forget(self, hwnd: int) -> None:
+        with self._lock:
+            self._states.pop(hwnd, None)
+
+    def stats(self) -> Dict:
+        return {
+            "portraits": len(self._index) if self._index is not None else 0,
+            "read": self.latency.snapshot(),
+        }
+
+
+class VehicleMonitor:
+    """Polls the vehicle state of windows and broadcasts the slots that changed."""
+
+    def __init__(self, reader: VehicleReader, broadcast: Callable[[Dict, Optional[list]], Awaitable[None]],
+                 interval: float = 0.25):
+        self._reader = reader
+        self._broadcast = broadcast
+        self.interval = interval
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def is_running(self, pid: str) -> bool:
+        task = self._tasks.get(pid)
+        return task is not None and not task.done()
+
+    def start(self, pid: str, mode: int) -> None:
+        self.stop(pid)
+        self._tasks[pid] = asyncio.get_running_loop().create_task(self._poll(pid, mode))
+        logger.info(f"[VehicleMonitor] Started for window {pid}, mode {mode}")
+
+    def stop(self, pid: str) -> None:
+        task = self._tasks.pop(pid, None)
+        if task is not None:
+            task.cancel()
+            self._reader.forget(int(pid))
+            logger.info(f"[VehicleMonitor] Stopped for window {pid}")
+
+    async def _poll(self, pid: str, mode: int) -> None:
+        hwnd = int(pid)
+        while True:
+            started = time.monotonic()
+            try:
+                state = await asyncio.to_thread(self._reader.read, hwnd, mode)
+                for payload in self._reader.changes(hwnd, state):
+                    await self._broadcast(payload, [pid])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[VehicleMonitor] Failed to read vehicles of window {pid}: {str(e)}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def harvest_portraits(frame: np.ndarray, mode: int, labels: Dict[Tuple[str, int], str], output_dir: Path) -> List[Path]:
+    """Save the slot crops of a full-window frame as <card>@<level> vehicle portraits."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    width, height = SLOT_SIZE
+    saved = []
+    for side, slot, (x, y) in slot_positions(mode):
+        name = labels.get((side, slot))
+        if not name:
+            continue
+        left, top = x - width // 2, y - height // 2
+        path = output_dir / f"{name}.jpg"
+        cv2.imencode(".jpg", frame[top:top + height, left:left + width], [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tofile(str(path))
+        saved.append(path)
+    return saved
+
+
+## run: python -m app.services.vehicle_service <frame.png> <mode> <side>:<slot>=<card>@<level> ...
+## Harvests vehicle portraits from a captured full-window frame into public/images/vehicle/
+if __name__ == "__main__":
+    frame_path, game_mode = sys.argv[1], int(sys.argv[2])
+    slot_labels = {}
+    for label in sys.argv[3:]:
+        slot_key, portrait_name = label.split("=", 1)
+        slot_side, slot_index = slot_key.split(":")
+        slot_labels[(slot_side, int(slot_index))] = portrait_name
+    full_frame = cv2.imdecode(np.fromfile(frame_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    for saved_path in harvest_portraits(full_frame, game_mode, slot_labels, template_store.images_dir / "vehicle"):
+        print(f"Saved {saved_path}")
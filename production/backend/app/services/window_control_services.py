@@ -7,12 +7,34 @@ import pyautogui
 import cv2
 from app.utils.logger import logger
 from fastapi import HTTPException
-import win32ui
-from ctypes import windll
-from PIL import Image
 from typing import Optional, Tuple
 import time
 from app.config import config
+from app.services.capture_service import capture_engine
+from app.services.focus_service import FocusManager
+from app.utils.metrics import metrics
+
+
+def _activate_window(hwnd: int):
+    # Validate window exists
+    if not win32gui.IsWindow(hwnd):
+        raise HTTPException(status_code=404, detail=f"Window with handle {hwnd} not found")
+
+    # Restore window if minimized
+    if win32gui.IsIconic(hwnd):  # Check if window is minimized (iconic)
+        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)  # Restore minimized window
+
+    # Bring window to foreground
+    win32gui.SendMessage(hwnd, win32con.WM_SYSCOMMAND, win32con.SC_RESTORE, 0)
+    win32gui.SetForegroundWindow(hwnd)
+
+
+# Create a global focus manager instance, native input goes to the foreground window only
+focus_manager = FocusManager(win32gui.GetForegroundWindow, _activate_window)
+metrics.register("focus", focus_manager.stats)
+
+# Native input moves the real cursor and foreground window, so only one window can receive it at a time
+native_input_lock = focus_manager.lock
 
 class WindowControlService:
     def __init__(self):
@@ -35,39 +57,34 @@ class WindowControlService:
         # Send mouse down and up messages
         win32gui.PostMessage(hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, point)
         win32gui.PostMessage(hwnd, win32con.WM_LBUTTONUP, None, point)
+        capture_engine.input_sent(hwnd)
 
         return {"success": True, "message": f"Click sent to window {hwnd} at ({x}, {y})"}
     
     @staticmethod
     def bring_window_to_foreground(window_pid: int):
         hwnd = window_pid  # window_pid is the window handle (hwnd)
-        # Validate window exists
-        if not win32gui.IsWindow(hwnd):
-            raise HTTPException(status_code=404, detail=f"Window with handle {hwnd} not found")
-    
-        # Restore window if minimized
-        if win32gui.IsIconic(hwnd):  # Check if window is minimized (iconic)
-            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)  # Restore minimized window
-
-        # Bring window to foreground
+        # skipped when it already is in the foreground, verified instead of a fixed delay otherwise
         try:
-            win32gui.SendMessage(hwnd, win32con.WM_SYSCOMMAND, win32con.SC_RESTORE, 0)
-            win32gui.SetForegroundWindow(hwnd)
+            if not focus_manager.focus(hwnd):
+                logger.warning(f"Window {hwnd} did not come to the foreground")
+        except HTTPException:
+            raise
         except Exception as e:
             return False
-        time.sleep(0.1)  # Short delay to ensure window is active
         return {"success": True, "message": f"Window {hwnd} brought to foreground"}
 
     ## use pyautogui to click in window, it works for any window but can't work for overlapped windows
     @staticmethod
     def click_at_native(window_pid: int, x: int, y: int):
-        # bring the window to the foreground
-        WindowControlService.bring_window_to_foreground(window_pid)
-         # Get window's screen coordinates
-        left, top, _, _ = win32gui.GetWindowRect(window_pid)
-        screen_x = left + x  # Convert window-relative x to screen x
-        screen_y = top + y   # Convert window-relative y to screen y
-        pyautogui.click(screen_x, screen_y)
+        # bring the window to the foreground, unless this click is grouped with others to it
+        with focus_manager.session(window_pid):
+             # Get window's screen coordinates
+            left, top, _, _ = win32gui.GetWindowRect(window_pid)
+            screen_x = left + x  # Convert window-relative x to screen x
+            screen_y = top + y   # Convert window-relative y to screen y
+            pyautogui.click(screen_x, screen_y)
+        capture_engine.input_sent(window_pid)
         return {"success": True, "message": f"PyAutoGUI click at ({x}, {y}) in window {window_pid}"}
         
     @staticmethod
@@ -144,7 +161,7 @@ class WindowControlService:
      
             # Mouse up at new position
             win32gui.PostMessage(hwnd, win32con.WM_LBUTTONUP, None, point)
-        
+        capture_engine.input_sent(hwnd)
             
         return {"success": True, "message": f"Horizontal scroll completed for distance {distance}"}
 
@@ -165,68 +182,24 @@ class WindowControlService:
             raise HTTPException(status_code=400, detail=f"Window with PID {window_pid} is not locked")
 
     @staticmethod
-    def capture_region(hwnd, region: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+    def capture_region(hwnd, region: Optional[Tuple[int, int, int, int]], max_age: Optional[float] = None) -> np.ndarray:
         """
-        Capture and process a region of the window using win32gui and ctypes.
-        region: Tuple of (x, y, width, height) defining the region to analyze
+        Capture and process a region of the window through the capture engine.
+        region: Tuple of (x, y, width, height) defining the region to analyze, None for the whole window
+        max_age: Reuse a cached frame younger than this many seconds (default: config.frame_cache_ttl)
         """
         try:
-            # Get window dimensions
-            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-            window_width = right - left
-            window_height = bottom - top
-            
-            if region:
-                x, y, width, height = region
-            else:
-                x, y = 0, 0
-                width, height = window_width, window_height
-
-            # Create device context
-            hwndDC = win32gui.GetWindowDC(hwnd)
-            mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-            saveDC = mfcDC.CreateCompatibleDC()
-            
-            # Create bitmap
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(mfcDC, window_width, window_height)
-            saveDC.SelectObject(saveBitMap)
-
-            # Copy window contents to bitmap
-            result = windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 2)
-            
-            # Convert to numpy array
-            bmpinfo = saveBitMap.GetInfo()
-            bmpstr = saveBitMap.GetBitmapBits(True)
-            
-            # Clean up
-            win32gui.DeleteObject(saveBitMap.GetHandle())
-            saveDC.DeleteDC()
-            mfcDC.DeleteDC()
-            win32gui.ReleaseDC(hwnd, hwndDC)
-            
-            if not result:
-                raise Exception("Failed to capture window contents")
-                
-            screenshot = Image.frombuffer(
-                'RGB',
-                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                bmpstr, 'raw', 'BGRX', 0, 1)
-            cropped_screenshot = screenshot.crop((x, y, x + width, y + height))
-            screenshot_array = np.array(cropped_screenshot)
-            return cv2.cvtColor(screenshot_array, cv2.COLOR_RGB2GRAY)
-            
+            return capture_engine.capture(hwnd, region, max_age)
         except Exception as e:
             # Fallback to pyautogui if win32 capture fails
             logger.error(f"Error capturing window region: {str(e)}")
+            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
             if region:
-                abs_x = left + (region[0] if region else 0)
-                abs_y = top + (region[1] if region else 0)
-                width = region[2] if region else width
-                height = region[3] if region else height
-                screenshot = pyautogui.screenshot(region=(abs_x, abs_y, width, height))
+                abs_x = left + region[0]
+                abs_y = top + region[1]
+                screenshot = pyautogui.screenshot(region=(abs_x, abs_y, region[2], region[3]))
             else:
-                screenshot = pyautogui.screenshot(region=(left, top, width, height))
+                screenshot = pyautogui.screenshot(region=(left, top, right - left, bottom - top))
             
             screenshot_array = np.array(screenshot)
             return cv2.cvtColor(screenshot_array, cv2.COLOR_RGB2GRAY)
@@ -252,13 +225,14 @@ class WindowControlService:
                 # Send WM_CHAR message with character's Unicode value
                 win32gui.SendMessage(hwnd, win32con.WM_CHAR, ord(char), 0)
                 time.sleep(delay)  # Add small delay between characters
+            capture_engine.input_sent(hwnd)
                 
             return {"success": True, "message": f"Typed '{text}' into window {hwnd}"}
         except Exception as e:
             return {"status": "error", "message": f"Error typing text: {str(e)}"}
             
     @staticmethod
-    def type_text_native(window_pid: int, text: str, delay: float = 0.1) -> dict:
+    def type_text_native(window_pid: int, text: str, delay: float = 0.1, region: Optional[Tuple[int, int, int, int]] = None) -> dict:
         """
         Simulate typing text into a target window using clipboard paste.
         Works for native windows like Thunder Player that don't respond to keyboard simulation.
@@ -267,6 +241,7 @@ class WindowControlService:
             window_pid: Window handle of the target window
             text: Text string to type into the window
             delay: Delay in seconds (not used, kept for compatibility)
+            region: The text field (x, y, width, height); the paste is verified on it, or on the whole window if None
             
         Returns:
             dict: Success status and message
@@ -276,37 +251,43 @@ class WindowControlService:
         
         try:
             import win32clipboard
-            
-            # Set clipboard content FIRST while window is NOT in focus
-            # This prevents the window from caching old clipboard data
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardText(text, win32clipboard.CF_TEXT)
-            win32clipboard.CloseClipboard()
-            
-            time.sleep(0.5)
-           
-            # activate another window that's not this pid
-            if config.game_windows:
-                for window in config.game_windows:
-                    if window["pid"] != window_pid:
-                        WindowControlService.bring_window_to_foreground(window["pid"])
-                        time.sleep(1)
+
+            # the clipboard and the foreground window are shared by every window
+            with native_input_lock:
+                # Set clipboard content FIRST while window is NOT in focus
+                # This prevents the window from caching old clipboard data
+                for _ in range(3):
+                    win32clipboard.OpenClipboard()
+                    try:
+                        win32clipboard.EmptyClipboard()
+                        win32clipboard.SetClipboardText(text, win32clipboard.CF_TEXT)
+                        # read it back instead of waiting for the clipboard to be ready
+                        stored = win32clipboard.GetClipboardData(win32clipboard.CF_TEXT)
+                    finally:
+                        win32clipboard.CloseClipboard()
+                    if stored == text.encode():
                         break
-            
-            
-            # Bring the window to the foreground AFTER clipboard is set
-            WindowControlService.bring_window_to_foreground(window_pid)
-            time.sleep(0.5)
-            
-            # Click to ensure focus
-            WindowControlService.click_at_native(window_pid, 50, 50)
-            time.sleep(0.5)
-            
-            # Use pyautogui to send Ctrl+V
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(0.5)
-            
+                else:
+                    logger.warning(f"Clipboard doesn't hold '{text}' for window {window_pid}")
+
+                # the window syncs the clipboard when it gains the focus, switch through
+                # another game window only when it already has it
+                others = [window["pid"] for window in (getattr(config, "game_windows", None) or [])]
+                focus_manager.refocus(window_pid, others)
+
+                with focus_manager.session(window_pid):
+                    # Click to ensure focus
+                    WindowControlService.click_at_native(window_pid, 50, 50)
+
+                    # Use pyautogui to send Ctrl+V, done once the text field shows the text; only the
+                    # field is compared, an animation elsewhere in the window doesn't count as the paste
+                    before = np.copy(capture_engine.capture(window_pid, region, max_age=0))
+                    pyautogui.hotkey('ctrl', 'v')
+                    capture_engine.input_sent(window_pid)
+                    if not focus_manager.wait_for_change("paste", lambda: capture_engine.capture(window_pid, region, max_age=0),
+                                                         before, timeout=0.5):
+                        logger.warning(f"No change seen after pasting into window {window_pid}")
+
             return {"success": True, "message": f"Typed '{text}' into window {window_pid} using clipboard paste"}
         except Exception as e:
             return {"status": "error", "message": f"Error typing text: {str(e)}"}
\ No newline at end of file
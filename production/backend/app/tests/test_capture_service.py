@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+import cv2
+from app.utils.buffer_pool import buffer_pools
+from app.services.capture_service import CaptureEngine, FakeCaptureBackend, bgrx_to_gray, clip_region
+
+
+## run: python -m unittest app.tests.test_capture_service
+
+class TestCaptureService(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.random.default_rng(0).integers(0, 255, size=(637, 1056, 3), dtype=np.uint8)
+        self.backend = FakeCaptureBackend({7: self.frame})
+        self.engine = CaptureEngine(self.backend)
+        buffer_pools.release(7)
+
+    def test_clip_region(self):
+        self.assertEqual(clip_region(None, 100, 50), (0, 0, 100, 50))
+        self.assertEqual(clip_region((10, 10, 20, 20), 100, 50), (10, 10, 20, 20))
+        self.assertEqual(clip_region((90, 40, 20, 20), 100, 50), (90, 40, 10, 10))
+        self.assertEqual(clip_region((-5, 0, 20, 20), 100, 50), (0, 0, 15, 20))
+
+    def test_region_capture_matches_full_frame(self):
+        full = self.engine.capture(7)
+        self.assertEqual(full.shape, (637, 1056))
+        self.assertEqual(full.dtype, np.uint8)
+        region = self.engine.capture(7, (790, 515, 230, 100))
+        self.assertEqual(region.shape, (100, 230))
+        np.testing.assert_array_equal(region, full[515:615, 790:1020])
+
+    def test_bgrx_to_gray_converts_region_in_place(self):
+        bgrx = cv2.cvtColor(self.frame, cv2.COLOR_BGR2BGRA)
+        out = np.empty((100, 230), dtype=np.uint8)
+        result = bgrx_to_gray(bgrx, (790, 515, 230, 100), out)
+        self.assertIs(result, out)
+        expected = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)[515:615, 790:1020]
+        np.testing.assert_array_equal(result, expected)
+
+    def test_captures_are_not_overwritten(self):
+        first = self.engine.capture(7, (0, 0, 50, 50), max_age=0)
+        kept = first.copy()
+        self.backend.set_frame(7, np.full_like(self.frame, 200))
+        second = self.engine.capture(7, (0, 0, 50, 50), max_age=0)
+        self.assertIsNot(second, first)
+        np.testing.assert_array_equal(first, kept)
+        self.assertEqual(second.mean(), 200)
+
+    def test_clipped_region(self):
+        self.assertEqual(self.engine.capture(7, (1000, 600, 100, 100)).shape, (37, 56))
+
+    def test_frame_cache(self):
+        self.engine.capture(7, None, max_age=1)
+        # regions are sliced out of the cached full frame
+        region = self.engine.capture(7, (10, 20, 30, 40), max_age=1)
+        self.assertEqual(region.shape, (40, 30))
+        self.assertEqual(self.backend.grabs, 1)
+        self.engine.capture(7, None, max_age=0)
+        self.assertEqual(self.backend.grabs, 2)
+        self.engine.invalidate(7)
+        self.engine.capture(7, (10, 20, 30, 40), max_age=1)
+        self.engine.capture(7, (10, 20, 30, 40), max_age=1)
+        self.assertEqual(self.backend.grabs, 3)
+        stats = self.engine.stats()['cache']
+        self.assertEqual((stats['hits'], stats['invalidations']), (2, 1))
+
+    def test_stats_and_release(self):
+        self.engine.capture(7, (0, 0, 10, 10))
+        self.assertEqual(self.engine.stats()['latency']['count'], 1)
+        self.assertEqual(self.backend.window_size(7), (1056, 637))
+        self.engine.release(7)
+        with self.assertRaises(Exception):
+            self.engine.capture(7)
+
+
+if __name__ == '__main__':
+    unittest.main()
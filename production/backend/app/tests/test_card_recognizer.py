@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+import numpy as np
+from pathlib import Path
+from app.services.card_recognizer import CardRecognizer, SLOT_SIZE, harvest_portraits, slot_regions
+from app.services.template_store import TemplateStore
+
+
+## run: python -m unittest app.tests.test_card_recognizer
+
+CARDS = ['火灵', '蛇女', '宝库', '冰女', '机枪']
+
+
+def make_portraits(seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = SLOT_SIZE
+    return {name: rng.integers(0, 255, size=(height, width), dtype=np.uint8) for name in CARDS}
+
+
+def make_frame(portraits, hand, seed=1):
+    frame = np.random.default_rng(seed).integers(0, 255, size=(640, 1060), dtype=np.uint8)
+    for name, (x, y, width, height) in zip(hand, slot_regions()):
+        if name is not None:
+            frame[y:y + height, x:x + width] = portraits[name]
+    return frame
+
+
+class TestCardRecognizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.portraits = make_portraits()
+        self.frame = make_frame(self.portraits, ['蛇女', '机枪', '火灵'])
+        # harvest the portraits the same way they are collected from the game
+        harvest_portraits(self.frame, ['蛇女', '机枪', '火灵'], Path(self.tmp.name) / 'cards')
+        harvest_portraits(make_frame(self.portraits, ['宝库', '冰女', None]), ['宝库', '冰女', '-'],
+                          Path(self.tmp.name) / 'cards')
+        self.captures = []
+
+        def capture(hwnd, region):
+            self.captures.append((hwnd, region))
+            return self.frame
+
+        self.recognizer = CardRecognizer(capture, TemplateStore(Path(self.tmp.name)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_holds_every_portrait(self):
+        self.assertEqual(sorted(self.recognizer.index.names), sorted(CARDS))
+        self.assertEqual(self.recognizer.index.matrix.shape[0], len(CARDS))
+
+    def test_recognize_hand_with_one_capture(self):
+        results = self.recognizer.recognize(1)
+        self.assertEqual([name for name, _ in results], ['蛇女', '机枪', '火灵'])
+        self.assertTrue(all(confidence > 0.95 for _, confidence in results))
+        self.assertEqual(self.captures, [(1, None)])
+
+    def test_empty_slot_is_unrecognized(self):
+        frame = make_frame(self.portraits, ['冰女', None, '宝库'], seed=2)
+        names = [name for name, _ in self.recognizer.recognize_frame(frame)]
+        self.assertEqual(names, ['冰女', None, '宝库'])
+
+    def test_no_portraits(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            recognizer = CardRecognizer(lambda hwnd, region: self.frame, TemplateStore(Path(tmp)))
+            self.assertEqual(recognizer.recognize(1), [(None, 0.0)] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from pathlib import Path
+from app.services.capture_service import CaptureEngine, FakeCaptureBackend
+from app.services.detector_service import ChangeGate, DetectorRegistry, DetectorService
+from app.services.template_store import TemplateStore
+from app.utils.buffer_pool import buffer_pools
+
+
+## run: python -m unittest app.tests.test_detector_service
+
+def make_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, size=(120, 200), dtype=np.uint8)
+
+
+class TestDetectorService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frame = make_frame()
+        # the template is the exact content of the native region, stored losslessly
+        Image.fromarray(self.frame[30:60, 50:90]).save(Path(self.tmp.name) / '标题.jpg', format='PNG')
+        self.registry = DetectorRegistry({
+            'is_title': {
+                'native': {'region': [45, 25, 50, 40], 'template': '标题', 'threshold': 0.95},
+                'thunder': {'region': [0, 0, 50, 40], 'template': '标题', 'threshold': 0.95},
+            },
+        })
+        self.captures = []
+
+        def capture(hwnd, region):
+            self.captures.append((hwnd, region))
+            if region is None:
+                return self.frame
+            x, y, w, h = region
+            return self.frame[y:y + h, x:x + w]
+
+        self.service = DetectorService(capture, self.registry, TemplateStore(Path(self.tmp.name)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_registry_keyed_by_name_and_profile(self):
+        self.assertEqual(self.registry.names(), ['is_title'])
+        self.assertEqual(self.registry.profiles('is_title'), ['native', 'thunder'])
+        self.assertEqual(self.registry.get('is_title', 'native').region, (45, 25, 50, 40))
+        self.assertIsNone(self.registry.get('is_title', 'other'))
+
+    def test_evaluate(self):
+        matched = self.service.evaluate(1, 'is_title', 'native')
+        self.assertTrue(matched.matched)
+        self.assertGreater(matched.confidence, 0.95)
+        missed = self.service.evaluate(1, 'is_title', 'thunder')
+        self.assertFalse(missed.matched)
+        unknown = self.service.evaluate(1, 'is_unknown', 'native')
+        self.assertFalse(unknown.matched)
+        self.assertEqual(self.service.stats()['detectors']['is_title']['count'], 2)
+
+    def test_evaluate_many_captures_once(self):
+        self.registry = DetectorRegistry({
+            'is_title': {'native': {'region': [45, 25, 50, 40], 'template': '标题', 'threshold': 0.95}},
+            'is_corner': {'native': {'region': [0, 0, 50, 40], 'template': '标题', 'threshold': 0.95}},
+            'is_clipped': {'native': {'region': [180, 100, 50, 40], 'template': '标题', 'threshold': 0.95}},
+        })
+        self.service._registry = self.registry
+        results = self.service.evaluate_many(1, ['is_title', 'is_corner', 'is_clipped', 'is_unknown'], 'native')
+        self.assertEqual(self.captures, [(1, None)])
+        self.assertEqual(set(results), {'is_title', 'is_corner', 'is_clipped', 'is_unknown'})
+        self.assertTrue(results['is_title'].matched)
+        self.assertFalse(results['is_corner'].matched)
+        self.assertFalse(results['is_clipped'].matched)
+
+    def test_evaluate_frame_matches_region_capture(self):
+        by_region = self.service.evaluate(1, 'is_title', 'native')
+        by_frame = self.service.evaluate_frame(self.frame, ['is_title'], 'native')['is_title']
+        self.assertAlmostEqual(by_region.confidence, by_frame.confidence, places=5)
+
+    def test_steady_state_polling_allocates_nothing(self):
+        self.service.gate = ChangeGate(tolerance=None)
+        self.service.evaluate(3, 'is_title', 'native')
+        pool = buffer_pools.for_window(3)
+        allocations = pool.allocations
+        for _ in range(5):
+            self.service.evaluate(3, 'is_title', 'native')
+        self.assertEqual(pool.allocations, allocations)
+        self.assertGreaterEqual(pool.reuses, 5)
+
+    def test_change_gate_skips_unchanged_regions(self):
+        first = self.service.evaluate(4, 'is_title', 'native')
+        second = self.service.evaluate(4, 'is_title', 'native')
+        self.assertEqual(first.confidence, second.confidence)
+        self.assertEqual(self.service.gate.stats()['detectors']['is_title']['skips'], 1)
+
+        self.frame[30:60, 50:90] = 255 - self.frame[30:60, 50:90]
+        third = self.service.evaluate(4, 'is_title', 'native')
+        self.assertFalse(third.matched)
+        self.assertEqual(self.service.gate.stats()['skips'], 1)
+        self.assertAlmostEqual(self.service.gate.stats()['skip_rate'], 1 / 3, places=3)
+
+    def test_input_clears_the_change_gate(self):
+        engine = CaptureEngine(FakeCaptureBackend({4: self.frame}))
+        engine.add_input_listener(self.service.gate.invalidate)
+        self.service.evaluate(4, 'is_title', 'native')
+        self.service.evaluate(4, 'is_title', 'native')
+        self.assertEqual(self.service.gate.stats()['skips'], 1)
+        engine.input_sent(4)
+        self.service.evaluate(4, 'is_title', 'native')
+        self.assertEqual(self.service.gate.stats()['skips'], 1)
+
+    def test_frames_without_window_bypass_the_gate(self):
+        for _ in range(3):
+            self.service.evaluate_frame(self.frame, ['is_title'], 'native')
+        self.assertEqual(self.service.gate.stats()['skips'], 0)
+
+    def test_validate_reports_templates_larger_than_region(self):
+        registry = DetectorRegistry({
+            'is_title': {
+                'native': {'region': [45, 25, 50, 40], 'template': '标题', 'threshold': 0.95},
+                'thunder': {'region': [45, 25, 38, 40], 'template': '标题', 'threshold': 0.95},
+            },
+        })
+        templates = TemplateStore(Path(self.tmp.name))
+        with self.assertLogs('tfjl', level='ERROR') as logs:
+            invalid = registry.validate(templates)
+        self.assertEqual([(d.name, d.profile) for d in invalid], [('is_title', 'thunder')])
+        self.assertIn('is_title/thunder', logs.output[0])
+        self.assertEqual(registry.validate(templates, 'native'), [])
+
+    def test_shipped_definitions(self):
+        public = Path(__file__).resolve().parents[3] / 'public'
+        registry = DetectorRegistry.from_file(public / 'detectors.json')
+        for name in ['is_home', 'need_ads', 'ice_need_buy_round', 'is_in_ice_castle', 'is_in_moon_island']:
+            self.assertEqual(registry.profiles(name), ['native', 'thunder'])
+        self.assertEqual(registry.profiles('is_in_whirlpool'), ['thunder'])
+        self.assertEqual(registry.validate(TemplateStore(public / 'images')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
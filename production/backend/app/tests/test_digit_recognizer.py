@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from pathlib import Path
+from app.services.digit_recognizer import DigitRecognizer, harvest_glyphs
+from app.services.template_store import TemplateStore
+
+
+## run: python -m unittest app.tests.test_digit_recognizer
+
+def render(text, width=80, height=30, invert=False):
+    """Dark digits on a light background, like the room number dialog."""
+    image = np.full((height, width), 235, dtype=np.uint8)
+    cv2.putText(image, text, (4, 23), cv2.FONT_HERSHEY_SIMPLEX, 0.75, 20, 2, cv2.LINE_AA)
+    return 255 - image if invert else image
+
+
+def render_bar_one(text, width=80, height=30):
+    """Like `render`, but "1" is a plain vertical bar as in many sans-serif fonts."""
+    image = np.full((height, width), 235, dtype=np.uint8)
+    x = 4
+    for char in text:
+        if char == '1':
+            cv2.rectangle(image, (x + 4, 6), (x + 6, 23), 20, -1)
+        else:
+            cv2.putText(image, char, (x, 23), cv2.FONT_HERSHEY_SIMPLEX, 0.75, 20, 2, cv2.LINE_AA)
+        x += 17
+    return image
+
+
+class TestDigitRecognizer(unittest.TestCase):
+    def setUp(self):
+        self.recognizer = DigitRecognizer({digit: [render(digit, 24, 30)] for digit in '0123456789'})
+
+    def test_recognize_room_number(self):
+        for room in ['4827', '1093', '5566']:
+            digits, confidence = self.recognizer.recognize(render(room))
+            self.assertEqual(digits, room)
+            self.assertGreater(confidence, 0.9)
+
+    def test_polarity_does_not_matter(self):
+        digits, _ = self.recognizer.recognize(render('4827', invert=True))
+        self.assertEqual(digits, '4827')
+
+    def test_wrong_digit_count_is_rejected(self):
+        self.assertEqual(self.recognizer.recognize(render('482')), (None, 0.0))
+        self.assertEqual(self.recognizer.recognize(np.full((30, 80), 235, dtype=np.uint8)), (None, 0.0))
+
+    def test_plain_bar_one(self):
+        recognizer = DigitRecognizer({digit: [render_bar_one(digit, 24, 30)] for digit in '0123456789'})
+        for room in ['1471', '1111', '8013']:
+            digits, confidence = recognizer.recognize(render_bar_one(room))
+            self.assertEqual(digits, room)
+            self.assertGreater(confidence, 0.9)
+
+    def test_harvested_glyphs_load_from_template_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            glyph_dir = Path(tmp) / 'digits' / 'native'
+            harvest_glyphs(render('0123'), '0123', glyph_dir)
+            harvest_glyphs(render('4567'), '4567', glyph_dir)
+            harvest_glyphs(render('8989'), '8989', glyph_dir)
+            recognizer = DigitRecognizer.from_templates('native', TemplateStore(Path(tmp)))
+            self.assertIsNotNone(recognizer)
+            self.assertEqual(recognizer.recognize(render('7305'))[0], '7305')
+            self.assertIsNone(DigitRecognizer.from_templates('thunder', TemplateStore(Path(tmp))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+import numpy as np
+from app.enums.job_status import JobStatus
+from app.services.capture_service import CaptureBudget, CaptureEngine, FakeCaptureBackend, capture_budget
+from app.services.fleet_service import FairLimiter, FleetService
+from app.services.job_service import JobService, job_step
+
+
+## run: python -m unittest app.tests.test_fleet_service
+
+def wait_done(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"job {job.id} still {job.status.value}")
+        time.sleep(0.01)
+    return job
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestFleetService(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.order = []
+
+        def flow(main, sub, options):
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+                self.order.append(main['game'])
+            with job_step("create_room"):
+                time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            return not options.get('fail')
+
+        self.fleet = FleetService({0: flow}, jobs=JobService(), max_active=2, capture_rate=0)
+        for idx in range(4):
+            self.fleet.register(idx, {'game': f'main{idx}', 'tool': f'tool{idx}'}, {'game': f'sub{idx}', 'tool': f'subtool{idx}'})
+
+    def test_concurrency_limit(self):
+        jobs = self.fleet.start_all(0)
+        for job in jobs.values():
+            self.assertEqual(wait_done(job).status, JobStatus.SUCCEEDED)
+        self.assertEqual(self.max_running, 2)
+        self.assertEqual(sorted(self.order), ['main0', 'main1', 'main2', 'main3'])
+        stats = self.fleet.stats()
+        self.assertEqual(sum(pair['starts'] for pair in stats['pairs']), 4)
+        self.assertIn('3:create_room', stats['steps'])
+        self.assertGreater(stats['started_per_hour'], 0)
+
+    def test_pair_runs_one_flow_at_a_time(self):
+        job = self.fleet.start(0, 0)
+        with self.assertRaises(Exception):
+            self.fleet.start(0, 0)
+        wait_done(job)
+        wait_done(self.fleet.start(0, 0, {'fail': True}))
+        self.assertEqual(self.fleet.get(0).failures, 1)
+
+    def test_unknown_pair_or_mode(self):
+        with self.assertRaises(Exception):
+            self.fleet.start(9, 0)
+        with self.assertRaises(Exception):
+            self.fleet.start(0, 5)
+
+
+class TestFairLimiter(unittest.TestCase):
+    def test_slots_in_arrival_order(self):
+        limiter = FairLimiter(1)
+        order = []
+
+        def worker(name):
+            with limiter.slot():
+                order.append(name)
+
+        limiter.acquire()
+        threads = []
+        for i, name in enumerate(['a', 'b', 'c']):
+            thread = threading.Thread(target=worker, args=(name,))
+            thread.start()
+            threads.append(thread)
+            while limiter.stats()['waiting'] < i + 1:
+                time.sleep(0.001)
+        limiter.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ['a', 'b', 'c'])
+
+
+class TestCaptureBudget(unittest.TestCase):
+    def test_throttles_after_burst(self):
+        clock = FakeClock()
+        budget = CaptureBudget(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            budget.acquire()
+        self.assertAlmostEqual(clock.now, 0.2)
+        self.assertEqual(budget.stats()['throttled'], 2)
+
+    def test_engine_charges_budget_of_context(self):
+        engine = CaptureEngine(FakeCaptureBackend({1: np.zeros((10, 10), dtype=np.uint8)}))
+        budget = CaptureBudget(rate=1000)
+        engine.capture(1, max_age=0)
+        with capture_budget(budget):
+            engine.capture(1, max_age=0)
+            engine.capture(1, max_age=10)  # from the cache
+        self.assertEqual(budget.stats()['captures'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
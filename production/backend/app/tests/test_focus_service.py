@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from app.services.focus_service import FocusManager
+
+
+## run: python -m unittest app.tests.test_focus_service
+
+class FakeDesktop:
+    """Foreground window that follows activation after `lag` polls."""
+
+    def __init__(self, lag=0):
+        self.foreground = 0
+        self.lag = lag
+        self.activations = []
+        self._pending = None
+        self._polls = 0
+        self.now = 0.0
+
+    def get_foreground(self):
+        if self._pending is not None:
+            self._polls += 1
+            if self._polls > self.lag:
+                self.foreground, self._pending = self._pending, None
+        return self.foreground
+
+    def activate(self, hwnd):
+        self.activations.append(hwnd)
+        self._pending, self._polls = hwnd, 0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestFocusManager(unittest.TestCase):
+    def setUp(self):
+        self.desktop = FakeDesktop(lag=2)
+        self.focus = FocusManager(self.desktop.get_foreground, self.desktop.activate, verify_timeout=0.5,
+                                  interval=0.01, clock=self.desktop.clock, sleep=self.desktop.sleep)
+
+    def test_skips_redundant_switches(self):
+        self.assertTrue(self.focus.focus(1))
+        self.assertTrue(self.focus.focus(1))
+        self.assertTrue(self.focus.focus(2))
+        self.assertEqual(self.desktop.activations, [1, 2])
+        stats = self.focus.stats()
+        self.assertEqual((stats['switches'], stats['skipped']), (2, 1))
+        # verified after the lag, not after a fixed delay
+        self.assertAlmostEqual(self.desktop.now, 0.04)
+
+    def test_unverified_switch_times_out(self):
+        self.desktop.lag = 1000
+        self.assertFalse(self.focus.focus(1))
+        self.assertEqual(self.focus.stats()['unverified'], 1)
+        self.assertGreaterEqual(self.desktop.now, 0.5)
+
+    def test_session_groups_inputs(self):
+        with self.focus.session(1):
+            self.focus.focus(1)
+            self.focus.focus(1)
+        self.assertEqual(self.desktop.activations, [1])
+
+    def test_order_starts_with_foreground(self):
+        self.focus.focus(12)
+        self.assertEqual(self.focus.order([11, 12]), [12, 11])
+        self.assertEqual(self.focus.order([12, 11]), [12, 11])
+
+    def test_refocus_switches_through_another_window(self):
+        self.focus.focus(1)
+        self.focus.refocus(1, [1, 2])
+        self.assertEqual(self.desktop.activations, [1, 2, 1])
+        # a window in the background just gains the focus
+        self.focus.refocus(3, [1, 2])
+        self.assertEqual(self.desktop.activations, [1, 2, 1, 3])
+
+    def test_wait_for_change(self):
+        before = np.zeros((40, 100), dtype=np.uint8)
+        frames = [before.copy(), before.copy()]
+        pasted = before.copy()
+        pasted[10:20, 10:30] = 255
+        frames.append(pasted)
+        self.assertTrue(self.focus.wait_for_change('paste', lambda: frames.pop(0) if len(frames) > 1 else frames[0],
+                                                   before, timeout=0.5))
+        self.assertFalse(self.focus.wait_for_change('paste', lambda: before, before, timeout=0.1))
+        checks = self.focus.stats()['checks']['paste']
+        self.assertEqual((checks['ok'], checks['timeouts']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
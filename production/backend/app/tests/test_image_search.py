@@ -0,0 +1,47 @@
+import time
+import unittest
+import cv2
+import numpy as np
+from app.services.capture_service import CaptureEngine, FakeCaptureBackend
+from app.services.image_search import find_images
+from app.utils.buffer_pool import BufferPool
+
+
+## run: python -m unittest app.tests.test_image_search
+
+class TestFindImages(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.frame = cv2.GaussianBlur(rng.integers(0, 255, size=(637, 1056), dtype=np.uint8), (0, 0), 3)
+        self.engine = CaptureEngine(FakeCaptureBackend({3: self.frame}))
+        self.templates = {
+            '对战': self.frame[500:560, 780:880].copy(),
+            '广告': self.frame[100:140, 300:360].copy(),
+        }
+
+    def test_two_templates_in_one_capture(self):
+        result = find_images(lambda: self.engine.capture(3, None, max_age=0), self.templates, pool=BufferPool())
+        self.assertEqual(result['results']['对战']['position'], {'x': 830, 'y': 530})
+        self.assertEqual(result['results']['广告']['position'], {'x': 330, 'y': 120})
+        self.assertTrue(all(match['found'] for match in result['results'].values()))
+        self.assertEqual(self.engine.backend.grabs, 1)
+        self.assertEqual(set(result['timings']['templates_ms']), set(self.templates))
+
+    def test_not_found_below_confidence(self):
+        templates = {'其他': np.full((40, 40), 128, dtype=np.uint8)}
+        templates['其他'][10:30, 10:30] = 0
+        result = find_images(lambda: self.engine.capture(3), templates, confidence=0.8)
+        self.assertFalse(result['results']['其他']['found'])
+
+    def test_capture_ms_times_only_the_capture(self):
+        def slow_capture():
+            time.sleep(0.05)
+            return self.frame
+
+        timings = find_images(slow_capture, self.templates)['timings']
+        self.assertGreaterEqual(timings['capture_ms'], 50)
+        self.assertLess(timings['capture_ms'], timings['total_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
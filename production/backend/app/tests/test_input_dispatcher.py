@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+from app.services.input_dispatcher import FakeInputSink, InputDispatchers, PreciseTimer
+
+
+## run: python -m unittest app.tests.test_input_dispatcher
+
+class BlockingSink(FakeInputSink):
+    """Holds the first click until released, so commands pile up in the queue."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def click(self, hwnd, x, y):
+        self.release.wait(5)
+        super().click(hwnd, x, y)
+
+
+class TestInputDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.sink = FakeInputSink()
+        self.dispatchers = InputDispatchers(self.sink)
+
+    def tearDown(self):
+        self.dispatchers.close()
+
+    def test_executes_in_deadline_order(self):
+        inputs = self.dispatchers.for_window(1)
+        now = time.perf_counter()
+        inputs.click(3, 3, at=now + 0.03)
+        inputs.key('a', at=now + 0.01)
+        inputs.text('1234', at=now + 0.01)
+        inputs.click(1, 1, at=now + 0.02, wait=True)
+        last = inputs.move(9, 9, at=now + 0.03)
+        last.done.wait(5)
+        self.assertEqual([(kind, args) for _, kind, _, args in self.sink.events],
+                         [('key', 'a'), ('text', '1234'), ('click', (1, 1)), ('click', (3, 3)), ('move', (9, 9))])
+
+    def test_delay_precision(self):
+        inputs = self.dispatchers.for_window(1)
+        commands = [inputs.click(i, i, delay=0.02 * i) for i in range(1, 5)]
+        commands[-1].done.wait(5)
+        for command in commands:
+            self.assertLess(abs(command.executed_at - command.at), 0.005)
+        stats = self.dispatchers.stats()
+        self.assertEqual(stats['jitter']['click']['count'], 4)
+        self.assertEqual(stats['windows'][1]['executed'], 4)
+
+    def test_overdue_moves_are_merged(self):
+        sink = BlockingSink()
+        self.dispatchers.set_sink(sink)
+        inputs = self.dispatchers.for_window(2)
+        inputs.click(0, 0)
+        time.sleep(0.02)  # the click is being executed
+        now = time.perf_counter()
+        for i in range(5):
+            inputs.move(i, i, at=now)
+        last = inputs.click(5, 5, at=now)
+        self.assertEqual(inputs.depth, 6)
+        sink.release.set()
+        last.done.wait(5)
+        self.assertEqual([(kind, args) for _, kind, _, args in sink.events],
+                         [('click', (0, 0)), ('move', (4, 4)), ('click', (5, 5))])
+        self.assertEqual(inputs.stats()['merged_moves'], 4)
+        self.assertEqual(inputs.stats()['max_depth'], 6)
+
+    def test_windows_are_independent_and_callbacks_run(self):
+        done = threading.Event()
+        self.dispatchers.for_window(1).click(1, 1, delay=0.05, callback=done.set)
+        self.dispatchers.for_window('2').click(2, 2, wait=True)
+        self.assertFalse(done.is_set())  # window 2 didn't wait behind window 1
+        self.assertTrue(done.wait(5))
+        self.assertEqual(sorted(hwnd for _, _, hwnd, _ in self.sink.events), [1, 2])
+
+    def test_wait_raises_sink_errors(self):
+        class FailingSink(FakeInputSink):
+            def text(self, hwnd, text):
+                raise ValueError("window closed")
+
+        self.dispatchers.set_sink(FailingSink())
+        with self.assertRaises(Exception):
+            self.dispatchers.for_window(1).text('1234', wait=True)
+
+
+class TestPreciseTimer(unittest.TestCase):
+    def test_sleeps_then_spins(self):
+        state = {'now': 0.0, 'sleeps': []}
+
+        def clock():
+            state['now'] += 0.0001  # every read advances the fake clock a little
+            return state['now']
+
+        def sleep(seconds):
+            state['sleeps'].append(round(seconds, 4))
+            state['now'] += seconds
+
+        PreciseTimer(spin=0.002, clock=clock, sleep=sleep).sleep_until(0.05)
+        self.assertEqual(state['sleeps'], [0.0479])
+        self.assertGreaterEqual(state['now'], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
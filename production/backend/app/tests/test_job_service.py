@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from app.enums.job_status import JobStatus
+from app.services.job_service import JobService, checkpoint, job_step, job_service, run_parallel
+
+
+## run: python -m unittest app.tests.test_job_service
+
+def wait_done(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"job {job.id} still {job.status.value}")
+        time.sleep(0.01)
+    return job
+
+
+class TestJobService(unittest.TestCase):
+    def setUp(self):
+        self.jobs = JobService(max_workers=1)
+
+    def test_success_with_steps(self):
+        def flow(a, b):
+            with job_step("first"):
+                pass
+            with job_step("second"):
+                pass
+            return a + b
+
+        # job_step reports to the global service, so run through it
+        job = wait_done(job_service.submit("test_flow", flow, 1, 2, params={"mode": 0}, total_steps=2))
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        info = job.to_dict()
+        self.assertEqual(info["result"], 3)
+        self.assertEqual(info["progress"], 1.0)
+        self.assertEqual([step["name"] for step in info["steps"]], ["first", "second"])
+        self.assertTrue(all(step["elapsed_ms"] is not None for step in info["steps"]))
+        self.assertIn("test_flow:first", job_service.stats()["steps"])
+
+    def test_failure(self):
+        job = wait_done(self.jobs.submit("fails", lambda: False))
+        self.assertEqual(job.status, JobStatus.FAILED)
+
+        def broken():
+            raise ValueError("no window")
+
+        job = wait_done(self.jobs.submit("raises", broken))
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.error, "no window")
+
+    def test_cancel_running_job_at_checkpoint(self):
+        started, release = threading.Event(), threading.Event()
+
+        def flow():
+            started.set()
+            release.wait(5)
+            checkpoint()
+            return True
+
+        job = self.jobs.submit("cancelled", flow)
+        started.wait(5)
+        self.jobs.cancel(job.id)
+        release.set()
+        self.assertEqual(wait_done(job).status, JobStatus.CANCELLED)
+
+    def test_cancel_pending_job(self):
+        release = threading.Event()
+        blocker = self.jobs.submit("blocker", lambda: release.wait(5))
+        pending = self.jobs.submit("pending", lambda: True)
+        self.jobs.cancel(pending.id)
+        self.assertEqual(pending.status, JobStatus.CANCELLED)
+        release.set()
+        wait_done(blocker)
+        self.assertEqual(self.jobs.stats()["jobs"]["cancelled"], 1)
+
+    def test_history_evicts_finished_jobs_past_a_running_one(self):
+        jobs = JobService(max_workers=2, history=3)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        long_job = jobs.submit("long", lambda: release.wait(5))
+        short = [wait_done(jobs.submit("short", lambda: True)) for _ in range(5)]
+        # the next submit evicts the finished jobs the long one used to pin
+        latest = wait_done(jobs.submit("short", lambda: True))
+        self.assertEqual([job.id for job in jobs.list()], [long_job.id, short[-1].id, latest.id])
+        self.assertEqual(len(jobs._futures), 3)
+
+    def test_publish_to_event_loop(self):
+        events = []
+
+        async def broadcast(info):
+            events.append(info["status"])
+
+        async def run():
+            self.jobs.bind(asyncio.get_running_loop(), broadcast)
+            job = self.jobs.submit("published", lambda: True)
+            while not job.done:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        self.assertEqual(events[0], "pending")
+        self.assertEqual(events[-1], "succeeded")
+
+
+class TestRunParallel(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_results_in_order(self):
+        self.assertEqual(run_parallel(self.executor, [lambda: 1, lambda: time.sleep(0.02) or 2]), [1, 2])
+
+    def test_failure_stops_siblings_before_raising(self):
+        started = threading.Event()
+        clicks = []
+
+        def prepare_sub():
+            started.set()
+            for i in range(100):
+                checkpoint()
+                clicks.append(i)
+                time.sleep(0.01)
+
+        def create_room():
+            started.wait(5)
+            time.sleep(0.03)
+            raise ValueError("no room number")
+
+        with self.assertRaises(ValueError):
+            run_parallel(self.executor, [create_room, prepare_sub])
+        stopped = len(clicks)
+        time.sleep(0.05)
+        # the sibling ended before the error was raised, and stopped early
+        self.assertEqual(len(clicks), stopped)
+        self.assertLess(stopped, 50)
+
+    def test_nested_groups_are_stopped(self):
+        inner_steps = []
+
+        def inner():
+            for _ in range(100):
+                checkpoint()
+                inner_steps.append(1)
+                time.sleep(0.01)
+
+        def fails():
+            time.sleep(0.03)
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            run_parallel(self.executor, [fails, lambda: run_parallel(self.executor, [inner])])
+        self.assertLess(len(inner_steps), 50)
+
+    def test_raises_the_failure_not_the_stopped_sibling(self):
+        def sibling():
+            time.sleep(0.05)
+            checkpoint()
+
+        def fails():
+            raise ValueError("failed")
+
+        # the sibling comes first, its StepAborted is not what the caller sees
+        with self.assertRaises(ValueError):
+            run_parallel(self.executor, [sibling, fails])
+
+
+if __name__ == '__main__':
+    unittest.main()
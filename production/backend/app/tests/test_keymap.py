@@ -0,0 +1,87 @@
+import unittest
+from app.enums.game_positions import GamePositions
+from app.enums.shortcut_positions import GameMode, SingleModeEnemyVehiclePositions, SailModeVehiclePositions
+from app.utils.keymap import compile_keymap, key_name
+from app.utils.metrics import LatencyHistogram
+
+
+## run: python -m unittest app.tests.test_keymap
+
+SHORTCUTS = {
+    'generalShortcut': {
+        'firstCard': '1', 'secondCard': '2', 'thirdCard': '3', 'refresh': 'r', 'sellCard': 'q',
+        'quickSell': True, 'quickSellDelay': 150, 'quickRefresh': True,
+        'enhancedBtnPress': True, 'enhancedBtnPressDelay': 100,
+    },
+    'battleShortcut': {'surrender': 'esc', 'battle': 'space', 'autoQuickMatch': True, 'closeCard': ''},
+    'auctionShortcut': {'auctionCard0': '1', 'auctionCard1': 'z'},
+    'vehicleShortcut': {'left': {'0': 'a', '6': 'g'}, 'right': {'0': 'h'}},
+}
+
+
+class FakeKey:
+    def __init__(self, char=None, name=None):
+        if char is not None:
+            self.char = char
+        self.name = name
+
+    def __str__(self):
+        return f"Key.{self.name}"
+
+
+class TestKeymap(unittest.TestCase):
+    def setUp(self):
+        self.keymap = compile_keymap(SHORTCUTS)
+
+    def test_settings(self):
+        self.assertAlmostEqual(self.keymap.debounce, 0.1)
+        self.assertAlmostEqual(self.keymap.quick_sell_delay, 0.15)
+        self.assertTrue(self.keymap.block_cards_on_sell)
+
+    def test_cards_refresh_in_every_mode(self):
+        for mode in GameMode:
+            action = self.keymap.lookup(mode.value, '2')
+            self.assertEqual(action.name, 'secondCard')
+            self.assertTrue(action.card)
+            self.assertEqual(action.clicks, ((GamePositions.CARD_1.value, 0.0), (GamePositions.REFRESH_CARD.value, 0.1)))
+
+    def test_auction_keys_come_first(self):
+        action = self.keymap.lookup(GameMode.AUCTION.value, '1')
+        self.assertEqual(action.name, 'auctionCard0')
+        self.assertFalse(action.debounce)
+        self.assertEqual(action.clicks[-1], (GamePositions.AUCTION_CONFIRM.value, 0.1))
+
+    def test_battle_keys_only_in_single_player(self):
+        battle = self.keymap.lookup(GameMode.SINGLE_PLAYER.value, 'space')
+        self.assertEqual(battle.clicks, ((GamePositions.BATTLE.value, 0.0), (GamePositions.QUICK_MATCH.value, 0.2)))
+        self.assertIsNone(self.keymap.lookup(GameMode.TWO_PLAYER.value, 'space'))
+        self.assertIsNone(self.keymap.lookup(GameMode.SINGLE_PLAYER.value, ''))
+
+    def test_vehicles_by_mode(self):
+        right = self.keymap.lookup(GameMode.SINGLE_PLAYER.value, 'h')
+        self.assertEqual(right.clicks, ((SingleModeEnemyVehiclePositions.VEHICLE_0.value, 0.0),))
+        self.assertTrue(right.quick_sell)
+        sail = self.keymap.lookup(GameMode.SINGLE_PLAYER_SAILING.value, 'g')
+        self.assertEqual(sail.clicks, ((SailModeVehiclePositions.VEHICLE_6.value, 0.0),))
+        # sailing has no right side
+        self.assertIsNone(self.keymap.lookup(GameMode.SINGLE_PLAYER_SAILING.value, 'h'))
+        self.assertIsNone(self.keymap.lookup(GameMode.AUCTION.value, 'a'))
+
+    def test_key_name(self):
+        self.assertEqual(key_name(FakeKey(char='a')), 'a')
+        self.assertEqual(key_name(FakeKey(name='space')), 'space')
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_buckets(self):
+        histogram = LatencyHistogram(buckets_ms=(1, 10))
+        for seconds in (0.0005, 0.001, 0.004, 0.02):
+            histogram.record(seconds)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {'le_1ms': 2, 'le_10ms': 1, 'gt_10ms': 1})
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['max_ms'], 20.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
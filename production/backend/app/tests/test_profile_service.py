@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from PIL import Image
+from pathlib import Path
+from app.services.detector_service import DetectorRegistry, DetectorService
+from app.services.digit_recognizer import DigitRecognizers, harvest_glyphs
+from app.services.profile_service import InputStrategy, ProfileRegistry
+from app.services.template_store import TemplateStore
+
+
+## run: python -m unittest app.tests.test_profile_service
+
+class TestProfileRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frame = np.random.default_rng(0).integers(0, 255, size=(120, 200), dtype=np.uint8)
+        Image.fromarray(self.frame[30:60, 50:90]).save(Path(self.tmp.name) / '标题.jpg', format='PNG')
+        self.templates = TemplateStore(Path(self.tmp.name))
+        self.detectors = DetectorRegistry({
+            'is_title': {
+                'native': {'region': [45, 25, 50, 40], 'template': '标题', 'threshold': 0.95},
+                'thunder': {'region': [0, 0, 50, 40], 'template': '标题', 'threshold': 0.95},
+            },
+            'thunder_only': {
+                'thunder': {'region': [0, 0, 50, 40], 'template': '标题', 'threshold': 0.95},
+            },
+        })
+        self.inputs = []
+        self.registry = ProfileRegistry(
+            lambda: self.detectors, DigitRecognizers(self.templates), self.templates,
+            {
+                'native': InputStrategy(click=lambda hwnd, x, y: self.inputs.append(('message', hwnd, x, y)),
+                                        type_text=lambda hwnd, text: None),
+                'thunder': InputStrategy(click=lambda hwnd, x, y: self.inputs.append(('native', hwnd, x, y)),
+                                         type_text=lambda hwnd, text: None, room_confirm_clicks=2,
+                                         resize_window=False),
+            },
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_profiles_bound_per_window(self):
+        self.registry.bind(1, 'native')
+        self.registry.bind('2', 'thunder')
+        self.registry.get(1).input.click(1, 10, 20)
+        self.registry.get(2).input.click(2, 10, 20)
+        self.assertEqual(self.inputs, [('message', 1, 10, 20), ('native', 2, 10, 20)])
+        self.assertEqual(self.registry.get(1).regions['room_number'], (490, 345, 80, 30))
+        self.assertEqual(self.registry.get(2).regions['room_number'], (490, 335, 80, 30))
+        # profiles are shared by the windows bound to them
+        self.assertIs(self.registry.bind(3, 'thunder'), self.registry.get(2))
+
+    def test_default_profile(self):
+        self.assertEqual(self.registry.get(7).name, 'native')
+        self.registry.bind(8, 'native')
+        self.registry.set_default('thunder')
+        self.assertEqual(self.registry.get(7).name, 'thunder')
+        self.assertEqual(self.registry.get(8).name, 'native')
+        self.registry.unbind(8)
+        self.assertEqual(self.registry.get(8).name, 'thunder')
+
+    def test_detectors_resolved_per_profile(self):
+        native, thunder = self.registry.profile('native'), self.registry.profile('thunder')
+        self.assertEqual(sorted(native.detectors), ['is_title'])
+        self.assertEqual(sorted(thunder.detectors), ['is_title', 'thunder_only'])
+        self.assertIsNone(native.digits)
+
+        def capture(hwnd, region):
+            x, y, w, h = region
+            return self.frame[y:y + h, x:x + w]
+
+        service = DetectorService(capture, self.detectors, self.templates)
+        self.assertTrue(service.evaluate_detector(1, native.detectors['is_title']).matched)
+        self.assertFalse(service.evaluate_detector(1, thunder.detectors['is_title']).matched)
+
+    def test_harvested_digits_are_picked_up(self):
+        native = self.registry.profile('native')
+        self.assertIsNone(native.digits)
+
+        def render(text):
+            image = np.full((30, 80), 235, dtype=np.uint8)
+            cv2.putText(image, text, (4, 23), cv2.FONT_HERSHEY_SIMPLEX, 0.75, 20, 2, cv2.LINE_AA)
+            return image
+
+        for digits in ['0123', '4567', '8989']:
+            harvest_glyphs(render(digits), digits, Path(self.tmp.name) / 'digits' / 'native')
+        # the profile that was built without glyphs uses them now
+        self.assertEqual(native.digits.recognize(render('7305'))[0], '7305')
+        self.assertIsNone(self.registry.profile('thunder').digits)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            self.registry.bind(1, 'emulator')
+
+
+if __name__ == '__main__':
+    unittest.main()
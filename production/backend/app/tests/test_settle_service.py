@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from app.services.settle_service import SettleDetector
+from app.utils.buffer_pool import buffer_pools
+
+
+## run: python -m unittest app.tests.test_settle_service
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestSettleDetector(unittest.TestCase):
+    def setUp(self):
+        buffer_pools.release(9)
+        self.clock = FakeClock()
+        self.buffer = np.zeros((40, 60), dtype=np.uint8)
+
+    def detector(self, frames):
+        frames = iter(frames)
+
+        def capture(hwnd, region):
+            # like the capture engine, every capture is written into the same buffer
+            np.copyto(self.buffer, next(frames, self.last))
+            return self.buffer
+
+        return SettleDetector(capture, threshold=1.0, frames=2, interval=0.05, min_delay=0.05,
+                              clock=self.clock, sleep=self.clock.sleep)
+
+    def test_settles_after_animation(self):
+        animation = [np.full((40, 60), value, dtype=np.uint8) for value in (0, 40, 80, 120)]
+        self.last = animation[-1]
+        detector = self.detector(animation)
+        self.assertTrue(detector.wait(9, timeout=0.5, label='click'))
+        # min delay + 3 changing frames + 2 stable frames
+        self.assertAlmostEqual(self.clock.now, 0.05 + 5 * 0.05)
+        stats = detector.stats()['click']
+        self.assertEqual((stats['settled'], stats['timeouts']), (1, 0))
+        self.assertAlmostEqual(stats['saved_ms_total'], 200, places=1)
+
+    def test_small_noise_counts_as_settled(self):
+        self.last = np.full((40, 60), 100, dtype=np.uint8)
+        noisy = self.last.copy()
+        noisy[0, :10] += 3
+        detector = self.detector([np.zeros((40, 60), dtype=np.uint8), self.last, noisy, self.last])
+        self.assertTrue(detector.wait(9, timeout=0.5))
+
+    def test_unchanged_screen_waits_for_the_transition(self):
+        # the click hasn't taken effect yet when the first frames are captured
+        before = np.full((40, 60), 30, dtype=np.uint8)
+        self.last = np.full((40, 60), 200, dtype=np.uint8)
+        detector = self.detector([before] * 4 + [self.last])
+        self.assertTrue(detector.wait(9, timeout=0.5))
+        # min delay + 4 frames of the old screen + 2 stable frames of the new one
+        self.assertAlmostEqual(self.clock.now, 0.05 + 6 * 0.05)
+
+    def test_no_change_waits_out_the_timeout(self):
+        self.last = np.full((40, 60), 30, dtype=np.uint8)
+        detector = self.detector([])
+        self.assertFalse(detector.wait(9, timeout=0.5, label='click'))
+        self.assertAlmostEqual(self.clock.now, 0.5)
+
+    def test_timeout_when_never_settling(self):
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, size=(40, 60), dtype=np.uint8) for _ in range(100)]
+        self.last = frames[-1]
+        detector = self.detector(frames)
+        self.assertFalse(detector.wait(9, timeout=0.3, label='enter'))
+        self.assertAlmostEqual(self.clock.now, 0.3)
+        self.assertEqual(detector.stats()['enter']['saved_ms_total'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from fastapi import HTTPException
+from pathlib import Path
+from app.services.template_atlas import TemplateAtlas, build_atlas
+from app.services.template_store import TemplateStore
+
+
+## run: python -m unittest app.tests.test_template_store
+
+class TestTemplateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self.tmp.name)
+        self._write('对战', np.full((20, 30, 3), 100, dtype=np.uint8))
+        self._write('对战_thunder', np.full((20, 30), 50, dtype=np.uint8))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, pixels):
+        path = self.images_dir / (name + '.jpg')
+        Image.fromarray(pixels).save(path, quality=100)
+        return path
+
+    def test_preload_and_hits(self):
+        store = TemplateStore(self.images_dir)
+        self.assertEqual(store.preload(), 2)
+        template = store.get('对战')
+        self.assertEqual(template.shape, (20, 30))
+        self.assertTrue(template.flags['C_CONTIGUOUS'])
+        self.assertFalse(template.flags.writeable)
+        self.assertIs(store.get('对战'), template)
+        stats = store.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['reloads']), (2, 0, 0))
+
+    def test_miss_loads_on_demand(self):
+        store = TemplateStore(self.images_dir)
+        self.assertEqual(store.get('对战_thunder').shape, (20, 30))
+        self.assertEqual(store.stats()['misses'], 1)
+        with self.assertRaises(HTTPException):
+            store.get('不存在')
+
+    def test_reload_when_mtime_changes(self):
+        store = TemplateStore(self.images_dir, check_interval=0)
+        store.preload()
+        before = store.get('对战')
+        path = self._write('对战', np.full((10, 10, 3), 200, dtype=np.uint8))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        after = store.get('对战')
+        self.assertNotEqual(before.shape, after.shape)
+        self.assertEqual(store.stats()['reloads'], 1)
+        self.assertIs(store.get('对战'), after)
+
+
+class TestTemplateAtlas(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self.tmp.name) / 'images'
+        (self.images_dir / 'digits' / 'thunder').mkdir(parents=True)
+        rng = np.random.default_rng(0)
+        for name, shape in [('对战', (20, 30, 3)), ('对战_thunder', (21, 31)), ('笑脸', (17, 19)), ('digits/thunder/7', (24, 16))]:
+            Image.fromarray(rng.integers(0, 255, size=shape, dtype=np.uint8)).save(self.images_dir / (name + '.jpg'), quality=100)
+        self.atlas_path = Path(self.tmp.name) / 'templates.atlas'
+        self.entries = build_atlas(self.images_dir, self.atlas_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index(self):
+        self.assertEqual(self.entries['对战']['profile'], 'native')
+        self.assertEqual(self.entries['对战_thunder']['profile'], 'thunder')
+        self.assertEqual(self.entries['笑脸']['profile'], 'shared')
+        self.assertEqual(self.entries['digits/thunder/7']['profile'], 'thunder')
+        self.assertTrue(all(entry['offset'] % 64 == 0 for entry in self.entries.values()))
+
+    def test_store_serves_atlas_views_identical_to_decoding(self):
+        store = TemplateStore(self.images_dir)
+        decoded = TemplateStore(self.images_dir, atlas_path=Path(self.tmp.name) / 'missing.atlas')
+        self.assertEqual(store.preload(), 4)
+        self.assertEqual(store.stats()['atlas'], 4)
+        for name in self.entries:
+            template = store.get(name)
+            # a view into the mapping, not a decoded copy
+            self.assertFalse(template.flags.owndata)
+            self.assertFalse(template.flags.writeable)
+            np.testing.assert_array_equal(template, decoded.get(name))
+
+    def test_changed_source_is_decoded_again(self):
+        store = TemplateStore(self.images_dir, check_interval=0)
+        path = self.images_dir / '笑脸.jpg'
+        Image.fromarray(np.full((9, 9), 200, dtype=np.uint8)).save(path, quality=100)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(store.get('笑脸').shape, (9, 9))
+
+    def test_touched_source_keeps_using_the_atlas(self):
+        # e.g. a copy or an install, every mtime changes but not the content
+        for path in self.images_dir.rglob('*.jpg'):
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        store = TemplateStore(self.images_dir)
+        self.assertEqual(store.preload(), 4)
+        self.assertFalse(store.get('对战').flags.owndata)
+        self.assertEqual(store.stats()['atlas_stale'], 0)
+
+    def test_stale_entries_are_logged_once(self):
+        for name in ['笑脸', '对战']:
+            Image.fromarray(np.full((9, 9), 200, dtype=np.uint8)).save(self.images_dir / (name + '.jpg'), quality=100)
+        store = TemplateStore(self.images_dir)
+        with self.assertLogs('tfjl', level='WARNING') as logs:
+            store.preload()
+        self.assertEqual(len([line for line in logs.output if 'atlas' in line]), 1)
+        self.assertEqual(store.stats()['atlas_stale'], 2)
+        self.assertTrue(store.get('笑脸').flags.owndata)
+
+    def test_atlas_without_source_images(self):
+        (self.images_dir / '笑脸.jpg').unlink()
+        store = TemplateStore(self.images_dir, check_interval=0)
+        np.testing.assert_array_equal(store.get('笑脸'), TemplateAtlas(self.atlas_path).get('笑脸'))
+        self.assertEqual(store.get('笑脸').shape, (17, 19))
+
+
+if __name__ == '__main__':
+    unittest.main()
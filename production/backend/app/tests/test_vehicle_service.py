@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+from app.enums.shortcut_positions import GameMode
+from app.services.card_recognizer import CardIndex
+from app.services.vehicle_service import SLOT_SIZE, VehicleReader, same_row, slot_positions, vehicle_area
+
+
+## run: python -m unittest app.tests.test_vehicle_service
+
+SINGLE = GameMode.SINGLE_PLAYER.value
+PORTRAITS = ['火灵@1', '火灵@2', '蛇女@1', '宝库@3']
+
+
+def make_portraits():
+    rng = np.random.default_rng(0)
+    width, height = SLOT_SIZE
+    return {name: rng.integers(0, 255, size=(height, width), dtype=np.uint8) for name in PORTRAITS}
+
+
+class TestVehicleService(unittest.TestCase):
+    def setUp(self):
+        self.portraits = make_portraits()
+        self.frame = np.random.default_rng(1).integers(0, 255, size=(640, 1060), dtype=np.uint8)
+        self.captures = []
+
+        def capture(hwnd, region):
+            self.captures.append(region)
+            x, y, w, h = region
+            return self.frame[y:y + h, x:x + w]
+
+        self.reader = VehicleReader(capture, index=CardIndex(self.portraits))
+
+    def place(self, side, slot, name):
+        width, height = SLOT_SIZE
+        x, y = next(position for s, i, position in slot_positions(SINGLE) if (s, i) == (side, slot))
+        self.frame[y - height // 2:y + height - height // 2, x - width // 2:x + width - width // 2] = self.portraits[name]
+
+    def test_layouts_have_seven_slots_per_side(self):
+        self.assertEqual(len(slot_positions(SINGLE)), 14)
+        self.assertEqual(len(slot_positions(GameMode.SINGLE_PLAYER_SAILING.value)), 7)
+        self.assertEqual(slot_positions(GameMode.AUCTION.value), [])
+        self.assertIsNone(vehicle_area(GameMode.AUCTION.value))
+
+    def test_read_classifies_both_sides_from_one_capture(self):
+        self.place('left', 0, '火灵@2')
+        self.place('right', 6, '宝库@3')
+        state = self.reader.read(1, SINGLE)
+        self.assertEqual(self.captures, [vehicle_area(SINGLE)])
+        self.assertEqual((state['left'][0]['card'], state['left'][0]['level']), ('火灵', 2))
+        self.assertEqual((state['right'][6]['card'], state['right'][6]['level']), ('宝库', 3))
+        self.assertIsNone(state['left'][1]['card'])
+        self.assertEqual(len(state['left']) + len(state['right']), 14)
+
+    def test_changes_only_reports_changed_slots(self):
+        self.place('left', 0, '火灵@1')
+        first = self.reader.changes(1, self.reader.read(1, SINGLE))
+        # unrecognized slots start out empty, so only the occupied one is new
+        self.assertEqual(first, [{'side': 'left', 'info': {0: {'card': '火灵', 'level': 1}}}])
+        self.assertEqual(self.reader.changes(1, self.reader.read(1, SINGLE)), [])
+
+        self.place('left', 0, '火灵@2')
+        changed = self.reader.changes(1, self.reader.read(1, SINGLE))
+        self.assertEqual(changed, [{'side': 'left', 'info': {0: {'card': '火灵', 'level': 2}}}])
+
+    def test_same_row(self):
+        self.place('left', 0, '火灵@1')
+        self.place('left', 1, '蛇女@1')
+        self.place('left', 2, '宝库@3')
+        state = self.reader.read(1, SINGLE)
+        self.assertTrue(same_row(state, SINGLE, ['火灵', '蛇女']))
+        self.assertFalse(same_row(state, SINGLE, ['火灵', '宝库']))
+        # cards not on the vehicle yet can go anywhere
+        self.assertTrue(same_row(state, SINGLE, ['宝库', '冰女']))
+
+
+if __name__ == '__main__':
+    unittest.main()
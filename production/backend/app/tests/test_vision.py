@@ -0,0 +1,52 @@
+import threading
+import unittest
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.buffer_pool import BufferPool
+from app.utils.vision import find_template, match_template, pyramid_match
+
+
+## run: python -m unittest app.tests.test_vision
+
+class TestVision(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.frame = cv2.GaussianBlur(rng.integers(0, 255, size=(637, 1056), dtype=np.uint8), (0, 0), 3)
+        self.template = self.frame[300:348, 700:748].copy()
+
+    def test_pyramid_matches_exhaustive(self):
+        exhaustive = match_template(self.frame, self.template)
+        pyramid = pyramid_match(self.frame, self.template)
+        self.assertEqual(pyramid[1], exhaustive[1])
+        self.assertEqual(pyramid[1], (700, 300))
+        self.assertAlmostEqual(pyramid[0], exhaustive[0], places=4)
+
+    def test_small_template_falls_back_to_exhaustive(self):
+        template = self.frame[100:110, 200:210].copy()
+        self.assertEqual(pyramid_match(self.frame, template)[1], (200, 100))
+
+    def test_find_template_modes(self):
+        self.assertEqual(find_template(self.frame, self.template, 'pyramid')[1], (700, 300))
+        self.assertEqual(find_template(self.frame, self.template, 'exhaustive')[1], (700, 300))
+        with self.assertRaises(ValueError):
+            find_template(self.frame, self.template, 'other')
+
+
+    def test_pooled_result_is_per_thread(self):
+        pool = BufferPool()
+        other = self.frame[100:148, 200:248].copy()
+        barrier = threading.Barrier(2)
+
+        def match(template):
+            barrier.wait(5)
+            return [match_template(self.frame, template, pool)[1] for _ in range(20)]
+
+        with ThreadPoolExecutor(2) as executor:
+            first, second = executor.map(match, [self.template, other])
+        self.assertEqual(set(first), {(700, 300)})
+        self.assertEqual(set(second), {(200, 100)})
+        self.assertEqual(pool.stats()['buffers'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
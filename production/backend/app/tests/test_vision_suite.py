@@ -0,0 +1,36 @@
+import unittest
+from app.benchmarks.vision_suite import PUBLIC_DIR, VisionSuite, compare, synthetic_corpus
+from app.services.detector_service import DetectorRegistry
+from app.services.template_store import TemplateStore
+
+
+## run: python -m unittest app.tests.test_vision_suite
+
+BASELINE = {'is_home': {'frames': 10, 'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0, 'min_margin': 0.05, 'misclassified': 0}}
+
+
+class TestVisionSuite(unittest.TestCase):
+    def test_synthetic_run(self):
+        registry = DetectorRegistry.from_file(PUBLIC_DIR / 'detectors.json')
+        templates = TemplateStore(PUBLIC_DIR / 'images')
+        suite = VisionSuite(registry, templates)
+        for frame in synthetic_corpus(registry, templates, per_label=1):
+            suite.run_frame(*frame)
+        report = suite.report()
+        for check in ['is_home', 'need_ads', 'is_in_ice_castle', 'is_in_moon_island', 'is_in_whirlpool',
+                      'find_image:笑脸:exhaustive', 'find_image:笑脸:pyramid']:
+            self.assertEqual(report[check]['misclassified'], 0, check)
+            self.assertGreater(report[check]['min_margin'], 0, check)
+
+    def test_compare_passes_within_tolerance(self):
+        current = {'is_home': dict(BASELINE['is_home'], p95_ms=3.4, min_margin=0.01)}
+        self.assertEqual(compare(current, BASELINE), [])
+
+    def test_compare_flags_regressions(self):
+        current = {'is_home': dict(BASELINE['is_home'], p95_ms=3.6, min_margin=-0.1, misclassified=1)}
+        self.assertEqual(len(compare(current, BASELINE)), 3)
+        self.assertEqual(compare({}, BASELINE), ['is_home: missing from the run'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from app.utils.wait import Waiter
+
+
+## run: python -m unittest app.tests.test_wait
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 4))
+        self.now += seconds
+
+
+class TestWaiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.waiter = Waiter(initial_interval=0.05, max_interval=0.2, backoff=2, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_returns_immediately_when_ready(self):
+        self.assertEqual(self.waiter.wait(lambda: 'ready', timeout=5, label='home'), 'ready')
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(self.waiter.stats()['home']['ok'], 1)
+
+    def test_adaptive_interval(self):
+        polls = iter([False, False, False, False, True])
+        self.assertTrue(self.waiter.wait(lambda: next(polls), timeout=5, label='home'))
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.2, 0.2])
+        stats = self.waiter.stats()['home']
+        self.assertEqual(stats['polls'], 5)
+        self.assertAlmostEqual(stats['max_ms'], 550, places=3)
+
+    def test_timeout(self):
+        self.assertIsNone(self.waiter.wait(lambda: None, timeout=0.3, label='ads'))
+        # the last sleep is cut to the deadline
+        self.assertAlmostEqual(sum(self.clock.sleeps), 0.3)
+        self.assertEqual(self.waiter.stats()['ads']['timeouts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
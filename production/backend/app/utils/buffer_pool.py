@@ -0,0 +1,84 @@
+import numpy as np
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.utils.metrics import metrics
+
+
+class BufferPool:
+    """
+    Preallocated numpy buffers keyed by (tag, shape, dtype).
+
+    A buffer is handed out again on every request with the same key, so the caller must be done
+    with it before asking for the same key again. `tag` separates buffers of the same shape that
+    are alive at the same time (e.g. one capture buffer per region).
+    """
+
+    def __init__(self):
+        self._buffers: Dict[Tuple[Hashable, Tuple[int, ...], str], np.ndarray] = {}
+        self._lock = Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def get(self, shape: Tuple[int, ...], dtype=np.uint8, tag: Hashable = None) -> np.ndarray:
+        key = (tag, tuple(shape), np.dtype(dtype).str)
+        buffer = self._buffers.get(key)
+        if buffer is not None:
+            self.reuses += 1
+            return buffer
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = np.empty(shape, dtype=dtype)
+                self.allocations += 1
+            return buffer
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buffers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffers": len(self._buffers),
+            "bytes": sum(buffer.nbytes for buffer in self._buffers.values()),
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+        }
+
+
+class BufferPools:
+    """One BufferPool per window handle."""
+
+    def __init__(self):
+        self._pools: Dict[Optional[int], BufferPool] = {}
+        self._lock = Lock()
+
+    def for_window(self, hwnd: Optional[int]) -> BufferPool:
+        pool = self._pools.get(hwnd)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault(hwnd, BufferPool())
+        return pool
+
+    def release(self, hwnd: Optional[int] = None) -> None:
+        """Drop the buffers of one window, or of every window."""
+        with self._lock:
+            if hwnd is None:
+                self._pools.clear()
+            else:
+                self._pools.pop(hwnd, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = dict(self._pools)
+        windows = {str(hwnd): pool.stats() for hwnd, pool in pools.items()}
+        return {
+            "allocations": sum(stats["allocations"] for stats in windows.values()),
+            "reuses": sum(stats["reuses"] for stats in windows.values()),
+            "bytes": sum(stats["bytes"] for stats in windows.values()),
+            "windows": windows,
+        }
+
+
+# Create a global per-window buffer pool instance
+buffer_pools = BufferPools()
+metrics.register("buffers", buffer_pools.stats)
@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from app.enums.game_positions import GamePositions
+from app.enums.shortcut_positions import (
+    GameMode, SingleModeVehiclePositions, SingleModeEnemyVehiclePositions, TwoModeLeftVehiclePositions,
+    TwoModeRightVehiclePositions, SailModeVehiclePositions, SkyTwoModeLeftVehiclePositions,
+    SkyTwoModeRightVehiclePositions,
+)
+
+Position = Tuple[int, int]
+
+# generalShortcut entries and the position they click
+GENERAL_POSITIONS = {
+    'firstCard': GamePositions.CARD_0.value,
+    'secondCard': GamePositions.CARD_1.value,
+    'thirdCard': GamePositions.CARD_2.value,
+    'upgradeVehicle': GamePositions.UPGRADE_VEHICLE.value,
+    'refresh': GamePositions.REFRESH_CARD.value,
+    'sellCard': GamePositions.SELL_CARD.value,
+}
+CARD_SHORTCUTS = ('firstCard', 'secondCard', 'thirdCard')
+
+# battleShortcut entries (single player only)
+BATTLE_POSITIONS = {
+    'surrender': GamePositions.SURRENDER.value,
+    'confirm': GamePositions.BATTLE_END_CONFIRM.value,
+    'battle': GamePositions.BATTLE.value,
+    'viewOpponentHalo': GamePositions.ENEMY_STATUS.value,
+    'closeCard': GamePositions.CLOST_CARD.value,
+}
+
+# auctionShortcut entries (auction mode only)
+AUCTION_POSITIONS = {
+    'auctionCard0': GamePositions.AUNCTION_CARD_0.value,
+    'auctionCard1': GamePositions.AUNCTION_CARD_1.value,
+    'auctionCard2': GamePositions.AUNCTION_CARD_2.value,
+    'auctionCard3': GamePositions.AUNCTION_CARD_3.value,
+}
+
+# vehicleShortcut sides and their slot positions per mode
+VEHICLE_POSITIONS = {
+    GameMode.SINGLE_PLAYER.value: {'left': SingleModeVehiclePositions, 'right': SingleModeEnemyVehiclePositions},
+    GameMode.SINGLE_PLAYER_SAILING.value: {'left': SailModeVehiclePositions},
+    GameMode.TWO_PLAYER.value: {'left': TwoModeLeftVehiclePositions, 'right': TwoModeRightVehiclePositions},
+    GameMode.TWO_PLAYER_SKY.value: {'left': SkyTwoModeLeftVehiclePositions, 'right': SkyTwoModeRightVehiclePositions},
+}
+
+
+@dataclass(frozen=True)
+class KeyAction:
+    name: str  # Shortcut entry, e.g. firstCard or left:3
+    clicks: Tuple[Tuple[Position, float], ...]  # (position, seconds after the keypress)
+    card: bool = False  # Ignored while a quick sell is pending
+    quick_sell: bool = False  # Sell the card once it's placed on the vehicle
+    debounce: bool = True  # Subject to enhancedBtnPress debouncing
+
+
+@dataclass
+class Keymap:
+    """Shortcut configuration compiled to one (mode, key) -> KeyAction table."""
+    actions: Dict[Tuple[int, str], KeyAction] = field(default_factory=dict)
+    debounce: float = 0.0  # Seconds a key is ignored after it was pressed, 0 when disabled
+    block_cards_on_sell: bool = False  # Card keys are ignored until the quick sell click ran
+    quick_sell_delay: float = 0.0
+
+    def lookup(self, mode: int, key: Optional[str]) -> Optional[KeyAction]:
+        return self.actions.get((mode, key))
+
+
+def key_name(key: Any) -> Optional[str]:
+    """Name of a pynput key as the shortcut file writes it: the character, or e.g. 'space', 'esc'."""
+    try:
+        return key.char
+    except AttributeError:
+        return str(key).replace('Key.', '')
+
+
+def compile_keymap(shortcut_config: Dict) -> Keymap:
+    """
+    Compile the shortcut file (public/shortcut.json) for every game mode. When keys collide the
+    first entry wins, in the order the keys were checked before: auction, general, battle, vehicle.
+    """
+    general = shortcut_config.get('generalShortcut', {})
+    battle = shortcut_config.get('battleShortcut', {})
+    auction = shortcut_config.get('auctionShortcut', {})
+    vehicles = shortcut_config.get('vehicleShortcut', {})
+    enhanced_btn_press = general.get('enhancedBtnPress', False)
+    quick_sell = general.get('quickSell', False)
+    quick_refresh = general.get('quickRefresh', False)
+    auto_quick_match = battle.get('autoQuickMatch', False)
+
+    keymap = Keymap(
+        debounce=general.get('enhancedBtnPressDelay', 0) / 1000 if enhanced_btn_press else 0.0,
+        block_cards_on_sell=bool(quick_sell and enhanced_btn_press),
+        quick_sell_delay=general.get('quickSellDelay', 0) / 1000,
+    )
+
+    def add(mode, key, action):
+        if key and isinstance(key, str):
+            keymap.actions.setdefault((mode, key), action)
+
+    for mode in (mode.value for mode in GameMode):
+        if mode == GameMode.AUCTION.value:
+            for name, position in AUCTION_POSITIONS.items():
+                confirm = GamePositions.AUCTION_CONFIRM.value
+                add(mode, auction.get(name), KeyAction(name, ((position, 0.0), (confirm, 0.1)), debounce=False))
+
+        for name, position in GENERAL_POSITIONS.items():
+            card = name in CARD_SHORTCUTS
+            clicks = ((position, 0.0),)
+            if card and quick_refresh:
+                clicks += ((GamePositions.REFRESH_CARD.value, 0.1),)
+            add(mode, general.get(name), KeyAction(name, clicks, card=card))
+
+        if mode == GameMode.SINGLE_PLAYER.value:
+            for name, position in BATTLE_POSITIONS.items():
+                clicks = ((position, 0.0),)
+                if name == 'surrender':
+                    clicks += ((GamePositions.SURRENDER_CONFIRM.value, 0.5),)
+                elif name == 'battle' and auto_quick_match:
+                    clicks += ((GamePositions.QUICK_MATCH.value, 0.2),)
+                add(mode, battle.get(name), KeyAction(name, clicks))
+
+        for side, positions in VEHICLE_POSITIONS.get(mode, {}).items():
+            for index, key in vehicles.get(side, {}).items():
+                position = positions[f"VEHICLE_{index}"].value
+                add(mode, key, KeyAction(f"{side}:{index}", ((position, 0.0),), quick_sell=quick_sell))
+    return keymap
@@ -0,0 +1,108 @@
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Dict
+
+
+class LatencyStats:
+    """Rolling latency samples (in seconds) with percentile snapshots in milliseconds."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self._count, self._total
+        if not samples:
+            return {"count": 0}
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+
+class LatencyHistogram:
+    """LatencyStats plus all-time counts per bucket; a bucket counts samples up to its bound in ms."""
+
+    def __init__(self, buckets_ms=(1, 2, 5, 10, 20, 50, 100, 200, 500), window: int = 1024):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # the last one counts samples above every bound
+        self._stats = LatencyStats(window)
+        self._lock = Lock()
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        with self._lock:
+            self._counts[index] += 1
+        self._stats.record(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + [f"gt_{self.buckets_ms[-1]}ms"]
+        return {**self._stats.snapshot(), "buckets": dict(zip(labels, counts))}
+
+
+class LatencyGroup:
+    """LatencyStats keyed by name, e.g. one per detector or per flow step."""
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._stats: Dict[str, LatencyStats] = {}
+        self._lock = Lock()
+
+    def get(self, key: str) -> LatencyStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, LatencyStats(self._window))
+        return stats
+
+    def record(self, key: str, seconds: float) -> None:
+        self.get(key).record(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {key: value.snapshot() for key, value in stats.items()}
+
+
+class MetricsRegistry:
+    """Collects stats providers from the services so they can be served from one place."""
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._lock = Lock()
+
+    def register(self, name: str, provider: Callable[[], Any]) -> None:
+        """Register a callable returning a JSON-serializable snapshot under `name`."""
+        with self._lock:
+            self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Collect the current snapshot of every registered provider."""
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: provider() for name, provider in providers.items()}
+
+
+# Create a global metrics instance
+metrics = MetricsRegistry()
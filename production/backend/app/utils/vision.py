@@ -0,0 +1,80 @@
+import threading
+import cv2
+import numpy as np
+from typing import Hashable, Literal, Optional, Tuple
+from app.utils.buffer_pool import BufferPool
+
+SearchMode = Literal['exhaustive', 'pyramid']
+
+
+def match_template(image: np.ndarray, template: np.ndarray, pool: Optional[BufferPool] = None,
+                   tag: Hashable = None) -> Tuple[float, Tuple[int, int]]:
+    """
+    Return the best TM_CCOEFF_NORMED confidence and its top-left location of `template` in `image`.
+
+    With a `pool`, the float32 result matrix is written into a pooled buffer instead of a new one.
+    The buffer is per thread: requests, jobs and flow steps may match on the same window at once.
+    """
+    result = None
+    if pool is not None:
+        shape = (image.shape[0] - template.shape[0] + 1, image.shape[1] - template.shape[1] + 1)
+        result = pool.get(shape, np.float32, tag=("match", tag, threading.get_ident()))
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, result=result)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), max_loc
+
+
+def _downscale(image: np.ndarray, levels: int) -> np.ndarray:
+    for _ in range(levels):
+        image = cv2.pyrDown(image)
+    return image
+
+
+def pyramid_match(image: np.ndarray, template: np.ndarray, levels: int = 2, candidates: int = 3,
+                  min_template_size: int = 12) -> Tuple[float, Tuple[int, int]]:
+    """
+    Coarse-to-fine TM_CCOEFF_NORMED search.
+
+    Matches the `levels` times downscaled template on the downscaled image, then re-runs the match
+    at full resolution only around the best `candidates` coarse peaks. The returned confidence is the
+    full resolution TM_CCOEFF_NORMED score, the same value match_template reports for that location.
+    """
+    while levels > 0 and min(template.shape[:2]) >> levels < min_template_size:
+        levels -= 1
+    if levels == 0:
+        return match_template(image, template)
+
+    scale = 1 << levels
+    coarse = cv2.matchTemplate(_downscale(image, levels), _downscale(template, levels), cv2.TM_CCOEFF_NORMED)
+    template_h, template_w = template.shape[:2]
+    # a coarse peak is accurate to about one coarse pixel, search that far around it at full resolution
+    margin = scale * 2
+    suppress_w, suppress_h = max(1, (template_w // scale) // 2), max(1, (template_h // scale) // 2)
+
+    best_val, best_loc = -1.0, (0, 0)
+    for _ in range(candidates):
+        _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(coarse)
+        if coarse_val <= -1.0:
+            break
+        # suppress this peak so the next iteration finds another candidate
+        coarse[max(0, cy - suppress_h):cy + suppress_h + 1, max(0, cx - suppress_w):cx + suppress_w + 1] = -1.0
+
+        x0, y0 = max(0, cx * scale - margin), max(0, cy * scale - margin)
+        x1 = min(image.shape[1], cx * scale + template_w + margin)
+        y1 = min(image.shape[0], cy * scale + template_h + margin)
+        if x1 - x0 < template_w or y1 - y0 < template_h:
+            continue
+        val, (lx, ly) = match_template(image[y0:y1, x0:x1], template)
+        if val > best_val:
+            best_val, best_loc = val, (x0 + lx, y0 + ly)
+    return best_val, best_loc
+
+
+def find_template(image: np.ndarray, template: np.ndarray, search: SearchMode = 'exhaustive',
+                  pool: Optional[BufferPool] = None, tag: Hashable = None) -> Tuple[float, Tuple[int, int]]:
+    """Locate `template` in `image` with an exhaustive or a coarse-to-fine pyramid search."""
+    if search == 'pyramid':
+        return pyramid_match(image, template)
+    if search == 'exhaustive':
+        return match_template(image, template, pool, tag)
+    raise ValueError(f"Unknown search mode: {search}")
@@ -0,0 +1,61 @@
+import time
+from threading import Lock
+from typing import Any, Callable, Dict
+from app.utils.metrics import LatencyGroup, metrics
+
+
+class Waiter:
+    """
+    Polls a condition with an adaptive interval until it holds or a timeout expires.
+
+    The first polls are close together (`initial_interval`) so a screen that is already there, or
+    appears right away, is seen almost immediately; the interval then grows by `backoff` up to
+    `max_interval` so long waits don't keep capturing the window at full rate. Every wait records
+    how long it actually took, keyed by its label.
+    """
+
+    def __init__(self, initial_interval: float = 0.05, max_interval: float = 0.5, backoff: float = 1.5,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self.durations = LatencyGroup()
+        self._lock = Lock()
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+
+    def wait(self, condition: Callable[[], Any], timeout: float, label: str = "wait") -> Any:
+        """
+        Evaluate `condition` until it returns a truthy value, and return that value; return the last
+        falsy value when `timeout` seconds passed. The condition is always evaluated at least once.
+        """
+        start = self._clock()
+        deadline = start + timeout
+        interval = self.initial_interval
+        polls = 0
+        while True:
+            result = condition()
+            polls += 1
+            now = self._clock()
+            if result or now >= deadline:
+                break
+            self._sleep(min(interval, deadline - now))
+            interval = min(interval * self.backoff, self.max_interval)
+
+        self.durations.record(label, now - start)
+        with self._lock:
+            outcome = self._outcomes.setdefault(label, {"ok": 0, "timeouts": 0, "polls": 0})
+            outcome["ok" if result else "timeouts"] += 1
+            outcome["polls"] += polls
+        return result
+
+    def stats(self) -> Dict[str, Dict]:
+        durations = self.durations.snapshot()
+        with self._lock:
+            return {label: {**outcome, **durations.get(label, {})} for label, outcome in self._outcomes.items()}
+
+
+# Create a global waiter instance
+waiter = Waiter()
+metrics.register("waits", waiter.stats)
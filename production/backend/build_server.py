@@ -1,6 +1,14 @@
 import PyInstaller.__main__
 import os
 import sys
+from pathlib import Path
+
+def build_template_atlas():
+    # Pack public/images into one memory-mapped atlas so the server skips JPEG decoding at startup
+    from app.services.template_atlas import build_atlas
+    public_path = Path(os.path.abspath('..')) / 'public'
+    entries = build_atlas(public_path / 'images', public_path / 'templates.atlas')
+    print(f"Packed {len(entries)} templates into {public_path / 'templates.atlas'}")
 
 def build_server():
     # Get the absolute path to the main.py file
@@ -32,4 +40,5 @@ def build_server():
     PyInstaller.__main__.run(args)
 
 if __name__ == '__main__':
+    build_template_atlas()
     build_server()
\ No newline at end of file
@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import time
 from app.services.utility_services import UtilityService
 from app.services.event_services import EventService
 from app.services.image_services import ImageService
 from app.services.window_control_services import WindowControlService
-from app.services.game_service import GameService
+from app.services.game_service import GameService, profile_registry, vehicle_reader
+from app.services.vehicle_service import VehicleMonitor
+from app.services.job_service import job_service
+from app.services.fleet_service import FleetService
+from app.enums.shortcut_positions import GameMode
+from app.enums.player_profiles import PlayerProfile
 from app.services.shortcut_service import ShortcutService
 from urllib.parse import unquote
 from app.utils.logger import logger
+from app.utils.metrics import metrics
 from app.schema.schemas import FileModel, WithContentFileModel
 from app.config import config
 import pygetwindow
@@ -22,6 +29,18 @@ image_service = ImageService()
 shortcut_service = ShortcutService()
 window_service = WindowControlService()
 game_service = GameService()
+vehicle_monitor = VehicleMonitor(vehicle_reader, event_service.broadcast_vehicle)
+# start flows by mode (0=collab, 1=ice, 2=moon, 3=whirlpool), flow(main, sub, options)
+START_FLOWS = {
+    0: lambda main, sub, options: game_service.start_collab(main, sub),
+    1: lambda main, sub, options: game_service.start_ice_castle(main, sub, options.get('iceOnlySupport', False)),
+    2: lambda main, sub, options: game_service.start_moon_island(main, sub),
+    3: lambda main, sub, options: game_service.start_whirlpool(main, sub),
+}
+START_FLOW_NAMES = {0: "合作", 1: "寒冰", 2: "暗月", 3: "漩涡"}
+fleet_service = FleetService(START_FLOWS, max_active=config.fleet_max_active, capture_rate=config.fleet_capture_rate)
+metrics.register("fleet", fleet_service.stats)
+metrics.register("shortcuts", shortcut_service.stats)
 
 
 @app.middleware("http")
@@ -77,6 +96,23 @@ async def health_check():
 # Store server start time
 app.state.start_time = time.time()
 
+@app.on_event("startup")
+async def preload_templates():
+    try:
+        image_service.preload_templates()
+    except Exception as e:
+        # templates are loaded on demand if preloading fails
+        logger.error(f"Error preloading templates: {str(e)}")
+
+@app.on_event("startup")
+async def bind_job_events():
+    # job progress from the worker threads is streamed to the clients over /sse
+    job_service.bind(asyncio.get_running_loop(), event_service.broadcast_job)
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 ## testing purpose
 @app.post("/parse-file")
 async def parse_file(file_data: FileModel):
@@ -172,9 +208,13 @@ async def get_tool_windows():
 @app.post("/set-thunder-player")
 async def set_thunder_player(data: dict):
     try:
-        # set a global variable to store the isThunderPlayer
+        # the profile of one window when a pid is given, else of all windows without their own profile
         isThunderPlayer = data['isThunderPlayer']
-        config.is_thunder_player = isThunderPlayer
+        profile = PlayerProfile.THUNDER.value if isThunderPlayer else PlayerProfile.NATIVE.value
+        if data.get('pid') is not None:
+            profile_registry.bind(data['pid'], profile)
+        else:
+            profile_registry.set_default(profile)
 
         return {"isThunderPlayer": isThunderPlayer}
     except Exception as e:
@@ -196,7 +236,7 @@ async def locate_window(window_data: dict):
     """
     try:
         pid = int(window_data['pid'])
-        result = window_service.locate_game_window(pid, 0, 0, not config.is_thunder_player)
+        result = window_service.locate_game_window(pid, 0, 0, profile_registry.get(pid).input.resize_window)
         if result["status"] == "error":
             return JSONResponse(
                 status_code=404 if "not found" in result["message"] else 500,
@@ -219,9 +259,12 @@ async def locate_auto_window(window_data: dict):
         gameWnd = window_data['game']
         toolWnd = window_data['tool']
         index = int(window_data['idx'])
+        if window_data.get('isThunderPlayer') is not None:
+            profile = PlayerProfile.THUNDER.value if window_data['isThunderPlayer'] else PlayerProfile.NATIVE.value
+            profile_registry.bind(gameWnd, profile)
         
         x_pos = 1056 * index
-        window_service.locate_game_window(gameWnd, x_pos, 0, not config.is_thunder_player)
+        window_service.locate_game_window(gameWnd, x_pos, 0, profile_registry.get(gameWnd).input.resize_window)
         window_service.locate_tool_window(toolWnd, x_pos, 600)
     except Exception as e:
         logger.error(f"check the game and tool windows in automator: {str(e)}")
@@ -237,27 +280,20 @@ async def start_auto_game(request: Request, config: dict):
         main = config['main']
         sub = config['sub']
         mode = config['mode']
-        logger.info(f"Starting auto game with mode: {mode}. (0=collab, 1=ice, 2=moon)")
-        info = ""
-        if mode == 0:
-            game_service.start_collab(main, sub)
-            info = "合作"
-        elif mode == 1:
-            ice_only_support = False
-            try:
-                ice_only_support = config['iceOnlySupport']
-            except Exception as e:
-                logger.error(f"Error getting iceOnlySupport: {str(e)}")
-            game_service.start_ice_castle(main, sub, ice_only_support)
-            info = "寒冰"
-        elif mode == 2:
-            game_service.start_moon_island(main, sub)
-            info = "暗月"
-        elif mode == 3:
-            game_service.start_whirlpool(main, sub)
-            info = "漩涡"
+        logger.info(f"Starting auto game with mode: {mode}. (0=collab, 1=ice, 2=moon, 3=whirlpool)")
+        flow = START_FLOWS.get(mode)
+        if flow is None:
+            return JSONResponse(
+                status_code=400,
+                content={"detail": f"Unknown mode: {mode}"}
+            )
+        params = {"mode": mode}
+        if mode == 1:
+            params["iceOnlySupport"] = config.get('iceOnlySupport', False)
+        job = job_service.submit("start_auto_game", flow, main, sub, params, params=params, total_steps=7)
+        info = START_FLOW_NAMES[mode]
         await event_service.broadcast_log("info", f"开始{info}")
-        return {"status": "success"}
+        return {"status": "success", "job_id": job.id}
 
     except Exception as e:
         logger.error(f"Error starting auto game: {str(e)}")
@@ -271,9 +307,9 @@ async def start_auto_battle(request: Request, config: dict):
     try:
         main = config['main']
         sub = config['sub']
-        game_service.start_auto_battle(main, sub)
+        job = job_service.submit("start_auto_battle", game_service.start_auto_battle, main, sub, total_steps=3)
         await event_service.broadcast_log("info", "开始对战")
-        return {"status": "success"}
+        return {"status": "success", "job_id": job.id}
     except Exception as e:
         logger.error(f"Error stopping auto battle: {str(e)}")
         return JSONResponse(
@@ -281,13 +317,93 @@ async def start_auto_battle(request: Request, config: dict):
             content={"detail": f"Error stopping auto battle: {str(e)}"}
         )
 
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.to_dict() for job in job_service.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_service.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": f"Job {job_id} not found"}
+        )
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = job_service.cancel(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": f"Job {job_id} not found"}
+        )
+    return job.to_dict()
+
+@app.get("/fleet")
+async def get_fleet():
+    return fleet_service.stats()
+
+@app.post("/fleet/pairs")
+async def register_fleet_pair(pair_data: dict):
+    """
+    Register the main/sub window pair at `idx`, e.g. {'idx': 0, 'main': {'game': .., 'tool': ..}, 'sub': {...}},
+    with an optional 'isThunderPlayer' for the player profile of both game windows.
+    """
+    try:
+        if pair_data.get('isThunderPlayer') is not None:
+            # a fleet may mix native and Thunder clients, the profile is kept per window
+            profile = PlayerProfile.THUNDER.value if pair_data['isThunderPlayer'] else PlayerProfile.NATIVE.value
+            profile_registry.bind(pair_data['main']['game'], profile)
+            profile_registry.bind(pair_data['sub']['game'], profile)
+        pair = fleet_service.register(int(pair_data['idx']), pair_data['main'], pair_data['sub'])
+        return pair.to_dict()
+    except Exception as e:
+        logger.error(f"Error registering fleet pair: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Error registering fleet pair: {str(e)}"}
+        )
+
+@app.delete("/fleet/pairs/{idx}")
+async def unregister_fleet_pair(idx: int):
+    pair = fleet_service.unregister(idx)
+    if pair is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": f"Pair {idx} not found"}
+        )
+    return {"status": "success"}
+
+@app.post("/fleet/start")
+async def start_fleet(fleet_config: dict):
+    """
+    Start `mode` on the pairs listed in `pairs`, or on every idle pair. Returns the job of each pair.
+    """
+    try:
+        mode = fleet_config['mode']
+        options = {'iceOnlySupport': fleet_config.get('iceOnlySupport', False)} if mode == 1 else {}
+        if fleet_config.get('pairs') is None:
+            jobs = fleet_service.start_all(mode, options)
+        else:
+            jobs = {int(idx): fleet_service.start(int(idx), mode, options) for idx in fleet_config['pairs']}
+        await event_service.broadcast_log("info", f"开始多开 {len(jobs)} 组")
+        return {"status": "success", "jobs": {idx: job.id for idx, job in jobs.items()}}
+    except Exception as e:
+        logger.error(f"Error starting fleet: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Error starting fleet: {str(e)}"}
+        )
+
 @app.post("/is-in-game")
 async def is_in_game(request: Request, config: dict):
     try:
         main = config['main']
         sub = config['sub']
-        main_result = image_service.find_image(main, '笑脸')
-        sub_result = image_service.find_image(sub, '笑脸')
+        main_result = image_service.find_image(main, '笑脸', search='pyramid')
+        sub_result = image_service.find_image(sub, '笑脸', search='pyramid')
         if main_result['found'] == True and sub_result['found'] == True:
             await event_service.broadcast_log("info", "游戏中...")
             return {"status": True}
@@ -303,6 +419,41 @@ async def is_in_game(request: Request, config: dict):
         )
 
 
+@app.post("/find-images")
+def find_images(data: dict):
+    """
+    Find several templates in one capture of a window. A plain def, FastAPI runs the blocking
+    capture and matching on its thread pool instead of the event loop.
+    Args:
+        data: dict containing 'pid', 'images' (template names) and optional 'confidence' and 'search'
+    """
+    try:
+        pid = int(data['pid'])
+        return image_service.find_images(pid, data['images'], data.get('confidence', 0.8), data.get('search', 'exhaustive'))
+    except Exception as e:
+        logger.error(f"Error finding images: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Error finding images: {str(e)}"}
+        )
+
+@app.post("/detect-screens")
+def detect_screens(data: dict):
+    """
+    Evaluate several screen detectors on one window with a single capture (blocking, runs on the thread pool).
+    Args:
+        data: dict containing 'pid' and 'detectors', e.g. ["is_home", "need_ads"]
+    """
+    try:
+        pid = int(data['pid'])
+        return {"results": game_service.detect_many(pid, data['detectors'])}
+    except Exception as e:
+        logger.error(f"Error detecting screens: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Error detecting screens: {str(e)}"}
+        )
+
 
 @app.get("/shortcut")
 async def get_shortcut():
@@ -364,6 +515,28 @@ async def monitor_shortcut(request: Request, config: dict):
     except Exception as e:
         logger.error(f"Error monitoring shortcut: {str(e)}")
 
+@app.post("/monitor-vehicle")
+async def monitor_vehicle(request: Request, config: dict):
+    """
+    Start or stop broadcasting vehicle slot changes of the window over /sse.
+    Args:
+        config: dict containing 'status' and optional 'mode' (GameMode value, defaults to the shortcut mode)
+    """
+    try:
+        pid = get_req_pid(request)
+        if config.get("status"):
+            mode = config.get("mode", shortcut_service.window_configs.get(pid, {}).get("mode", GameMode.SINGLE_PLAYER.value))
+            vehicle_monitor.start(pid, int(mode))
+        else:
+            vehicle_monitor.stop(pid)
+        return {"status": "success"}
+    except Exception as e:
+        logger.error(f"Error monitoring vehicle: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Error monitoring vehicle: {str(e)}"}
+        )
+
 @app.get("/sse")
 async def event_stream(request: Request):
     pid = request.query_params.get('pid')